@@ -20,8 +20,11 @@ class TNavigator(object):
     DEFAULT_PEN_UP = "up"
     DEFAULT_PEN_DOWN = "down"
     DEFAULT_PEN_MODE = DEFAULT_PEN_DOWN
+    DEFAULT_STACK_SIZE = 1024
+    CAP_ROUND = "round"
+    CAP_SQUARE = "square"
 
-    def __init__(self, mode=DEFAULT_MODE, penmode=DEFAULT_PEN_MODE):
+    def __init__(self, mode=DEFAULT_MODE, penmode=DEFAULT_PEN_MODE, stack_size=DEFAULT_STACK_SIZE):
         self._angleOffset = self.DEFAULT_ANGLEOFFSET
         self._angleOrient = self.DEFAULT_ANGLEORIENT
         self._mode = mode
@@ -30,11 +33,15 @@ class TNavigator(object):
         self._penmode = penmode
         self._setmode(mode, penmode)
         self._pen_color = False
+        self._pensize = 1
+        self._pencap = TNavigator.CAP_ROUND
         self._canvas_width = 128
         self._canvas_height = 128
         self._canvas = np.full((self._canvas_width,self._canvas_width), True)
         self._line_lengths = []
         self._angles = []
+        # preallocated [position, orient, penmode] slots of push_state()
+        self._state_stack = [[None, None, None] for _ in range(stack_size)]
         TNavigator.reset(self)
 
     def reset(self):
@@ -46,6 +53,7 @@ class TNavigator(object):
         self._position = Vec2D(int(constants.start_x), int(constants.start_y))
         self._orient =  TNavigator.START_ORIENTATION[self._mode]
         self._penmode = TNavigator.DEFAULT_PEN_MODE
+        self._state_top = 0
 
     def _setmode(self, mode=None, penmode=None):
         """Set turtle-mode to 'standard', 'world' or 'logo'.
@@ -143,7 +151,11 @@ class TNavigator(object):
         """move turtle to position end."""
         
         rr, cc = [], []
-        if self._penmode == TNavigator.DEFAULT_PEN_DOWN:
+        if self._penmode == TNavigator.DEFAULT_PEN_DOWN and self._pensize > 1:
+            # thick lines cover their start pixel too
+            rr, cc = self._get_thick_line(self._position, end)
+            self._canvas[rr, cc] = self._pen_color
+        elif self._penmode == TNavigator.DEFAULT_PEN_DOWN:
             # Getting the line for drawing in the 2D matrix (using skimage: pip install scikit-image)
             rr, cc = self._get_line(self._position, end)
             # filtering out the points that are outside the canvas
@@ -598,10 +610,106 @@ class TNavigator(object):
         """
         self._penmode = TNavigator.DEFAULT_PEN_DOWN
     
+    def pensize(self, width=None, cap=None):
+        """Set or return the line thickness.
+
+        Arguments:
+        width -- positive number, 1 draws the plain bresenham lines
+        cap (optional) -- "round" (default) or "square" line ends
+
+        Without arguments the pensize is returned.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.pensize()
+        1
+        >>> turtle.pensize(10, "square")
+        """
+        if width is None and cap is None:
+            return self._pensize
+        if width is not None:
+            if width <= 0:
+                raise ValueError("pensize must be positive, not {}".format(width))
+            self._pensize = width
+        if cap is not None:
+            if cap not in (TNavigator.CAP_ROUND, TNavigator.CAP_SQUARE):
+                raise ValueError("unknown line cap {!r}".format(cap))
+            self._pencap = cap
+
+    def push_state(self):
+        """Save the turtle's position, heading and pen on the state stack.
+
+        No argument.
+
+        The state is stored in a preallocated stack, pop_state()
+        restores it without any trigonometry. Branching drawings push
+        before a branch and pop after it.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.push_state()
+        >>> turtle.forward(20)
+        >>> turtle.pop_state()
+        """
+        if self._state_top >= len(self._state_stack):
+            raise IndexError("turtle state stack overflow")
+        slot = self._state_stack[self._state_top]
+        slot[0], slot[1], slot[2] = self._position, self._orient, self._penmode
+        self._state_top += 1
+
+    def pop_state(self):
+        """Restore the state saved by the last push_state().
+
+        No argument.
+
+        Move the turtle back without drawing and restore its heading and
+        pen as they were at the matching push_state().
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.push_state()
+        >>> turtle.left(45)
+        >>> turtle.pop_state()
+        """
+        if self._state_top <= 0:
+            raise IndexError("pop_state from empty state stack")
+        self._state_top -= 1
+        self._position, self._orient, self._penmode = self._state_stack[self._state_top]
+
     def _get_line(self, cor1, cor2):
         """Return a line between two coordinates using bresenham algorithm."""
         return list(line(int(cor1[0]), int(cor1[1]), int(cor2[0]), int(cor2[1])))
     
+    def _get_thick_line(self, cor1, cor2):
+        """Return the pixels of a line pensize wide between two coordinates.
+
+        A pixel is covered if its center lies in the stroke, the y range of
+        every column is half-open like the x range.
+        """
+        x0, y0, x1, y1 = float(cor1[0]), float(cor1[1]), float(cor2[0]), float(cor2[1])
+        r = self._pensize / 2.0
+        length = math.hypot(x1 - x0, y1 - y0)
+        dx, dy = ((x1 - x0) / length, (y1 - y0) / length) if length > 0 else (1.0, 0.0)
+        nx, ny = -dy * r, dx * r
+        ex, ey = (dx * r, dy * r) if self._pencap == TNavigator.CAP_SQUARE else (0.0, 0.0)
+        corners = [(x0 - ex + nx, y0 - ey + ny), (x1 + ex + nx, y1 + ey + ny),
+                   (x1 + ex - nx, y1 + ey - ny), (x0 - ex - nx, y0 - ey - ny)]
+        caps = [(x0, y0), (x1, y1)] if self._pencap == TNavigator.CAP_ROUND else []
+        x_min = min([x for x, _ in corners] + [x - r for x, _ in caps])
+        x_max = max([x for x, _ in corners] + [x + r for x, _ in caps])
+        rr, cc = [], []
+        for x in range(max(math.ceil(x_min), 0), min(math.ceil(x_max), self._canvas.shape[0])):
+            ys = []
+            for (ax, ay), (bx, by) in zip(corners, corners[1:] + corners[:1]):
+                if min(ax, bx) <= x <= max(ax, bx):
+                    ys += [ay, by] if ax == bx else [ay + (x - ax) / (bx - ax) * (by - ay)]
+            for cx, cy in caps:
+                if abs(x - cx) <= r:
+                    h = math.sqrt(r * r - (x - cx) ** 2)
+                    ys += [cy - h, cy + h]
+            if ys:
+                column = range(max(math.ceil(min(ys)), 0), min(math.ceil(max(ys)), self._canvas.shape[1]))
+                rr += [x] * len(column)
+                cc += column
+        return np.array(rr, dtype=int), np.array(cc, dtype=int)
+
     def _get_line_from_current_to_end(self):
         """Return a line between current position and end point in the heading direction using bresenham algorithm."""
         cor = self._get_end_point()
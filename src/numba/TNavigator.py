@@ -7,6 +7,8 @@ import constants
 from skimage.draw import line
 import cv2
 from Vec2D import Vec2D
+from raster import draw_line, draw_thick_line, fill_polygon, FILL_EVEN_ODD, CAP_ROUND, CAP_SQUARE, BLEND_OVERWRITE
+from interpreter import execute, STATE_X, STATE_Y, STATE_ORIENT_X, STATE_ORIENT_Y, STATE_PEN, STATE_SIZE
 
 spec = [
     ('_angleOffset', nb.float64),
@@ -14,6 +16,9 @@ spec = [
     ('_mode', nb.int64),
     ('_penmode', nb.int64),
     ('_pen_color', nb.types.boolean),
+    ('_pensize', nb.float64),
+    ('_pencap', int64),
+    ('_subpixel', nb.types.boolean),
     ('_canvas_width', int64),
     ('_canvas_height', int64),
     ('_canvas', nb.boolean[:,:]),
@@ -23,6 +28,11 @@ spec = [
     ('_orient', Vec2D.class_type.instance_type),
     ('_fullcircle', nb.float64),
     ('_degreesPerAU', nb.float64),
+    ('_state_stack', nb.float64[:, :]),
+    ('_state_top', int64),
+    ('_fill_vertices', nb.float64[:, :]),
+    ('_fill_count', int64),
+    ('_filling', nb.types.boolean),
 ]
 
 DEFAULT_MODE = 2
@@ -31,10 +41,12 @@ DEFAULT_ANGLEORIENT = 1
 DEFAULT_PEN_UP = 0
 DEFAULT_PEN_DOWN = 1
 DEFAULT_PEN_MODE = DEFAULT_PEN_DOWN
+DEFAULT_STACK_SIZE = 1024
+DEFAULT_FILL_VERTICES = 1024
 
 @jitclass(spec)
 class TNavigator:
-    def __init__(self, mode: int = 2, penmode: int = 1):
+    def __init__(self, mode: int = 2, penmode: int = 1, stack_size: int = DEFAULT_STACK_SIZE):
         self._angleOffset: float = DEFAULT_ANGLEOFFSET
         self._angleOrient: int = DEFAULT_ANGLEORIENT
         self._mode: int = mode
@@ -42,17 +54,25 @@ class TNavigator:
         self._penmode: int = penmode
         self._setmode(mode, penmode)
         self._pen_color: bool = False
+        self._pensize: float = 1.0
+        self._pencap: int = CAP_ROUND
+        self._subpixel: bool = False
         self._canvas_width: int = 128
         self._canvas_height: int = 128
         self._canvas: np.ndarray = np.full((self._canvas_width, self._canvas_width), True, dtype=np.bool_)
         self._line_lengths: np.ndarray = nb.typed.List.empty_list(nb.float64)
         self._angles: np.ndarray = nb.typed.List.empty_list(nb.float64)
+        self._state_stack: np.ndarray = np.empty((stack_size, STATE_SIZE))
+        self._fill_vertices: np.ndarray = np.empty((DEFAULT_FILL_VERTICES, 2))
+        self._fill_count: int = 0
+        self._filling: bool = False
         self.reset()
     
     def reset(self):
         self._position = Vec2D(constants.start_x, constants.start_y)
         self._orient =   Vec2D(0.0, 1.0) if self._mode == 2 else Vec2D(1.0, 0.0)
         self._penmode = DEFAULT_PEN_MODE
+        self._state_top = 0
     
     def _setmode(self, mode=None, penmode=None):
         if mode is None:
@@ -89,7 +109,8 @@ class TNavigator:
 
     def _go(self, distance):
         ende = self._position + self._orient * distance
-        ende = Vec2D(int(round(ende[0])), int(round(ende[1])))
+        if not self._subpixel:
+            ende = Vec2D(int(round(ende[0])), int(round(ende[1])))
         self._goto(ende)
     
     def _rotate(self, angle):
@@ -98,26 +119,23 @@ class TNavigator:
     
     def _goto(self, end):
         """move turtle to position end."""
-        end_x = int(round(end._x))
-        end_y = int(round(end._y))
+        end_x = float(round(end._x))
+        end_y = float(round(end._y))
+        if self._subpixel:
+            end_x = end._x
+            end_y = end._y
 
         if self._penmode == DEFAULT_PEN_DOWN:
-            
-            start_point = Vec2D(max(0, min(self._canvas_width-1, self._position[0])), max(0, min(self._canvas_height-1, self._position[1])))
-            end_point = Vec2D(max(0, min(self._canvas_width-1, end._x)), max(0, min(self._canvas_height-1, end._y)))
-            
-            points = self._get_line(start_point, end_point)
-            try:
-                points.remove(self._position)
-            except:
-                _ = 0
-            if len(points) != 0:
-                self._canvas[tuple(zip(*points))] = self._pen_color
-            
-                if 0 <= end_x < self._canvas_width and 0 <= end_y < self._canvas_height:
-                    self._canvas[end_x, end_y] = self._pen_color
+            if self._pensize > 1.0:
+                draw_thick_line(self._canvas, float(self._position._x), float(self._position._y), end_x, end_y,
+                                self._pensize, self._pencap, self._pen_color)
+            else:
+                draw_line(self._canvas, int(round(self._position._x)), int(round(self._position._y)),
+                          int(round(end_x)), int(round(end_y)), self._pen_color)
 
         self._position = Vec2D(end_x, end_y)
+        if self._filling:
+            self._add_fill_vertex(end_x, end_y)
         
     def forward(self, distance, angle = 0):
         self._line_lengths.append(distance)
@@ -215,6 +233,85 @@ class TNavigator:
     def pendown(self):
         self._penmode = DEFAULT_PEN_DOWN
     
+    def pensize(self, width, cap=CAP_ROUND):
+        if width <= 0:
+            raise ValueError("pensize must be positive")
+        if cap != CAP_ROUND and cap != CAP_SQUARE:
+            raise ValueError("unknown line cap")
+        self._pensize = width
+        self._pencap = cap
+
+    def subpixel(self, flag):
+        self._subpixel = flag
+        if not flag:
+            self._position = Vec2D(round(self._position._x), round(self._position._y))
+
+    def begin_fill(self):
+        if self._filling:
+            raise ValueError("begin_fill() while filling, call end_fill() first")
+        self._filling = True
+        self._fill_count = 0
+        self._add_fill_vertex(self._position._x, self._position._y)
+
+    def end_fill(self, rule=FILL_EVEN_ODD):
+        self._filling = False
+        count = self._fill_count
+        self._fill_count = 0
+        if count >= 3:
+            fill_polygon(self._canvas, self._fill_vertices[:, 0], self._fill_vertices[:, 1], count,
+                         self._pen_color, rule)
+
+    def filling(self):
+        return self._filling
+
+    def _add_fill_vertex(self, x, y):
+        if self._fill_count == self._fill_vertices.shape[0]:
+            vertices = np.empty((2 * self._fill_count, 2))
+            vertices[:self._fill_count] = self._fill_vertices
+            self._fill_vertices = vertices
+        self._fill_vertices[self._fill_count, 0] = x
+        self._fill_vertices[self._fill_count, 1] = y
+        self._fill_count += 1
+
+    def push_state(self):
+        if self._state_top >= self._state_stack.shape[0]:
+            raise IndexError("turtle state stack overflow")
+        row = self._state_stack[self._state_top]
+        row[STATE_X] = self._position._x
+        row[STATE_Y] = self._position._y
+        row[STATE_ORIENT_X] = self._orient._x
+        row[STATE_ORIENT_Y] = self._orient._y
+        row[STATE_PEN] = self._penmode
+        self._state_top += 1
+
+    def pop_state(self):
+        if self._state_top <= 0:
+            raise IndexError("pop_state from empty state stack")
+        self._state_top -= 1
+        row = self._state_stack[self._state_top]
+        self._position = Vec2D(row[STATE_X], row[STATE_Y])
+        self._orient = Vec2D(row[STATE_ORIENT_X], row[STATE_ORIENT_Y])
+        self._penmode = int(row[STATE_PEN])
+
+    def _get_state(self, state):
+        state[STATE_X] = self._position._x
+        state[STATE_Y] = self._position._y
+        state[STATE_ORIENT_X] = self._orient._x
+        state[STATE_ORIENT_Y] = self._orient._y
+        state[STATE_PEN] = self._penmode == DEFAULT_PEN_DOWN
+
+    def _set_state(self, state):
+        self._position = Vec2D(state[STATE_X], state[STATE_Y])
+        self._orient = Vec2D(state[STATE_ORIENT_X], state[STATE_ORIENT_Y])
+        self._penmode = DEFAULT_PEN_DOWN if state[STATE_PEN] != 0.0 else DEFAULT_PEN_UP
+
+    def run(self, ops, args):
+        state = np.empty(STATE_SIZE)
+        self._get_state(state)
+        self._state_top = execute(self._canvas, self._pen_color, state, ops, args, self._state_stack, self._state_top, self._degreesPerAU,
+                                  self._pensize, self._pencap, BLEND_OVERWRITE, 1, self._subpixel)
+        self._set_state(state)
+    
     def _get_line(self, cor1, cor2):
         return list(line(int(cor1._x), int(cor1._y), int(cor2._x), int(cor2._y)))
     
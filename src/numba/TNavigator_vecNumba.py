@@ -6,6 +6,22 @@ import constants
 # from Vec2D import Vec2D
 from Vec2dNumba import Vec2D
 from bresenham import bresenham
+from raster import (draw_line, draw_line_logged, restore_pixels, fill_polygon, fill_polygon_logged, FILL_EVEN_ODD,
+                    draw_thick_line, draw_thick_line_logged, thick_line_bound, CAP_ROUND, CAP_SQUARE,
+                    blend_limit, BLEND_OVERWRITE, BLEND_MAX, BLEND_ADD, draw_line_aa, draw_arc_aa)
+from interpreter import execute, STATE_X, STATE_Y, STATE_ORIENT_X, STATE_ORIENT_Y, STATE_PEN, STATE_SIZE
+from checkpoint import checkpoint, restore
+from occupancy import new_pyramid, count_occupancy, update_occupancy, cast_ray, DEFAULT_BLOCK_SHIFT
+from segindex import SegmentIndex, DEFAULT_CELL_SHIFT
+from tiled import TiledCanvas, DEFAULT_TILE_SHIFT
+from cow import freeze, cow_view, COW_MIN_BYTES
+from egocentric import sample_view, view_background, view_shape, SAMPLE_NEAREST, SAMPLE_BILINEAR
+from tracking import (count_loss, update_loss, target_ink, loss_from_counts, LOSS_DRAWN, LOSS_INTERSECTION,
+                      zobrist_table, zobrist_hash, update_zobrist, pose_hash, DEFAULT_ZOBRIST_SEED,
+                      distance_offsets, count_distance, update_distance, sample_distance, DEFAULT_DISTANCE_RADIUS)
+
+# zero levels, first_hit() walks every pixel
+_NO_PYRAMID = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0)
 
 class TNavigator(object):
     """Navigation part of the RawTurtle.
@@ -21,8 +37,12 @@ class TNavigator(object):
     DEFAULT_PEN_UP = "up"
     DEFAULT_PEN_DOWN = "down"
     DEFAULT_PEN_MODE = DEFAULT_PEN_DOWN
+    DEFAULT_STACK_SIZE = 1024
+    DEFAULT_UNDO_PIXELS = 1 << 16
+    DEFAULT_UNDO_STROKES = 1 << 12
+    DEFAULT_FILL_VERTICES = 1024
 
-    def __init__(self, mode=DEFAULT_MODE, penmode=DEFAULT_PEN_MODE):
+    def __init__(self, mode=DEFAULT_MODE, penmode=DEFAULT_PEN_MODE, stack_size=DEFAULT_STACK_SIZE):
         self._angleOffset = self.DEFAULT_ANGLEOFFSET
         self._angleOrient = self.DEFAULT_ANGLEORIENT
         self._mode = mode
@@ -31,11 +51,45 @@ class TNavigator(object):
         self._penmode = penmode
         self._setmode(mode, penmode)
         self._pen_color = False
+        self._pensize = 1
+        self._pencap = CAP_ROUND
+        # how strokes combine with the pixels, set by use_canvas()
+        self._blend = BLEND_OVERWRITE
+        self._blend_limit = 1
+        # anti-aliased lines and arcs, set by antialias()
+        self._antialias = False
+        # float positions instead of whole pixels, set by subpixel()
+        self._subpixel = False
         self._canvas_width = 128
         self._canvas_height = 128
         self._canvas = np.full((self._canvas_width,self._canvas_width), True)
+        # frozen copy of the canvas shared by fork(), None once the canvas changed
+        self._canvas_base = None
         self._line_lengths = []
         self._angles = []
+        self._state_stack = np.empty((stack_size, STATE_SIZE))
+        # undo log, allocated by enable_undo()
+        self._undo_pixels = None
+        # ink mask of the target image of loss(), set by set_target()
+        self._target_ink = None
+        # zobrist keys of canvas_hash(), set by enable_canvas_hash()
+        self._zobrist_table = None
+        # distance to the nearest stroke, allocated by enable_stroke_distance()
+        self._distance = None
+        # ink counts per block of first_hit(), allocated by enable_occupancy()
+        self._occupancy = None
+        # drawn segments of intersects(), set by enable_segment_index()
+        self._segment_index = None
+        # sparse canvas drawn instead of _canvas, set by use_tiled_canvas()
+        self._tiled_canvas = None
+        # vertices of the polygon between begin_fill() and end_fill()
+        self._fill_vertices = np.empty((self.DEFAULT_FILL_VERTICES, 2))
+        self._fill_count = 0
+        self._filling = False
+        # pixels changed by the last stroke when there is no undo log
+        self._changed_pixels = np.empty(0, dtype=np.int64)
+        self._changed_values = np.empty(0, dtype=self._canvas.dtype)
+        self._tracking = False
         TNavigator.reset(self)
 
     def reset(self):
@@ -47,6 +101,7 @@ class TNavigator(object):
         self._position = Vec2D(int(constants.start_x), int(constants.start_y))
         self._orient =  TNavigator.START_ORIENTATION[self._mode]
         self._penmode = TNavigator.DEFAULT_PEN_MODE
+        self._state_top = 0
 
     def _setmode(self, mode=None, penmode=None):
         """Set turtle-mode to 'standard', 'world' or 'logo'.
@@ -124,7 +179,8 @@ class TNavigator(object):
         # elif distance > 0.0:
         #     distance -= 1.0
         ende = self._position + self._orient * distance
-        ende = Vec2D(int(round(ende[0])), int(round(ende[1])))
+        if not self._subpixel:
+            ende = Vec2D(int(round(ende[0])), int(round(ende[1])))
         # print("Start: {}, End: {}, Distance: {}, Orient: {}".format(self._position, ende, distance, self._orient))
         self._goto(ende)
 
@@ -137,18 +193,37 @@ class TNavigator(object):
         """move turtle to position end."""
         end_x = int(round(end[0]))
         end_y = int(round(end[1]))
+        start_x = int(round(self._position[0]))
+        start_y = int(round(self._position[1]))
+        if self._subpixel:
+            # exact end points, only the bresenham lines join their rounded pixels
+            x0, y0, x1, y1 = float(self._position[0]), float(self._position[1]), float(end[0]), float(end[1])
+        else:
+            x0, y0, x1, y1 = start_x, start_y, end_x, end_y
+        if self._undo_pixels is not None:
+            if self._pensize > 1:
+                self._begin_undo_stroke(thick_line_bound(x0, y0, x1, y1, self._pensize))
+            else:
+                self._begin_undo_stroke(max(abs(end_x - start_x), abs(end_y - start_y)))
         if self._penmode == TNavigator.DEFAULT_PEN_DOWN:
             
-            # bounding the lines to the canvas by clipping into [0, canvas_width-1] and [0, canvas_height-1]
-            start_point = Vec2D(max(0, min(self._canvas_width-1, self._position[0])), max(0, min(self._canvas_height-1, self._position[1])))
-            end_point = Vec2D(max(0, min(self._canvas_width-1, end[0])), max(0, min(self._canvas_height-1, end[1])))
-            
-            # Getting the line for drawing in the 2D matrix (using skimage: pip install scikit-image)
-            points = self._get_line(start_point, end_point) 
-            if len(points):
-                current_point_color = self._canvas[self._position]
-                self._canvas[points] = self._pen_color
-                self._canvas[self._position] = current_point_color
+            # Drawing the line into the 2D matrix natively, pixels outside the canvas are skipped
+            self._canvas_base = None
+            if self._tiled_canvas is not None:
+                self._tiled_canvas.draw_line(start_x, start_y, end_x, end_y, self._pen_color)
+            elif self._antialias:
+                draw_line_aa(self._canvas, float(x0), float(y0), float(x1), float(y1),
+                             float(self._pen_color), self._blend, self._blend_limit)
+            elif self._tracking:
+                self._draw_tracked(x0, y0, x1, y1)
+            elif self._pensize > 1:
+                draw_thick_line(self._canvas, x0, y0, x1, y1, self._pensize, self._pencap,
+                                self._pen_color, self._blend, self._blend_limit)
+            else:
+                draw_line(self._canvas, start_x, start_y, end_x, end_y, self._pen_color, self._blend,
+                          self._blend_limit)
+            if self._segment_index is not None and (x0, y0) != (x1, y1):
+                self._segment_index.add(x0, y0, x1, y1)
             
             # Getting the line for drawing in the 2D matrix (using Bresenham's algorithm: pip install bresenham)
             # points = self.__get_line(start_point, end_point)
@@ -159,7 +234,9 @@ class TNavigator(object):
             # if len(points):
             #     self._canvas[tuple(zip(*points))] = self._pen_color
 
-        self._position = Vec2D(end_x, end_y)
+        self._position = Vec2D(x1, y1)
+        if self._filling:
+            self._add_fill_vertex(x1, y1)
 
     def forward(self, distance, angle = 0):
         """Move the turtle forward by the specified distance.
@@ -182,9 +259,9 @@ class TNavigator(object):
         >>> turtle.position()
         (-50.00,0.00)
         """
+        self._go(distance)
         self._line_lengths.append(distance)
         self._angles.append(angle)
-        self._go(distance)
         self._rotate(angle)
 
     def backward(self, distance):
@@ -398,7 +475,7 @@ class TNavigator(object):
         (10.00, 240.00)
         """
         self._penmode = TNavigator.DEFAULT_PEN_UP
-        self._goto(Vec2D(int(round(x)), int(round(self._position[1]))))
+        self._goto(Vec2D(x, self._position[1]))
         self._penmode = TNavigator.DEFAULT_PEN_DOWN
 
     def sety(self, y):
@@ -418,7 +495,7 @@ class TNavigator(object):
         (0.00, -10.00)
         """
         self._penmode = TNavigator.DEFAULT_PEN_UP
-        self._goto(Vec2D(int(round(self._position[0])), int(round(y))))
+        self._goto(Vec2D(self._position[0], y))
         self._penmode = TNavigator.DEFAULT_PEN_DOWN
 
     def distance(self, x, y=None):
@@ -563,6 +640,9 @@ class TNavigator(object):
         """
         if extent is None:
             extent = self._fullcircle
+        if steps is None and self._antialias and not self._filling:
+            self._arc_aa(radius, extent)
+            return
         if steps is None:
             frac = abs(extent)/self._fullcircle
             steps = 1+int(min(11+abs(radius)/6.0, 59.0)*frac)
@@ -577,6 +657,25 @@ class TNavigator(object):
             self._rotate(w)
         self._rotate(-w2)
         
+    def _arc_aa(self, radius, extent):
+        """Draw the arc of circle() natively and move the turtle to its end."""
+        ox, oy = self._orient[0], self._orient[1]
+        px, py = self._position[0], self._position[1]
+        # the center is radius units left of the turtle
+        cx, cy = px - oy * radius, py + ox * radius
+        sweep = math.copysign(extent * self._degreesPerAU * math.pi / 180.0, radius)
+        start = math.atan2(py - cy, px - cx)
+        if self._penmode == TNavigator.DEFAULT_PEN_DOWN and radius != 0:
+            self._canvas_base = None
+            draw_arc_aa(self._canvas, cx, cy, abs(radius), start, sweep, float(self._pen_color), self._blend,
+                        self._blend_limit)
+        end = start + sweep
+        end_x, end_y = cx + abs(radius) * math.cos(end), cy + abs(radius) * math.sin(end)
+        if not self._subpixel:
+            end_x, end_y = int(round(end_x)), int(round(end_y))
+        self._position = Vec2D(end_x, end_y)
+        self._rotate(extent if radius >= 0 else -extent)
+
     def penup(self):
         """Pull the pen up -- no drawing when the turtle moves.
 
@@ -602,6 +701,859 @@ class TNavigator(object):
         >>> turtle.pendown()
         """
         self._penmode = TNavigator.DEFAULT_PEN_DOWN
+
+    def pensize(self, width=None, cap=None):
+        """Set or return the line thickness.
+
+        Arguments:
+        width -- positive number, 1 draws the plain bresenham lines
+        cap (optional) -- CAP_ROUND (default) or CAP_SQUARE line ends
+
+        Wider lines are drawn natively column by column, every covered
+        pixel is written once. Without arguments the pensize is returned.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.pensize()
+        1
+        >>> turtle.pensize(10, CAP_SQUARE)
+        """
+        if width is None and cap is None:
+            return self._pensize
+        if width is not None:
+            if width <= 0:
+                raise ValueError("pensize must be positive, not {}".format(width))
+            if width > 1 and self._tiled_canvas is not None:
+                raise ValueError("the tiled canvas draws 1 pixel lines only")
+            self._pensize = width
+        if cap is not None:
+            if cap not in (CAP_ROUND, CAP_SQUARE):
+                raise ValueError("unknown line cap {!r}".format(cap))
+            self._pencap = cap
+
+    def begin_fill(self):
+        """Start recording the vertices of a shape to fill.
+
+        No argument.
+
+        Every move from now on adds its end point to a preallocated
+        vertex buffer, end_fill() fills the polygon they enclose. Raises
+        ValueError while already filling, the pending shape would be lost.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.begin_fill()
+        >>> turtle.circle(20)
+        >>> turtle.end_fill()
+        """
+        if self._filling:
+            raise ValueError("begin_fill() while filling, call end_fill() first")
+        self._filling = True
+        self._fill_count = 0
+        self._add_fill_vertex(self._position[0], self._position[1])
+
+    def end_fill(self, rule=FILL_EVEN_ODD):
+        """Fill the shape drawn after the last call to begin_fill().
+
+        Optional argument:
+        rule -- FILL_EVEN_ODD (default) or FILL_NONZERO, decides whether
+        the overlapping parts of a self-crossing shape are filled
+
+        The polygon is scanline filled natively with the pen color, it
+        can be undone like a stroke.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.begin_fill()
+        >>> turtle.circle(20)
+        >>> turtle.end_fill()
+        """
+        self._filling = False
+        count = self._fill_count
+        self._fill_count = 0
+        if count < 3:
+            return
+        if self._tiled_canvas is not None:
+            raise ValueError("end_fill() fills the dense canvas only")
+        xs = self._fill_vertices[:count, 0]
+        ys = self._fill_vertices[:count, 1]
+        self._canvas_base = None
+        if not self._tracking:
+            fill_polygon(self._canvas, xs, ys, count, self._pen_color, rule, self._blend, self._blend_limit)
+            return
+        # the fill changes at most the pixels of its bounding box
+        area = (int(np.ptp(xs)) + 1) * (int(np.ptp(ys)) + 1)
+        if self._undo_pixels is not None:
+            self._begin_undo_stroke(area)
+            pixels, values, top = self._undo_pixels, self._undo_values, self._undo_top
+        else:
+            if len(self._changed_pixels) < area:
+                self._changed_pixels = np.empty(area, dtype=np.int64)
+                self._changed_values = np.empty(area, dtype=self._canvas.dtype)
+            pixels, values, top = self._changed_pixels, self._changed_values, 0
+        end = fill_polygon_logged(self._canvas, xs, ys, count, self._pen_color, rule, pixels, values, top)
+        if self._undo_pixels is not None:
+            self._undo_top = end
+        self._track_changes(pixels[top:end], values[top:end], np.broadcast_to(self._pen_color, end - top))
+
+    def filling(self):
+        """Return True between begin_fill() and end_fill()."""
+        return self._filling
+
+    def _add_fill_vertex(self, x, y):
+        if self._fill_count == len(self._fill_vertices):
+            self._fill_vertices = np.concatenate([self._fill_vertices, np.empty_like(self._fill_vertices)])
+        self._fill_vertices[self._fill_count] = x, y
+        self._fill_count += 1
+
+    def push_state(self):
+        """Save the turtle's position, heading and pen on the state stack.
+
+        No argument.
+
+        The state is copied into a preallocated stack, pop_state()
+        restores it without any trigonometry. Branching drawings push
+        before a branch and pop after it.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.push_state()
+        >>> turtle.forward(20)
+        >>> turtle.pop_state()
+        """
+        if self._state_top >= self._state_stack.shape[0]:
+            raise IndexError("turtle state stack overflow")
+        row = self._state_stack[self._state_top]
+        row[STATE_X] = self._position[0]
+        row[STATE_Y] = self._position[1]
+        row[STATE_ORIENT_X] = self._orient[0]
+        row[STATE_ORIENT_Y] = self._orient[1]
+        row[STATE_PEN] = self._penmode == TNavigator.DEFAULT_PEN_DOWN
+        self._state_top += 1
+
+    def pop_state(self):
+        """Restore the state saved by the last push_state().
+
+        No argument.
+
+        Move the turtle back without drawing and restore its heading and
+        pen as they were at the matching push_state().
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.push_state()
+        >>> turtle.left(45)
+        >>> turtle.pop_state()
+        """
+        if self._state_top <= 0:
+            raise IndexError("pop_state from empty state stack")
+        self._state_top -= 1
+        row = self._state_stack[self._state_top]
+        self._position = Vec2D(row[STATE_X], row[STATE_Y])
+        self._orient = Vec2D(row[STATE_ORIENT_X], row[STATE_ORIENT_Y])
+        self._penmode = TNavigator.DEFAULT_PEN_DOWN if row[STATE_PEN] else TNavigator.DEFAULT_PEN_UP
+
+    def run(self, ops, args):
+        """Execute a compiled program natively on this turtle.
+
+        Arguments:
+        ops -- int8 array of interpreter opcodes
+        args -- float64 array with one argument per opcode
+
+        Draws into the canvas and updates position, heading and pen in a
+        single compiled loop. OP_PUSH/OP_POP share the state stack of
+        push_state()/pop_state(), so a program streamed in chunks keeps
+        its pushed states between calls. The strokes of a program cannot
+        be undone, run() clears the undo log and the segment index and
+        recomputes the loss counts from the whole canvas.
+
+        Example (for a Turtle instance named turtle):
+        >>> ops, args = new_program(2)
+        >>> ops[:] = OP_FORWARD, OP_LEFT
+        >>> args[:] = 20, 90
+        >>> turtle.run(ops, args)
+        """
+        if self._tiled_canvas is not None:
+            raise ValueError("run() draws into the dense canvas only")
+        state = np.empty(STATE_SIZE)
+        self._get_state(state)
+        self._canvas_base = None
+        if self._undo_pixels is not None:
+            self._undo_count = self._undo_top = 0
+        if self._segment_index is not None:
+            self._segment_index.clear()
+        self._state_top = execute(self._canvas, self._pen_color, state, ops, args,
+                                  self._state_stack, self._state_top, self._degreesPerAU,
+                                  float(self._pensize), self._pencap, self._blend, self._blend_limit, self._subpixel)
+        self._set_state(state)
+        self._recount()
+
+    def _get_state(self, state):
+        """Write position, orientation and pen into the pose vector state."""
+        state[STATE_X] = self._position[0]
+        state[STATE_Y] = self._position[1]
+        state[STATE_ORIENT_X] = self._orient[0]
+        state[STATE_ORIENT_Y] = self._orient[1]
+        state[STATE_PEN] = self._penmode == TNavigator.DEFAULT_PEN_DOWN
+
+    def _set_state(self, state):
+        """Set position, orientation and pen from the pose vector state."""
+        self._position = Vec2D(state[STATE_X], state[STATE_Y])
+        self._orient = Vec2D(state[STATE_ORIENT_X], state[STATE_ORIENT_Y])
+        self._penmode = TNavigator.DEFAULT_PEN_DOWN if state[STATE_PEN] else TNavigator.DEFAULT_PEN_UP
+
+    def checkpoint(self, compress=True):
+        """Return the complete state of the turtle as a compact bytes buffer.
+
+        Optional argument:
+        compress -- zlib compress the buffer (default True)
+
+        The buffer holds pose, modes, angle units, pen, state stack,
+        forward() log and the bit-packed canvas; restore() continues
+        exactly from there.
+
+        Example (for a Turtle instance named turtle):
+        >>> saved = turtle.checkpoint()
+        >>> turtle.forward(20)
+        >>> turtle.restore(saved)
+        """
+        return checkpoint(self, compress)
+
+    def restore(self, buffer):
+        """Restore the state saved by checkpoint().
+
+        Argument:
+        buffer -- bytes returned by checkpoint()
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.restore(saved)
+        """
+        restore(self, buffer)
+        self._canvas_replaced()
+
+    def _canvas_replaced(self):
+        """Forget the strokes and recompute the trackers after _canvas was overwritten."""
+        self._canvas_base = None
+        if self._undo_pixels is not None:
+            self._undo_count = self._undo_top = 0
+        if self._segment_index is not None:
+            self._segment_index.clear()
+        self._recount()
+
+    def fork(self, min_bytes=COW_MIN_BYTES):
+        """Return a copy of the turtle sharing its canvas copy-on-write.
+
+        Optional argument:
+        min_bytes -- canvases smaller than this are copied instead of
+        shared, 0 shares every canvas (default COW_MIN_BYTES, 16 KB)
+
+        The canvas is frozen once and then mapped by every fork, a fork
+        copies a page of it only when it draws into that page, and holds
+        no file descriptor. Sharing saves memory, but mapping a view
+        takes about as long as copying a 256 KB canvas, so raise
+        min_bytes when forks are short-lived and memory is plentiful.
+
+        Everything else is copied: the pose, pen and state stack, but
+        also the forward() log, the undo log, the segment index and the
+        tracker arrays, so a fork costs time and memory in the length of
+        the history and the size of the enabled trackers. Fork before
+        long histories, or disable undo, when forking many times.
+
+        Example (for a Turtle instance named turtle):
+        >>> child = turtle.fork()
+        >>> child.forward(20)
+        """
+        child = object.__new__(TNavigator)
+        child.__dict__.update(self.__dict__)
+        if self._canvas.nbytes < min_bytes:
+            child._canvas = self._canvas.copy()
+        else:
+            if self._canvas_base is None:
+                self._canvas_base = freeze(self._canvas)
+                self._canvas = cow_view(self._canvas_base, self._canvas.shape, self._canvas.dtype)
+            child._canvas = cow_view(self._canvas_base, self._canvas.shape, self._canvas.dtype)
+        child._line_lengths = list(self._line_lengths)
+        child._angles = list(self._angles)
+        child._state_stack = np.empty_like(self._state_stack)
+        child._state_stack[:self._state_top] = self._state_stack[:self._state_top]
+        if self._undo_pixels is not None:
+            child._undo_pixels = self._undo_pixels.copy()
+            child._undo_values = self._undo_values.copy()
+            child._undo_poses = self._undo_poses.copy()
+            child._undo_marks = self._undo_marks.copy()
+        if self._target_ink is not None:
+            child._loss_counts = self._loss_counts.copy()
+        if self._zobrist_table is not None:
+            child._zobrist = self._zobrist.copy()
+        if self._distance is not None:
+            child._distance = self._distance.copy()
+        if self._occupancy is not None:
+            child._occupancy = self._occupancy.copy()
+        if self._segment_index is not None:
+            child._segment_index = self._segment_index.copy()
+        if self._tiled_canvas is not None:
+            child._tiled_canvas = self._tiled_canvas.copy()
+        child._fill_vertices = self._fill_vertices.copy()
+        return child
+
+    def enable_undo(self, pixels=DEFAULT_UNDO_PIXELS, strokes=DEFAULT_UNDO_STROKES):
+        """Start recording the strokes so that undo() can revert them.
+
+        Optional arguments:
+        pixels -- initial capacity of the pixel log
+        strokes -- initial capacity of the stroke log
+
+        Every move logs the pose before it and every pixel it changes
+        with its old value, the logs grow when full. Memory grows with
+        the drawn pixels, not with the canvas size.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.enable_undo()
+        """
+        self._check_trackable()
+        self._undo_pixels = np.empty(pixels, dtype=np.int64)
+        self._undo_values = np.empty(pixels, dtype=self._canvas.dtype)
+        self._undo_top = 0
+        # per stroke: pose before it, then pixel log top, forward() log size and indexed segments
+        self._undo_poses = np.empty((strokes, STATE_SIZE))
+        self._undo_marks = np.empty((strokes, 3), dtype=np.int64)
+        self._undo_count = 0
+        self._update_tracking()
+
+    def disable_undo(self):
+        """Stop recording strokes and drop the undo log."""
+        self._undo_pixels = None
+        self._undo_values = self._undo_poses = self._undo_marks = None
+        self._update_tracking()
+
+    def _begin_undo_stroke(self, length):
+        """Log the pose before a stroke of at most length pixels."""
+        if self._undo_count == len(self._undo_marks):
+            self._undo_poses = np.concatenate([self._undo_poses, np.empty_like(self._undo_poses)])
+            self._undo_marks = np.concatenate([self._undo_marks, np.empty_like(self._undo_marks)])
+        if self._undo_top + length > len(self._undo_pixels):
+            size = max(2 * len(self._undo_pixels), self._undo_top + length)
+            pixels = np.empty(size, dtype=np.int64)
+            values = np.empty(size, dtype=self._undo_values.dtype)
+            pixels[:self._undo_top] = self._undo_pixels[:self._undo_top]
+            values[:self._undo_top] = self._undo_values[:self._undo_top]
+            self._undo_pixels, self._undo_values = pixels, values
+        self._get_state(self._undo_poses[self._undo_count])
+        self._undo_marks[self._undo_count] = (self._undo_top, len(self._line_lengths),
+                                              len(self._segment_index) if self._segment_index is not None else 0)
+        self._undo_count += 1
+
+    def undo(self, k=1):
+        """Revert the last k strokes.
+
+        Optional argument:
+        k -- number of strokes to revert (default 1)
+
+        Restores the pixels the strokes changed, the pose and pen before
+        them and the forward() log. Costs time proportional to the
+        pixels of the undone strokes. Returns the number of strokes
+        reverted, fewer than k if the log holds fewer.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.enable_undo()
+        >>> turtle.forward(20)
+        >>> turtle.undo()
+        1
+        """
+        k = min(k, self._undo_count)
+        if k <= 0:
+            return 0
+        self._undo_count -= k
+        mark, log_size, segments = self._undo_marks[self._undo_count]
+        self._canvas_base = None
+        was = np.empty(self._undo_top - mark, dtype=self._canvas.dtype)
+        restore_pixels(self._canvas, self._undo_pixels, self._undo_values, mark, self._undo_top, was)
+        self._track_changes(self._undo_pixels[mark:self._undo_top][::-1], was,
+                            self._undo_values[mark:self._undo_top][::-1])
+        self._undo_top = mark
+        self._set_state(self._undo_poses[self._undo_count])
+        del self._line_lengths[log_size:]
+        del self._angles[log_size:]
+        if self._segment_index is not None:
+            self._segment_index.truncate(segments)
+        return k
+
+    def _check_trackable(self):
+        """Raise unless undo and the trackers can follow the canvas, before they are set up."""
+        if self._tiled_canvas is not None:
+            raise ValueError("undo and the canvas trackers need the dense canvas")
+        if self._canvas.dtype != np.bool_:
+            raise ValueError("undo and the canvas trackers need a bool canvas")
+
+    def _update_tracking(self):
+        """Choose between the plain and the tracked line drawing."""
+        self._tracking = (self._undo_pixels is not None or self._target_ink is not None
+                          or self._zobrist_table is not None or self._distance is not None
+                          or self._occupancy is not None)
+
+    def _draw_tracked(self, x0, y0, x1, y1):
+        """Draw a line, logging the pixels it changes for undo() and the trackers."""
+        start_x, start_y, end_x, end_y = int(round(x0)), int(round(y0)), int(round(x1)), int(round(y1))
+        if self._undo_pixels is not None:
+            # _begin_undo_stroke() made room for the line
+            pixels, values, top = self._undo_pixels, self._undo_values, self._undo_top
+        else:
+            if self._pensize > 1:
+                length = thick_line_bound(x0, y0, x1, y1, self._pensize)
+            else:
+                length = max(abs(end_x - start_x), abs(end_y - start_y))
+            if len(self._changed_pixels) < length:
+                self._changed_pixels = np.empty(2 * length, dtype=np.int64)
+                self._changed_values = np.empty(2 * length, dtype=self._canvas.dtype)
+            pixels, values, top = self._changed_pixels, self._changed_values, 0
+        if self._pensize > 1:
+            end = draw_thick_line_logged(self._canvas, x0, y0, x1, y1, self._pensize, self._pencap,
+                                         self._pen_color, pixels, values, top)
+        else:
+            end = draw_line_logged(self._canvas, start_x, start_y, end_x, end_y, self._pen_color, pixels, values,
+                                   top)
+        if self._undo_pixels is not None:
+            self._undo_top = end
+        self._track_changes(pixels[top:end], values[top:end], np.broadcast_to(self._pen_color, end - top))
+
+    def _track_changes(self, pixels, was, now):
+        """Update the trackers with the canvas transitions pixels/was/now."""
+        if self._target_ink is not None:
+            update_loss(self._target_ink, pixels, was, now, self._loss_counts)
+        if self._zobrist_table is not None:
+            update_zobrist(self._zobrist_table, pixels, was, now, self._zobrist)
+        if self._distance is not None:
+            update_distance(self._canvas, self._distance, pixels, was, now, *self._distance_offsets,
+                            self._distance_radius)
+        if self._occupancy is not None:
+            update_occupancy(self._occupancy, self._occupancy_offsets, self._occupancy_heights,
+                             self._occupancy_shift, self._canvas.shape[1], pixels, was, now)
+
+    def _recount(self):
+        """Recompute the trackers from the whole canvas."""
+        if self._target_ink is not None:
+            count_loss(self._canvas, self._target_ink, self._loss_counts)
+        if self._zobrist_table is not None:
+            self._zobrist[0] = zobrist_hash(self._canvas, self._zobrist_table)
+        if self._distance is not None:
+            count_distance(self._canvas, self._distance, *self._distance_offsets, self._distance_radius)
+        if self._occupancy is not None:
+            count_occupancy(self._canvas, self._occupancy, self._occupancy_offsets, self._occupancy_heights,
+                            self._occupancy_shift)
+
+    def set_target(self, target):
+        """Set the target image of loss().
+
+        Argument:
+        target -- canvas shaped bool array (False is ink) or grayscale
+        image like _get_image_cv2() returns (dark is ink)
+
+        From now on every stroke updates the intersection and union of
+        the drawn and the target pixels, so loss() costs O(1).
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.set_target(cv2.imread("target.png", cv2.IMREAD_GRAYSCALE))
+        >>> turtle.forward(20)
+        >>> turtle.loss()
+        0.97
+        """
+        self._check_trackable()
+        self._target_ink = target_ink(target, self._canvas.shape)
+        self._target_total = int(self._target_ink.sum())
+        self._loss_counts = np.zeros(2, dtype=np.int64)
+        self._recount()
+        self._update_tracking()
+
+    def clear_target(self):
+        """Drop the target image of loss()."""
+        self._target_ink = None
+        self._update_tracking()
+
+    def loss_counts(self):
+        """Return (intersection, union, mismatch) pixel counts of canvas and target."""
+        drawn, intersection = int(self._loss_counts[LOSS_DRAWN]), int(self._loss_counts[LOSS_INTERSECTION])
+        union = drawn + self._target_total - intersection
+        return intersection, union, union - intersection
+
+    def enable_canvas_hash(self, seed=DEFAULT_ZOBRIST_SEED):
+        """Start maintaining a 64-bit zobrist hash of the canvas.
+
+        Optional argument:
+        seed -- seed of the pixel keys, equal seeds give equal hashes
+        for equal drawings
+
+        Every pixel a stroke flips xors its key into the hash, so
+        canvas_hash() never has to read the canvas.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.enable_canvas_hash()
+        >>> turtle.forward(20)
+        >>> turtle.canvas_hash()
+        """
+        self._check_trackable()
+        self._zobrist_table = zobrist_table(self._canvas.shape, seed)
+        self._zobrist = np.zeros(1, dtype=np.uint64)
+        self._recount()
+        self._update_tracking()
+
+    def disable_canvas_hash(self):
+        """Stop maintaining the canvas hash."""
+        self._zobrist_table = None
+        self._update_tracking()
+
+    def canvas_hash(self):
+        """Return the 64-bit hash of the canvas, enable_canvas_hash() first."""
+        return int(self._zobrist[0])
+
+    def state_hash(self):
+        """Return the canvas hash combined with position, heading and pen.
+
+        Keys render caches by drawing and pose without reading the canvas.
+        """
+        state = np.empty(STATE_SIZE)
+        self._get_state(state)
+        return int(self._zobrist[0] ^ pose_hash(state))
+
+    def enable_stroke_distance(self, radius=DEFAULT_DISTANCE_RADIUS):
+        """Start maintaining the distance of every pixel to the nearest stroke.
+
+        Optional argument:
+        radius -- distances are exact below radius and radius beyond
+
+        Every drawn pixel lowers the distances in the disc of radius
+        around it, so a stroke costs its length times the disc area and
+        stroke_distance() is a lookup. Erasing recomputes the distances
+        around the erased pixels only.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.enable_stroke_distance(8)
+        >>> turtle.forward(20)
+        >>> turtle.stroke_distance()
+        0.0
+        """
+        self._check_trackable()
+        self._distance_radius = int(radius)
+        self._distance_offsets = distance_offsets(self._distance_radius)
+        self._distance = np.empty(self._canvas.shape, dtype=np.float32)
+        self._recount()
+        self._update_tracking()
+
+    def disable_stroke_distance(self):
+        """Stop maintaining the stroke distance field."""
+        self._distance = None
+        self._update_tracking()
+
+    def stroke_distance(self, x=None, y=None):
+        """Return the distance from a point to the nearest drawn pixel.
+
+        Optional arguments:
+        x -- a number or a pair of numbers, default the turtle position
+        y -- a number or None
+
+        Capped at the radius of enable_stroke_distance(), points off
+        the canvas are at the radius.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.stroke_distance(10, 20)
+        3.0
+        """
+        if x is None:
+            x, y = self._position[0], self._position[1]
+        elif y is None:
+            x, y = x
+        x, y = int(round(x)), int(round(y))
+        if 0 <= x < self._distance.shape[0] and 0 <= y < self._distance.shape[1]:
+            return float(self._distance[x, y])
+        return float(self._distance_radius)
+
+    def stroke_distance_ahead(self, count, spacing=1.0):
+        """Return the stroke distances of count points along the heading.
+
+        Arguments:
+        count -- number of points
+        spacing (optional) -- distance between two points (default 1)
+
+        The points start spacing ahead of the turtle, useful as a cheap
+        look-ahead sensor.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.stroke_distance_ahead(4, 2.0)
+        array([16., 16., 5., 3.], dtype=float32)
+        """
+        steps = spacing * np.arange(1, count + 1)
+        return self.sample_stroke_distance(self._position[0] + self._orient[0] * steps,
+                                           self._position[1] + self._orient[1] * steps)
+
+    def sample_stroke_distance(self, xs, ys):
+        """Return the stroke distances of the points xs/ys as an array in one native call."""
+        xs = np.asarray(xs, dtype=np.float64)
+        out = np.empty(len(xs), dtype=np.float32)
+        sample_distance(self._distance, xs, np.asarray(ys, dtype=np.float64), self._distance_radius, out)
+        return out
+
+    def enable_occupancy(self, shift=DEFAULT_BLOCK_SHIFT):
+        """Start maintaining the occupancy pyramid of first_hit().
+
+        Optional argument:
+        shift -- the finest blocks are 2**shift pixels a side (default 8)
+
+        Keeps the number of drawn pixels of every block at every level,
+        first_hit() then jumps over empty blocks instead of walking
+        every pixel of them.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.enable_occupancy()
+        """
+        self._check_trackable()
+        self._occupancy_shift = int(shift)
+        self._occupancy, self._occupancy_offsets, self._occupancy_heights = new_pyramid(self._canvas.shape,
+                                                                                         self._occupancy_shift)
+        self._recount()
+        self._update_tracking()
+
+    def disable_occupancy(self):
+        """Stop maintaining the occupancy pyramid."""
+        self._occupancy = None
+        self._update_tracking()
+
+    def first_hit(self, angle=0, max_distance=None):
+        """Return the first drawn pixel along a ray from the turtle.
+
+        Optional arguments:
+        angle -- direction of the ray relative to the heading (default 0)
+        max_distance -- steps along the ray, default to the canvas border
+
+        The ray walks the pixels _get_line_from_current_to_end() visits
+        in the Python navigator, without the turtle's own pixel. Returns
+        (x, y, steps) of the hit or None. Fast on sparse canvases after
+        enable_occupancy(), a plain pixel walk otherwise.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.first_hit()
+        (64, 90, 26)
+        """
+        direction = self._orient.rotate(angle * self._degreesPerAU) if angle else self._orient
+        if self._occupancy is not None:
+            pyramid = self._occupancy, self._occupancy_offsets, self._occupancy_heights, self._occupancy_shift
+        else:
+            pyramid = _NO_PYRAMID
+        hit = np.empty(2, dtype=np.int64)
+        steps = cast_ray(self._canvas, *pyramid, float(self._position[0]), float(self._position[1]),
+                         float(direction[0]), float(direction[1]),
+                         sum(self._canvas.shape) if max_distance is None else int(max_distance), hit)
+        if steps < 0:
+            return None
+        return int(hit[0]), int(hit[1]), steps
+
+    def egocentric_view(self, size, scale=1.0, method=SAMPLE_NEAREST, out=None):
+        """Return the window of the canvas around the turtle, aligned with its heading.
+
+        Arguments:
+        size -- (height, width) of the view, or an int for a square one
+        scale (optional) -- canvas pixels per view pixel
+        method (optional) -- SAMPLE_NEAREST (default) or SAMPLE_BILINEAR
+        out (optional) -- preallocated 2D output, float32 by default
+
+        Row 0 of the view lies ahead of the turtle and column 0 to its
+        left, the turtle is at the center. The view is sampled natively
+        from the canvas values, pixels off the canvas are background.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.egocentric_view(32, 2.0, SAMPLE_BILINEAR).shape
+        (32, 32)
+        """
+        if self._tiled_canvas is not None:
+            raise ValueError("egocentric views sample the dense canvas only")
+        if method not in (SAMPLE_NEAREST, SAMPLE_BILINEAR):
+            raise ValueError("unknown sampling method {!r}".format(method))
+        if out is None:
+            out = np.empty(view_shape(size), dtype=np.float32)
+        sample_view(self._canvas, float(self._position[0]), float(self._position[1]), float(self._orient[0]),
+                    float(self._orient[1]), float(scale), method, view_background(self._canvas), out)
+        return out
+
+    def enable_segment_index(self, cell_shift=DEFAULT_CELL_SHIFT):
+        """Start indexing the drawn segments for intersects() and first_crossing().
+
+        Optional argument:
+        cell_shift -- grid cells are 2**cell_shift pixels a side (default 16)
+
+        Every pen-down move files its segment in a uniform grid, so a
+        crossing query only tests the segments near it. Segments drawn
+        before are not indexed, neither are the strokes of run().
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.enable_segment_index()
+        """
+        self._segment_index = SegmentIndex(self._canvas.shape, cell_shift)
+
+    def disable_segment_index(self):
+        """Stop indexing the drawn segments."""
+        self._segment_index = None
+
+    def intersects(self, segment):
+        """Return where a segment first crosses the drawn path.
+
+        Argument:
+        segment -- pair of points ((x0, y0), (x1, y1))
+
+        Returns the point (x, y) nearest to (x0, y0) shared with an
+        indexed segment, None if there is none. Touching the path only
+        at (x0, y0) does not count, so the next stroke from the turtle
+        position can be tested before drawing it.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.intersects((turtle.pos(), (100, 100)))
+        (70.0, 80.0)
+        """
+        (x0, y0), (x1, y1) = segment
+        crossing = self._segment_index.intersects(x0, y0, x1, y1)
+        return None if crossing is None else crossing[:2]
+
+    def first_crossing(self):
+        """Return (stroke, x, y) of the first indexed stroke that crossed an earlier one.
+
+        stroke counts the pen-down moves since enable_segment_index().
+        None if the path does not cross itself.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.first_crossing()
+        (3, 10.0, 0.0)
+        """
+        return self._segment_index.first_crossing()
+
+    def use_canvas(self, dtype=np.bool_, blend=BLEND_OVERWRITE, color=None):
+        """Replace the canvas by an empty one of another pixel type.
+
+        Optional arguments:
+        dtype -- np.bool_ (default), np.uint8 or np.float32 for
+        intensities, np.uint16/np.uint32 for visit counts
+        blend -- BLEND_OVERWRITE (default), BLEND_MAX or BLEND_ADD, how
+        strokes combine with the pixels, BLEND_ADD saturates
+        color -- pen color, default the dtype maximum, 1 for BLEND_ADD
+        and float canvases
+
+        Numeric canvases start at 0 and every rasterizer, run() included,
+        blends into them directly, so a density map of many trajectories
+        builds in one pass. Undo and the canvas trackers need a bool
+        canvas. Call it before use_tiled_canvas(), the tiles keep the
+        pixel type they were created with.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.use_canvas(np.uint16, BLEND_ADD)
+        >>> turtle.forward(20)
+        >>> turtle.home()
+        >>> turtle.forward(20)
+        >>> turtle._canvas.max()
+        2
+        """
+        dtype = np.dtype(dtype)
+        if blend not in (BLEND_OVERWRITE, BLEND_MAX, BLEND_ADD):
+            raise ValueError("unknown blend mode {!r}".format(blend))
+        if dtype != np.bool_ and self._tracking:
+            raise ValueError("undo and the canvas trackers need a bool canvas")
+        if self._tiled_canvas is not None:
+            raise ValueError("use_canvas() after use_tiled_canvas(), the strokes go to the tiled canvas")
+        shape = self._canvas.shape
+        self._canvas_base = None
+        self._blend = blend
+        self._blend_limit = blend_limit(dtype)
+        if dtype == np.bool_:
+            self._canvas = np.full(shape, True)
+            self._pen_color = False if color is None else bool(color)
+        else:
+            self._canvas = np.zeros(shape, dtype=dtype)
+            if color is None:
+                color = 1 if blend == BLEND_ADD or dtype.kind == "f" else self._blend_limit
+            self._pen_color = dtype.type(color)
+        self._antialias = self._antialias and dtype != np.bool_
+        self._changed_values = np.empty(0, dtype=dtype)
+
+    def subpixel(self, flag=None):
+        """Switch float precision positions on or off.
+
+        Optional argument:
+        flag -- True or False, without it the current setting is returned
+
+        By default every move ends on a whole pixel, so many short steps
+        drift or do not move at all. With subpixel positions the turtle
+        keeps its exact position, lines join the pixels nearest to it and
+        thick, anti-aliased and filled shapes use it as is. circle() then
+        draws correct curves with its default steps instead of thousands.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.subpixel(True)
+        >>> turtle.forward(0.4)
+        >>> turtle.forward(0.4)
+        >>> turtle.position()
+        (64.00, 64.80)
+        """
+        if flag is None:
+            return self._subpixel
+        self._subpixel = bool(flag)
+        if not flag:
+            self._position = Vec2D(int(round(self._position[0])), int(round(self._position[1])))
+
+    def antialias(self, flag=None):
+        """Switch anti-aliased lines and arcs on or off.
+
+        Optional argument:
+        flag -- True or False, without it the current setting is returned
+
+        Lines are drawn by Xiaolin Wu's algorithm and circle() without
+        steps draws a true arc instead of a polygon, both blending their
+        coverage times the pen color into the uint8 or float32 canvas of
+        use_canvas() in one pass. Anti-aliased lines are 1 pixel wide.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.use_canvas(np.float32, BLEND_MAX)
+        >>> turtle.antialias(True)
+        >>> turtle.circle(40)
+        """
+        if flag is None:
+            return self._antialias
+        if flag and self._canvas.dtype == np.bool_:
+            raise ValueError("anti-aliasing needs a numeric canvas, see use_canvas()")
+        if flag and self._tiled_canvas is not None:
+            raise ValueError("the tiled canvas draws aliased 1 pixel lines only")
+        self._antialias = bool(flag)
+
+    def use_tiled_canvas(self, shape=None, tile_shift=DEFAULT_TILE_SHIFT):
+        """Draw into a sparse tiled canvas instead of the dense _canvas.
+
+        Optional arguments:
+        shape -- (width, height) of the drawing area, None for unbounded
+        tile_shift -- tiles are 2**tile_shift pixels a side (default 64)
+
+        Tiles are allocated only where strokes land, so a huge or
+        unbounded drawing costs memory for the drawn area only. Read it
+        with tiled_canvas().window() or tiled_canvas().iter_tiles().
+        Undo, the canvas trackers and run() need the dense canvas.
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.use_tiled_canvas((32768, 32768))
+        >>> turtle.forward(20000)
+        """
+        if self._tracking:
+            raise ValueError("undo and the canvas trackers need the dense canvas")
+        if self._pensize > 1 or self._antialias:
+            raise ValueError("the tiled canvas draws aliased 1 pixel lines only")
+        background = True if self._canvas.dtype == np.bool_ else 0
+        self._tiled_canvas = TiledCanvas(shape, tile_shift, background=background, dtype=self._canvas.dtype,
+                                         blend=self._blend)
+
+    def tiled_canvas(self):
+        """Return the TiledCanvas of use_tiled_canvas(), None with the dense canvas."""
+        return self._tiled_canvas
+
+    def loss(self, kind="iou"):
+        """Return the loss of the canvas against the target image.
+
+        Optional argument:
+        kind -- "iou" for 1 - IoU (default), "l1" for the fraction of
+        mismatching pixels
+
+        Example (for a Turtle instance named turtle):
+        >>> turtle.loss("l1")
+        0.0123
+        """
+        return float(loss_from_counts(self._loss_counts[LOSS_DRAWN], self._loss_counts[LOSS_INTERSECTION],
+                                      self._target_total, self._canvas.size, kind))
     
     def _get_line(self, cor1, cor2):
         """Return a line between two coordinates using bresenham algorithm."""
@@ -611,7 +1563,12 @@ class TNavigator(object):
         return list(bresenham(int(cor1[0]), int(cor1[1]), int(cor2[0]), int(cor2[1])))
     
     def _get_image_cv2(self):
-        uint_img = np.array(self._canvas, dtype = np.uint8)*255
+        canvas = self._canvas if self._tiled_canvas is None else self._tiled_canvas.to_array()
+        if canvas.dtype != np.bool_:
+            # ink on 0, scaled so the most inked pixel is black like the ink of a bool canvas
+            scaled = canvas if canvas.dtype == np.uint8 else (canvas * (255.0 / max(canvas.max(), 1))).astype(np.uint8)
+            return 255 - scaled
+        uint_img = np.array(canvas, dtype = np.uint8)*255
         return uint_img
     
     def _save_image_cv2(self, filename):
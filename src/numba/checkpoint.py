@@ -0,0 +1,156 @@
+import zlib
+import numba as nb
+import numpy as np
+from interpreter import STATE_SIZE
+from raster import CAP_ROUND
+
+CHECKPOINT_MAGIC = b"TNCK"
+CHECKPOINT_VERSION = 3
+FLAG_COMPRESSED = 1
+
+# mode names of the Python navigators, their index is the jitclass mode
+MODES = ["standard", "world", "logo"]
+
+# the header of every version, fields added later are appended
+_HEADER_FIELDS = [
+    ("magic", "S4"), ("version", "<u2"), ("flags", "<u2"),
+    ("state", "<f8", (STATE_SIZE,)),
+    ("mode", "<i4"), ("angle_orient", "<i4"),
+    ("angle_offset", "<f8"), ("fullcircle", "<f8"), ("degrees_per_au", "<f8"),
+    ("pen_color", "<u4"), ("canvas_width", "<u4"), ("canvas_height", "<u4"),
+    ("state_top", "<u4"), ("log_size", "<u8"),
+]
+HEADER_DTYPES = {
+    1: np.dtype(_HEADER_FIELDS),
+    # pensize()
+    2: np.dtype(_HEADER_FIELDS + [("pensize", "<f8"), ("pencap", "<u4")]),
+    # subpixel()
+    3: np.dtype(_HEADER_FIELDS + [("pensize", "<f8"), ("pencap", "<u4"), ("subpixel", "<u1")]),
+}
+HEADER_DTYPE = HEADER_DTYPES[CHECKPOINT_VERSION]
+# restored for the fields an older checkpoint does not have
+HEADER_DEFAULTS = {"pensize": 1.0, "pencap": CAP_ROUND, "subpixel": False}
+
+
+def checkpoint(turtle, compress=True):
+    """Return the complete state of turtle as a bytes buffer.
+
+    Works for the jitclass and the Python navigator. After the header
+    come the forward() log, the used rows of the state stack and the
+    canvas packed to one bit per pixel, zlib compressed if compress.
+    A tiled canvas is not saved, checkpoint() refuses it.
+    """
+    # the jitclass has no tiled backend
+    if getattr(turtle, "_tiled_canvas", None) is not None:
+        raise ValueError("checkpoint() cannot save a tiled canvas, call use_canvas() first")
+    if turtle._canvas.dtype != np.bool_:
+        raise ValueError("checkpoint() packs bool canvases only, not {}".format(turtle._canvas.dtype))
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = CHECKPOINT_MAGIC
+    header["version"] = CHECKPOINT_VERSION
+    header["flags"] = FLAG_COMPRESSED if compress else 0
+    state = np.empty(STATE_SIZE)
+    turtle._get_state(state)
+    header["state"] = state
+    header["mode"] = MODES.index(turtle._mode) if isinstance(turtle._mode, str) else turtle._mode
+    header["angle_orient"] = turtle._angleOrient
+    header["angle_offset"] = turtle._angleOffset
+    header["fullcircle"] = turtle._fullcircle
+    header["degrees_per_au"] = turtle._degreesPerAU
+    header["pen_color"] = turtle._pen_color
+    header["pensize"] = turtle._pensize
+    header["pencap"] = turtle._pencap
+    header["subpixel"] = turtle._subpixel
+    header["canvas_width"] = turtle._canvas.shape[0]
+    header["canvas_height"] = turtle._canvas.shape[1]
+    header["state_top"] = turtle._state_top
+    header["log_size"] = len(turtle._line_lengths)
+
+    payload = b"".join([
+        np.asarray(turtle._line_lengths, dtype="<f8").tobytes(),
+        np.asarray(turtle._angles, dtype="<f8").tobytes(),
+        np.ascontiguousarray(turtle._state_stack[:turtle._state_top], dtype="<f8").tobytes(),
+        np.packbits(turtle._canvas).tobytes(),
+    ])
+    if compress:
+        payload = zlib.compress(payload, 1)
+    return header.tobytes() + payload
+
+
+def _to_log(values, like):
+    """Return values as a list of the type of the log like."""
+    if isinstance(like, list):
+        return values.tolist()
+    log = nb.typed.List.empty_list(nb.float64)
+    log.extend(values)
+    return log
+
+
+def restore(turtle, buffer):
+    """Restore into turtle the state saved by checkpoint().
+
+    Checkpoints of every earlier version are read too, the pen width,
+    cap and sub-pixel mode they lack get their defaults.
+    """
+    prefix = np.frombuffer(buffer[:6], dtype=[("magic", "S4"), ("version", "<u2")])
+    if len(prefix) != 1 or prefix["magic"][0] != CHECKPOINT_MAGIC:
+        raise ValueError("not a turtle checkpoint")
+    version = int(prefix["version"][0])
+    if version not in HEADER_DTYPES:
+        raise ValueError("unsupported checkpoint version {}".format(version))
+    dtype = HEADER_DTYPES[version]
+    header = np.frombuffer(buffer[:dtype.itemsize], dtype=dtype)
+    if len(header) != 1:
+        raise ValueError("truncated turtle checkpoint")
+    header = header[0]
+    fields = dict(HEADER_DEFAULTS)
+    fields.update((name, header[name]) for name in HEADER_DEFAULTS if name in dtype.names)
+    payload = buffer[dtype.itemsize:]
+    if header["flags"] & FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+
+    log_size = int(header["log_size"])
+    state_top = int(header["state_top"])
+    width, height = int(header["canvas_width"]), int(header["canvas_height"])
+    data = np.frombuffer(payload, dtype=np.uint8)
+    offset = 0
+    lengths = data[offset:offset + 8 * log_size].view("<f8")
+    offset += 8 * log_size
+    angles = data[offset:offset + 8 * log_size].view("<f8")
+    offset += 8 * log_size
+    stack = data[offset:offset + 8 * STATE_SIZE * state_top].view("<f8").reshape(state_top, STATE_SIZE)
+    offset += 8 * STATE_SIZE * state_top
+    canvas = np.unpackbits(data[offset:], count=width * height).reshape(width, height).astype(np.bool_)
+
+    mode = int(header["mode"])
+    turtle._mode = MODES[mode] if isinstance(turtle._mode, str) else mode
+    turtle._angleOrient = int(header["angle_orient"])
+    turtle._angleOffset = float(header["angle_offset"])
+    turtle._fullcircle = float(header["fullcircle"])
+    turtle._degreesPerAU = float(header["degrees_per_au"])
+    turtle._pen_color = bool(header["pen_color"])
+    turtle._pensize = float(fields["pensize"])
+    turtle._pencap = int(fields["pencap"])
+    turtle._subpixel = bool(fields["subpixel"])
+    turtle._set_state(np.array(header["state"], dtype=np.float64))
+    turtle._line_lengths = _to_log(lengths, turtle._line_lengths)
+    turtle._angles = _to_log(angles, turtle._angles)
+    if turtle._state_stack.shape[0] < state_top:
+        turtle._state_stack = np.empty((state_top, STATE_SIZE))
+    turtle._state_stack[:state_top] = stack
+    turtle._state_top = state_top
+    if turtle._canvas.shape == canvas.shape:
+        turtle._canvas[:] = canvas
+    else:
+        turtle._canvas = canvas
+    turtle._canvas_width = width
+    turtle._canvas_height = height
+
+
+if __name__ == "__main__":
+    from TNavigator_vecNumba import TNavigator
+
+    turtle = TNavigator()
+    turtle.circle(40)
+    saved = turtle.checkpoint()
+    print("Checkpoint size: {} bytes, canvas size: {} bytes".format(len(saved), turtle._canvas.nbytes))
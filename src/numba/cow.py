@@ -0,0 +1,74 @@
+import os
+import mmap
+import ctypes
+import weakref
+import tempfile
+import numpy as np
+
+# canvases are shared and copied on write in pages, the "tiles" of a fork
+TILE_BYTES = mmap.PAGESIZE
+# smaller canvases are copied, a 128x128 bool canvas is still shared.
+# Mapping a view takes about as long as copying 256 KB, but a fork then
+# only holds the pages it draws into.
+COW_MIN_BYTES = 4 * TILE_BYTES
+
+# the views are mapped with mmap(2) directly, a mapping outlives the
+# descriptor it was made from, mmap.mmap would keep one open per view
+if os.name == "posix":
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _libc.mmap.restype = ctypes.c_void_p
+    _libc.mmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                           ctypes.c_long)
+    _libc.munmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+    _MAP_FAILED = ctypes.c_void_p(-1).value
+else:
+    _libc = None
+
+
+def freeze(canvas):
+    """Return an anonymous file holding a copy of canvas.
+
+    The file is never written again, so any number of copy-on-write
+    views can be mapped from it.
+    """
+    if hasattr(os, "memfd_create"):
+        base = os.fdopen(os.memfd_create("tnavigator-canvas"), "w+b")
+    else:
+        base = tempfile.TemporaryFile()
+    base.write(np.ascontiguousarray(canvas).data)
+    base.flush()
+    return base
+
+
+def _unmap(address, size):
+    _libc.munmap(ctypes.c_void_p(address), ctypes.c_size_t(size))
+
+
+def cow_view(base, shape, dtype):
+    """Return a writable array mapped copy-on-write from the frozen base.
+
+    Views share the pages of base until they write to them, then only
+    the written page is copied. On POSIX a view holds no file
+    descriptor, the pages are unmapped when the array is collected.
+    """
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if _libc is None:
+        # mmap.mmap keeps a duplicate of the descriptor per view
+        data = mmap.mmap(base.fileno(), 0, access=mmap.ACCESS_COPY)
+        return np.frombuffer(data, dtype=dtype).reshape(shape)
+    address = _libc.mmap(None, size, mmap.PROT_READ | mmap.PROT_WRITE, mmap.MAP_PRIVATE, base.fileno(), 0)
+    if address is None or address == _MAP_FAILED:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    data = (ctypes.c_char * size).from_address(address)
+    weakref.finalize(data, _unmap, address, size)
+    return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+
+if __name__ == "__main__":
+    import timeit
+
+    canvas = np.full((4096, 4096), True)
+    base = freeze(canvas)
+    print("Time taken per canvas copy (in seconds): {}".format(timeit.timeit(lambda: canvas.copy(), number=100) / 100))
+    print("Time taken per copy-on-write view (in seconds): {}".format(timeit.timeit(lambda: cow_view(base, canvas.shape, canvas.dtype), number=100) / 100))
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import numba as nb
+import numpy as np
+import constants
+from progfile import ProgramWriter, ProgramFile
+from randprog import program_params, seed_streams, generate_and_render
+
+# Layout of a dataset directory:
+#   manifest.json             settings of the run, checked on resume
+#   progress.json             numbers of the finished shards
+#   shard_NNNNN.npy           (n, width, height) bool canvas stack
+#   shard_NNNNN.tnav          the n programs, a progfile program file
+#   shard_NNNNN.tnav.idx      its program index
+#   shard_NNNNN.meta.npy      n META_DTYPE records
+# Sample i is stream i of the seed, so a shard renders the same images
+# whichever worker builds it. A shard counts as finished only once it
+# is listed in progress.json, unfinished shards are built again.
+MANIFEST = "manifest.json"
+PROGRESS = "progress.json"
+DEFAULT_SHARD_SIZE = 1000
+DEFAULT_BATCH = 256
+DEFAULT_LENGTH = 64
+# forking a process whose native threading layer is running deadlocks the
+# children, the workers are started fresh instead
+START_METHOD = "spawn"
+META_DTYPE = np.dtype([("stream", "<u8"), ("ink", "<u4"), ("length", "<u4")])
+
+# images rendered by all workers, set by _init_worker()
+_rendered = None
+
+
+def shard_path(directory, shard, suffix):
+    return os.path.join(directory, "shard_{:05d}{}".format(shard, suffix))
+
+
+def _write_json(filename, data):
+    """Replace filename by data atomically, an interrupted write leaves the old file."""
+    with open(filename + ".tmp", "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(filename + ".tmp", filename)
+
+
+def _init_worker(rendered):
+    global _rendered
+    _rendered = rendered
+    # the processes already use every core
+    nb.set_num_threads(1)
+
+
+def build_shard(directory, manifest, shard):
+    """Render shard of the dataset in directory and write its files, returns shard."""
+    first = shard * manifest["shard_size"]
+    count = min(manifest["shard_size"], manifest["count"] - first)
+    width, height = manifest["shape"]
+    length = manifest["length"]
+    params = np.array(manifest["params"])
+    start = np.array([constants.start_x, constants.start_y, 0.0, 1.0])
+    canvases = np.lib.format.open_memmap(shard_path(directory, shard, ".npy"), mode="w+", dtype=np.bool_,
+                                         shape=(count, width, height))
+    meta = np.zeros(count, dtype=META_DTYPE)
+    ops = np.empty((manifest["batch"], length), dtype=np.int8)
+    args = np.empty((manifest["batch"], length))
+    with ProgramWriter(shard_path(directory, shard, ".tnav")) as writer:
+        for lo in range(0, count, manifest["batch"]):
+            hi = min(lo + manifest["batch"], count)
+            batch = canvases[lo:hi].view(np.ndarray)
+            batch[:] = True
+            generate_and_render(batch, seed_streams(manifest["seed"], first + lo, hi - lo), params, start,
+                                ops[:hi - lo], args[:hi - lo])
+            for k in range(hi - lo):
+                writer.write_program(ops[k], args[k])
+            meta["stream"][lo:hi] = np.arange(first + lo, first + hi)
+            meta["ink"][lo:hi] = (~batch).sum(axis=(1, 2))
+            meta["length"][lo:hi] = length
+            if _rendered is not None:
+                with _rendered.get_lock():
+                    _rendered.value += hi - lo
+    canvases.flush()
+    del canvases
+    np.save(shard_path(directory, shard, ".meta.npy"), meta)
+    return shard
+
+
+def _build_shard(task):
+    return build_shard(*task)
+
+
+def build_dataset(directory, count, seed=0, shard_size=DEFAULT_SHARD_SIZE, length=DEFAULT_LENGTH,
+                  shape=(128, 128), params=None, batch=DEFAULT_BATCH, workers=None, report=sys.stderr):
+    """Render count random programs into a sharded dataset in directory.
+
+    Resumes an interrupted run with the same settings, the finished
+    shards are kept. Throughput is written to report while rendering,
+    None for silence. Returns the number of shards.
+    """
+    if params is None:
+        params = program_params()
+    manifest = {"count": int(count), "seed": int(seed), "shard_size": int(shard_size), "length": int(length),
+                "shape": [int(shape[0]), int(shape[1])], "params": [float(p) for p in params],
+                "batch": int(batch)}
+    os.makedirs(directory, exist_ok=True)
+    manifest_file = os.path.join(directory, MANIFEST)
+    progress_file = os.path.join(directory, PROGRESS)
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as f:
+            old = json.load(f)
+        # the batch size does not change the images
+        if {k: v for k, v in old.items() if k != "batch"} != {k: v for k, v in manifest.items() if k != "batch"}:
+            raise ValueError("{} holds a dataset with other settings".format(directory))
+    else:
+        _write_json(manifest_file, manifest)
+    finished = set()
+    if os.path.exists(progress_file):
+        with open(progress_file) as f:
+            finished = set(json.load(f)["finished"])
+    shards = (manifest["count"] + manifest["shard_size"] - 1) // manifest["shard_size"]
+    todo = [shard for shard in range(shards) if shard not in finished]
+    total = sum(min(manifest["shard_size"], manifest["count"] - shard * manifest["shard_size"]) for shard in todo)
+    context = multiprocessing.get_context(START_METHOD)
+    rendered = context.Value("q", 0)
+    started = time.time()
+
+    def show(end="\r"):
+        if report is not None:
+            elapsed = max(time.time() - started, 1e-9)
+            report.write("{}/{} shards, {}/{} images, {:.0f} images/sec{}".format(
+                len(finished), shards, rendered.value, total, rendered.value / elapsed, end))
+            report.flush()
+
+    with context.Pool(workers, initializer=_init_worker, initargs=(rendered,)) as pool:
+        results = pool.imap_unordered(_build_shard, [(directory, manifest, shard) for shard in todo])
+        for _ in todo:
+            while True:
+                try:
+                    shard = results.next(timeout=0.5)
+                    break
+                except multiprocessing.TimeoutError:
+                    show()
+            finished.add(shard)
+            _write_json(progress_file, {"finished": sorted(finished)})
+            show()
+    show("\n")
+    return shards
+
+
+def load_shard(directory, shard):
+    """Return (canvases, programs, meta) of a shard, the canvases and programs memory-mapped."""
+    return (np.load(shard_path(directory, shard, ".npy"), mmap_mode="r"),
+            ProgramFile(shard_path(directory, shard, ".tnav")),
+            np.load(shard_path(directory, shard, ".meta.npy")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render random turtle programs into a sharded dataset.")
+    parser.add_argument("directory", help="output directory, an interrupted run in it is resumed")
+    parser.add_argument("--count", type=int, default=10000, help="number of images")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="images per shard")
+    parser.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="opcodes per program")
+    parser.add_argument("--width", type=int, default=128)
+    parser.add_argument("--height", type=int, default=128)
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="images rendered per native call")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per core")
+    parser.add_argument("--forward", type=float, default=0.6, help="frequency of forward")
+    parser.add_argument("--move", type=float, default=0.05, help="frequency of pen-up moves")
+    parser.add_argument("--turn", type=float, default=0.3, help="frequency of turns")
+    parser.add_argument("--penup", type=float, default=0.025, help="frequency of penup")
+    parser.add_argument("--pendown", type=float, default=0.025, help="frequency of pendown")
+    parser.add_argument("--min-distance", type=float, default=1.0)
+    parser.add_argument("--max-distance", type=float, default=10.0)
+    parser.add_argument("--min-turn", type=float, default=0.0, help="degrees")
+    parser.add_argument("--max-turn", type=float, default=180.0, help="degrees")
+    parser.add_argument("--turn-step", type=float, default=0.0, help="round turns to multiples, 0 for none")
+    options = parser.parse_args(argv)
+    params = program_params(options.forward, options.move, options.turn, options.penup, options.pendown,
+                            options.min_distance, options.max_distance, options.min_turn, options.max_turn,
+                            options.turn_step)
+    try:
+        build_dataset(options.directory, options.count, options.seed, options.shard_size, options.length,
+                      (options.width, options.height), params, options.batch, options.workers)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+import numpy as np
+from interpreter import STATE_SIZE
+
+DEFAULT_STRIDE = 32
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+class _Snapshot(object):
+    """Pose, pen, state stack and canvas of a navigator."""
+    __slots__ = ("state", "stack", "canvas")
+
+    def __init__(self, turtle):
+        self.state = np.empty(STATE_SIZE)
+        turtle._get_state(self.state)
+        self.stack = turtle._state_stack[:turtle._state_top].copy()
+        self.canvas = turtle._canvas.copy()
+
+    @property
+    def nbytes(self):
+        return self.state.nbytes + self.stack.nbytes + self.canvas.nbytes
+
+    def restore(self, turtle):
+        turtle._set_state(self.state)
+        turtle._state_stack[:len(self.stack)] = self.stack
+        turtle._state_top = len(self.stack)
+        turtle._canvas[:] = self.canvas
+        # the trackers follow the restored canvas, the strokes before it cannot be undone
+        if hasattr(turtle, "_canvas_replaced"):
+            turtle._canvas_replaced()
+
+
+class _Node(object):
+    """Trie node, the path from the root spells a program prefix."""
+    __slots__ = ("parent", "key", "children", "snapshot")
+
+    def __init__(self, parent, key):
+        self.parent = parent
+        self.key = key
+        self.children = {}
+        self.snapshot = None
+
+
+class PrefixCache(object):
+    """Evaluation cache of programs sharing prefixes.
+
+    Programs are cut into blocks of stride opcodes and stored in a trie
+    of blocks. After every block the navigator is snapshotted, so a new
+    program resumes from the snapshot of its longest cached prefix and
+    only executes the rest. Snapshots are evicted least recently used
+    first once they take more than max_bytes.
+
+    Example:
+    >>> cache = PrefixCache(TNavigator)
+    >>> turtle = cache.evaluate(ops, args)
+    >>> cache.hit_rate
+    """
+    def __init__(self, factory, stride=DEFAULT_STRIDE, max_bytes=DEFAULT_MAX_BYTES):
+        """Arguments:
+        factory -- callable returning a fresh navigator, e.g. TNavigator
+        stride (optional) -- opcodes between two snapshots
+        max_bytes (optional) -- memory bound of the snapshots
+        """
+        self._factory = factory
+        self.stride = stride
+        self.max_bytes = max_bytes
+        self._root = _Node(None, None)
+        self._lru = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.ops_executed = 0
+        self.ops_saved = 0
+
+    def _key(self, ops, args, start):
+        end = start + self.stride
+        return ops[start:end].tobytes() + args[start:end].tobytes()
+
+    def evaluate(self, ops, args):
+        """Return a fresh navigator that has executed the program ops/args."""
+        turtle = self._factory()
+        n = len(ops)
+
+        # longest cached prefix
+        node, done = self._root, 0
+        best, best_done = self._root, 0
+        while done + self.stride <= n:
+            node = node.children.get(self._key(ops, args, done))
+            if node is None:
+                break
+            done += self.stride
+            if node.snapshot is not None:
+                best, best_done = node, done
+        if best is not self._root:
+            best.snapshot.restore(turtle)
+            self._lru.move_to_end(best)
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.ops_saved += best_done
+        self.ops_executed += n - best_done
+
+        # execute the rest, snapshotting every new block
+        node, done = best, best_done
+        while done + self.stride <= n:
+            turtle.run(ops[done:done + self.stride], args[done:done + self.stride])
+            key = self._key(ops, args, done)
+            done += self.stride
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _Node(node, key)
+            if child.snapshot is None:
+                self._store(child, turtle)
+            else:
+                self._lru.move_to_end(child)
+            node = child
+        if done < n:
+            turtle.run(ops[done:], args[done:])
+        return turtle
+
+    def _store(self, node, turtle):
+        node.snapshot = _Snapshot(turtle)
+        self.nbytes += node.snapshot.nbytes
+        self._lru[node] = None
+        while self.nbytes > self.max_bytes and self._lru:
+            self._evict(self._lru.popitem(last=False)[0])
+
+    def _evict(self, node):
+        self.nbytes -= node.snapshot.nbytes
+        node.snapshot = None
+        # drop the branch up to the first node still holding something
+        while node.parent is not None and node.snapshot is None and not node.children:
+            del node.parent.children[node.key]
+            node = node.parent
+
+    @property
+    def hit_rate(self):
+        """Fraction of evaluations resumed from a cached prefix."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """Return the cache statistics as a dict."""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate,
+                "ops_executed": self.ops_executed, "ops_saved": self.ops_saved,
+                "snapshots": len(self._lru), "bytes": self.nbytes}
+
+    def clear(self):
+        """Drop all snapshots, the statistics are kept."""
+        self._root = _Node(None, None)
+        self._lru.clear()
+        self.nbytes = 0
+
+
+if __name__ == "__main__":
+    import time
+    from interpreter import new_program, OP_FORWARD, OP_LEFT
+    from TNavigator_vecNumba import TNavigator
+
+    # mutate the tail of a parent program, as an evolutionary search does
+    rng = np.random.default_rng(0)
+    ops, args = new_program(2048)
+    ops[:] = rng.choice([OP_FORWARD, OP_LEFT], len(ops))
+    args[:] = rng.uniform(1, 10, len(ops))
+    cache = PrefixCache(TNavigator)
+    start = time.time()
+    for _ in range(200):
+        child = args.copy()
+        cut = rng.integers(len(ops) // 2, len(ops))
+        child[cut:] = rng.uniform(1, 10, len(ops) - cut)
+        cache.evaluate(ops, child)
+    print("Evaluated 200 programs in {} seconds: {}".format(time.time() - start, cache.stats()))
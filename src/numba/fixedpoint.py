@@ -0,0 +1,338 @@
+import numba as nb
+import numpy as np
+import constants
+from raster import draw_line, BLEND_OVERWRITE
+from interpreter import OP_FORWARD, OP_MOVE, OP_LEFT, OP_RIGHT, OP_PUSH, OP_POP, OP_PENUP, OP_PENDOWN
+
+# Fixed-point turtle: positions are int64 with FRACTION_BITS fraction
+# bits, the heading is an index into sin/cos tables with TABLE_BITS
+# fraction bits and resolution entries per full turn. Turning adds to
+# the index, stepping multiplies the distance by a table entry, so every
+# machine and both the Python and the compiled code compute the same bits.
+
+FRACTION_BITS = 16
+TABLE_BITS = 30
+DEFAULT_RESOLUTION = 3600
+# longest single step in pixels, keeps distance * table entry in int64
+MAX_STEP = 1 << 15
+DEFAULT_STACK_SIZE = 1024
+
+# layout of the int64 pose vector shared by the kernels and the stack rows
+FSTATE_X = 0
+FSTATE_Y = 1
+FSTATE_HEADING = 2
+FSTATE_PEN = 3
+FSTATE_SIZE = 4
+
+# sin/cos tables by resolution, shared by all navigators
+_tables = {}
+# the tables are computed with GUARD extra bits, then rounded
+_GUARD = 32
+
+
+def _atan_inverse(x, one):
+    """Return atan(1/x) * one by its integer series."""
+    power = one // x
+    total = power
+    n = 1
+    while power:
+        power //= x * x
+        n += 2
+        total += (power // n) if n % 4 == 1 else -(power // n)
+    return total
+
+
+def _cos_sin(angle, one):
+    """Return cos and sin of angle / one, times one, by their integer series."""
+    c = term_c = one
+    s = term_s = angle
+    k = 1
+    while term_c or term_s:
+        term_c = -term_c * angle // one * angle // one // ((2 * k - 1) * (2 * k))
+        term_s = -term_s * angle // one * angle // one // ((2 * k) * (2 * k + 1))
+        c += term_c
+        s += term_s
+        k += 1
+    return c, s
+
+
+def sincos_table(resolution=DEFAULT_RESOLUTION):
+    """Return the (cos, sin) int64 tables of the headings 2*pi*k/resolution.
+
+    The entries have TABLE_BITS fraction bits. They are computed with
+    Python integers only, no floating point, so they are identical on
+    every machine.
+    """
+    if resolution <= 0 or resolution % 4:
+        raise ValueError("the resolution must be a positive multiple of 4, not {}".format(resolution))
+    if resolution not in _tables:
+        one = 1 << (TABLE_BITS + _GUARD)
+        pi = 16 * _atan_inverse(5, one) - 4 * _atan_inverse(239, one)
+        cos_table = np.empty(resolution, dtype=np.int64)
+        sin_table = np.empty(resolution, dtype=np.int64)
+        half = 1 << (_GUARD - 1)
+        for k in range(resolution):
+            # nearest quarter turn q and the rest within +-45 degrees
+            q = (8 * k + resolution) // (2 * resolution)
+            c, s = _cos_sin(pi * (4 * k - q * resolution) // (2 * resolution), one)
+            c, s = ((c, s), (-s, c), (-c, -s), (s, -c))[q % 4]
+            cos_table[k] = (c + half) >> _GUARD
+            sin_table[k] = (s + half) >> _GUARD
+        _tables[resolution] = (cos_table, sin_table)
+    return _tables[resolution]
+
+
+def to_fixed(value):
+    """Return a number of pixels as a fixed-point int64, works elementwise on arrays."""
+    return np.rint(np.asarray(value, dtype=np.float64) * (1 << FRACTION_BITS)).astype(np.int64)
+
+
+def turn_steps(angle, resolution=DEFAULT_RESOLUTION, degrees_per_au=1.0):
+    """Return an angle as a number of heading steps, works elementwise on arrays."""
+    return np.rint(np.asarray(angle, dtype=np.float64) * degrees_per_au * resolution / 360.0).astype(np.int64)
+
+
+@nb.njit(cache=True, nogil=True)
+def _fix_args(ops, args, resolution, degrees_per_au, out):
+    for i in range(ops.shape[0]):
+        op = ops[i]
+        if op == OP_FORWARD or op == OP_MOVE:
+            if abs(args[i]) >= MAX_STEP:
+                return False
+            out[i] = np.int64(np.rint(args[i] * (1 << FRACTION_BITS)))
+        elif op == OP_LEFT or op == OP_RIGHT:
+            out[i] = np.int64(np.rint(args[i] * degrees_per_au * resolution / 360.0)) % resolution
+        else:
+            out[i] = 0
+    return True
+
+
+def compile_fixed(ops, args, resolution=DEFAULT_RESOLUTION, degrees_per_au=1.0):
+    """Return the int64 arguments of the program ops/args for execute_fixed().
+
+    Distances become fixed-point pixels and turns heading steps in
+    [0, resolution), like to_fixed() and turn_steps(). The conversion is
+    the only floating point of a fixed-point run.
+    """
+    fixed = np.empty(len(args), dtype=np.int64)
+    if not _fix_args(np.asarray(ops, dtype=np.int8), np.asarray(args, dtype=np.float64), resolution,
+                     float(degrees_per_au), fixed):
+        raise ValueError("steps of {} pixels or more do not fit the fixed-point kernel".format(MAX_STEP))
+    return fixed
+
+
+@nb.njit(cache=True, nogil=True, inline="always")
+def _pixel(v):
+    """Round a fixed-point coordinate to its pixel, halves up."""
+    return (v + (1 << (FRACTION_BITS - 1))) >> FRACTION_BITS
+
+
+@nb.njit(cache=True, nogil=True, inline="always")
+def _step(v, distance, entry):
+    return v + ((distance * entry + (1 << (TABLE_BITS - 1))) >> TABLE_BITS)
+
+
+@nb.njit(cache=True, nogil=True)
+def move_fixed(canvas, color, state, distance, draw, cos_table, sin_table, mode=BLEND_OVERWRITE, limit=1):
+    """Move the pose in state by the fixed-point distance, drawing the line if draw and the pen is down."""
+    heading = state[FSTATE_HEADING]
+    x = _step(state[FSTATE_X], distance, cos_table[heading])
+    y = _step(state[FSTATE_Y], distance, sin_table[heading])
+    if draw and state[FSTATE_PEN] != 0:
+        draw_line(canvas, _pixel(state[FSTATE_X]), _pixel(state[FSTATE_Y]), _pixel(x), _pixel(y), color, mode,
+                  limit)
+    state[FSTATE_X] = x
+    state[FSTATE_Y] = y
+
+
+@nb.njit(cache=True, nogil=True)
+def execute_fixed(canvas, color, state, ops, args, stack, sp, cos_table, sin_table, mode=BLEND_OVERWRITE, limit=1):
+    """Run the opcodes ops with the int64 arguments of compile_fixed() on canvas.
+
+    Like interpreter.execute() with the int64 pose vector of FSTATE_*,
+    turning and stepping are integer arithmetic only. Turns must be in
+    [0, resolution). state is updated in place and the new stack depth
+    is returned.
+    """
+    resolution = cos_table.shape[0]
+    x = state[FSTATE_X]
+    y = state[FSTATE_Y]
+    heading = state[FSTATE_HEADING]
+    pen = state[FSTATE_PEN]
+    for i in range(ops.shape[0]):
+        op = ops[i]
+        if op == OP_FORWARD or op == OP_MOVE:
+            ex = _step(x, args[i], cos_table[heading])
+            ey = _step(y, args[i], sin_table[heading])
+            if op == OP_FORWARD and pen != 0:
+                draw_line(canvas, _pixel(x), _pixel(y), _pixel(ex), _pixel(ey), color, mode, limit)
+            x = ex
+            y = ey
+        elif op == OP_LEFT:
+            heading += args[i]
+            if heading >= resolution:
+                heading -= resolution
+        elif op == OP_RIGHT:
+            heading -= args[i]
+            if heading < 0:
+                heading += resolution
+        elif op == OP_PUSH:
+            if sp >= stack.shape[0]:
+                raise IndexError("turtle state stack overflow")
+            stack[sp, FSTATE_X] = x
+            stack[sp, FSTATE_Y] = y
+            stack[sp, FSTATE_HEADING] = heading
+            stack[sp, FSTATE_PEN] = pen
+            sp += 1
+        elif op == OP_POP:
+            if sp <= 0:
+                raise IndexError("turtle state stack underflow")
+            sp -= 1
+            x = stack[sp, FSTATE_X]
+            y = stack[sp, FSTATE_Y]
+            heading = stack[sp, FSTATE_HEADING]
+            pen = stack[sp, FSTATE_PEN]
+        elif op == OP_PENUP:
+            pen = 0
+        elif op == OP_PENDOWN:
+            pen = 1
+    state[FSTATE_X] = x
+    state[FSTATE_Y] = y
+    state[FSTATE_HEADING] = heading
+    state[FSTATE_PEN] = pen
+    return sp
+
+
+class FixedNavigator(object):
+    """Turtle navigator with a fixed-point integer pose.
+
+    Position and heading are integers, rotations come from a sin/cos
+    table of resolution headings per full turn, so angles are rounded
+    to 360/resolution degrees. Drawings are bit-identical on every
+    machine, between the methods and run(), and never drift.
+
+    Example:
+    >>> turtle = FixedNavigator(resolution=360)
+    >>> turtle.forward(20)
+    >>> turtle.left(90)
+    >>> turtle.position()
+    (64.0, 84.0)
+    """
+    def __init__(self, resolution=DEFAULT_RESOLUTION, shape=(128, 128), stack_size=DEFAULT_STACK_SIZE):
+        """Arguments:
+        resolution (optional) -- headings per full turn, a multiple of 4
+        shape (optional) -- (width, height) of the canvas
+        stack_size (optional) -- depth of the state stack
+        """
+        self.resolution = int(resolution)
+        self._cos, self._sin = sincos_table(self.resolution)
+        self._canvas = np.full(shape, True)
+        self._pen_color = False
+        self._state = np.empty(FSTATE_SIZE, dtype=np.int64)
+        self._state_stack = np.empty((stack_size, FSTATE_SIZE), dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        """Move to the start position heading up with the pen down and an empty stack."""
+        self._state[FSTATE_X] = constants.start_x << FRACTION_BITS
+        self._state[FSTATE_Y] = constants.start_y << FRACTION_BITS
+        self._state[FSTATE_HEADING] = self.resolution // 4
+        self._state[FSTATE_PEN] = 1
+        self._state_top = 0
+
+    def _move(self, distance, draw):
+        if abs(distance) >= MAX_STEP:
+            raise ValueError("steps of {} pixels or more do not fit the fixed-point kernel".format(MAX_STEP))
+        move_fixed(self._canvas, self._pen_color, self._state, to_fixed(distance), draw, self._cos, self._sin)
+
+    def forward(self, distance):
+        """Move the turtle forward by distance pixels, drawing if the pen is down."""
+        self._move(distance, True)
+
+    def back(self, distance):
+        """Move the turtle backward by distance pixels, drawing if the pen is down."""
+        self._move(-distance, True)
+
+    def move(self, distance):
+        """Move the turtle forward by distance pixels without drawing."""
+        self._move(distance, False)
+
+    def left(self, angle):
+        """Turn the turtle left by angle degrees, rounded to the resolution."""
+        self._state[FSTATE_HEADING] = (self._state[FSTATE_HEADING] + turn_steps(angle, self.resolution)) % \
+            self.resolution
+
+    def right(self, angle):
+        """Turn the turtle right by angle degrees, rounded to the resolution."""
+        self.left(-angle)
+
+    def penup(self):
+        self._state[FSTATE_PEN] = 0
+
+    def pendown(self):
+        self._state[FSTATE_PEN] = 1
+
+    def isdown(self):
+        return bool(self._state[FSTATE_PEN])
+
+    def position(self):
+        """Return the exact position as a pair of floats."""
+        return (int(self._state[FSTATE_X]) / (1 << FRACTION_BITS), int(self._state[FSTATE_Y]) / (1 << FRACTION_BITS))
+
+    def pixel(self):
+        """Return the pixel the turtle is on."""
+        return int(_pixel(self._state[FSTATE_X])), int(_pixel(self._state[FSTATE_Y]))
+
+    def heading(self):
+        """Return the heading in degrees, counterclockwise from the x axis."""
+        return int(self._state[FSTATE_HEADING]) * 360.0 / self.resolution
+
+    def push_state(self):
+        """Save the pose on the state stack."""
+        if self._state_top >= len(self._state_stack):
+            raise IndexError("turtle state stack overflow")
+        self._state_stack[self._state_top] = self._state
+        self._state_top += 1
+
+    def pop_state(self):
+        """Restore the pose saved last by push_state()."""
+        if self._state_top <= 0:
+            raise IndexError("turtle state stack underflow")
+        self._state_top -= 1
+        self._state[:] = self._state_stack[self._state_top]
+
+    def run(self, ops, args, degrees_per_au=1.0):
+        """Execute a compiled program natively, see TNavigator.run().
+
+        args are the float64 arguments of the program, turns are in
+        units of degrees_per_au degrees.
+        """
+        fixed = compile_fixed(ops, args, self.resolution, degrees_per_au)
+        self._state_top = execute_fixed(self._canvas, self._pen_color, self._state, np.asarray(ops, dtype=np.int8),
+                                        fixed, self._state_stack, self._state_top, self._cos, self._sin)
+
+    def _get_image_cv2(self):
+        return np.array(self._canvas, dtype=np.uint8) * 255
+
+
+if __name__ == "__main__":
+    import time
+    import hashlib
+    from lsystem import LSystem
+    from TNavigator_vecNumba import TNavigator
+
+    plant = LSystem("X", {"X": "F+[[X]-X]-F[-FX]+X", "F": "FF"}, angle=25, step=1)
+    ops, args = plant.compile(7)
+    for label, factory in (("float", TNavigator), ("fixed-point", FixedNavigator)):
+        turtle = factory()
+        turtle.run(ops, args)
+        turtle = factory()
+        start = time.time()
+        turtle.run(ops, args)
+        print("{}: {} seconds, canvas {}".format(label, time.time() - start,
+                                                 hashlib.blake2b(turtle._canvas.tobytes(), digest_size=8).hexdigest()))
+    turtle = FixedNavigator()
+    for _ in range(3600):
+        turtle.forward(1)
+        turtle.left(0.1)
+    print("Position after 3600 steps of a 1 pixel polygon: {}".format(turtle.position()))
@@ -0,0 +1,105 @@
+import math
+import numba as nb
+import numpy as np
+from raster import draw_line, draw_thick_line, CAP_ROUND, BLEND_OVERWRITE
+
+# opcodes of a compiled turtle program, one float64 argument per opcode
+OP_NOP = 0
+OP_FORWARD = 1
+OP_MOVE = 2
+OP_LEFT = 3
+OP_RIGHT = 4
+OP_PUSH = 5
+OP_POP = 6
+OP_PENUP = 7
+OP_PENDOWN = 8
+
+# layout of the float64 pose vector shared by the kernels and the stack rows
+STATE_X = 0
+STATE_Y = 1
+STATE_ORIENT_X = 2
+STATE_ORIENT_Y = 3
+STATE_PEN = 4
+STATE_SIZE = 5
+
+
+def new_program(size):
+    """Return empty (ops, args) arrays for a program of size opcodes."""
+    return np.zeros(size, dtype=np.int8), np.zeros(size, dtype=np.float64)
+
+
+@nb.njit(cache=True, nogil=True)
+def execute(canvas, color, state, ops, args, stack, sp, degrees_per_au, width=1.0, cap=CAP_ROUND,
+            mode=BLEND_OVERWRITE, limit=1, subpixel=False):
+    """Run the opcodes ops/args on canvas starting from the pose in state.
+
+    Movement follows TNavigator: end points are rounded to whole pixels,
+    with subpixel they are kept exact and lines join the nearest pixels,
+    turns rotate the orientation vector by arg*degrees_per_au degrees.
+    OP_PUSH/OP_POP save and restore the pose in the rows of stack, sp is
+    the current stack depth. state is updated in place and the new stack
+    depth is returned, so a long program can be executed chunk by chunk.
+    Strokes wider than one pixel are drawn by draw_thick_line(), mode and
+    limit blend the strokes into canvas like draw_line().
+    """
+    x = state[STATE_X]
+    y = state[STATE_Y]
+    ox = state[STATE_ORIENT_X]
+    oy = state[STATE_ORIENT_Y]
+    pen = state[STATE_PEN]
+    # L-systems turn by the same angle over and over, keep its sin/cos
+    last_angle = 0.0
+    c = 1.0
+    s = 0.0
+    for i in range(ops.shape[0]):
+        op = ops[i]
+        if op == OP_FORWARD or op == OP_MOVE:
+            ex = x + ox * args[i]
+            ey = y + oy * args[i]
+            if not subpixel:
+                ex = float(round(ex))
+                ey = float(round(ey))
+            if op == OP_FORWARD and pen != 0.0:
+                if width > 1.0:
+                    draw_thick_line(canvas, x, y, ex, ey, width, cap, color, mode, limit)
+                else:
+                    draw_line(canvas, int(round(x)), int(round(y)), int(round(ex)), int(round(ey)), color, mode,
+                              limit)
+            x = ex
+            y = ey
+        elif op == OP_LEFT or op == OP_RIGHT:
+            angle = args[i] if op == OP_LEFT else -args[i]
+            if angle != last_angle:
+                last_angle = angle
+                rad = angle * degrees_per_au * math.pi / 180.0
+                c = math.cos(rad)
+                s = math.sin(rad)
+            ox, oy = ox * c - oy * s, oy * c + ox * s
+        elif op == OP_PUSH:
+            if sp >= stack.shape[0]:
+                raise IndexError("turtle state stack overflow")
+            stack[sp, STATE_X] = x
+            stack[sp, STATE_Y] = y
+            stack[sp, STATE_ORIENT_X] = ox
+            stack[sp, STATE_ORIENT_Y] = oy
+            stack[sp, STATE_PEN] = pen
+            sp += 1
+        elif op == OP_POP:
+            if sp <= 0:
+                raise IndexError("turtle state stack underflow")
+            sp -= 1
+            x = stack[sp, STATE_X]
+            y = stack[sp, STATE_Y]
+            ox = stack[sp, STATE_ORIENT_X]
+            oy = stack[sp, STATE_ORIENT_Y]
+            pen = stack[sp, STATE_PEN]
+        elif op == OP_PENUP:
+            pen = 0.0
+        elif op == OP_PENDOWN:
+            pen = 1.0
+    state[STATE_X] = x
+    state[STATE_Y] = y
+    state[STATE_ORIENT_X] = ox
+    state[STATE_ORIENT_Y] = oy
+    state[STATE_PEN] = pen
+    return sp
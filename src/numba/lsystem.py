@@ -0,0 +1,202 @@
+import numba as nb
+import numpy as np
+from interpreter import (new_program, OP_NOP, OP_FORWARD, OP_MOVE, OP_LEFT, OP_RIGHT,
+                         OP_PUSH, OP_POP, STATE_SIZE)
+
+# number of symbols of an L-system alphabet (one byte per symbol)
+ALPHABET_SIZE = 256
+NO_RULE = -1
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+@nb.njit(cache=True)
+def _expand(axiom, rule_start, rule_len, rule_body, sym_op, sym_arg, depth, frames, cursor, ops, args):
+    """Expand the L-system depth first into ops/args until they are full.
+
+    frames[level] holds (offset, remaining) of the word being read at each
+    level of the expansion, level 0 is the axiom and level k > 0 a rule
+    body. cursor[0] is the current level, -1 once the expansion is done.
+    Both are updated in place so the next call continues where this one
+    stopped. Returns the number of opcodes written.
+    """
+    n = 0
+    top = cursor[0]
+    while top >= 0 and n < ops.shape[0]:
+        if frames[top, 1] == 0:
+            top -= 1
+            continue
+        pos = frames[top, 0]
+        sym = axiom[pos] if top == 0 else rule_body[pos]
+        frames[top, 0] += 1
+        frames[top, 1] -= 1
+        if top < depth and rule_len[sym] != NO_RULE:
+            top += 1
+            frames[top, 0] = rule_start[sym]
+            frames[top, 1] = rule_len[sym]
+        elif sym_op[sym] != OP_NOP:
+            ops[n] = sym_op[sym]
+            args[n] = sym_arg[sym]
+            n += 1
+    cursor[0] = top
+    return n
+
+
+class LSystem(object):
+    """Lindenmayer system expanded straight into interpreter opcodes.
+
+    The expansion never builds the rewritten strings, it walks the rules
+    depth first and emits the opcodes of the last generation in chunks,
+    so memory stays bounded by the chunk size and the depth.
+
+    Default turtle commands of the symbols:
+        F, G -- forward (draw)        f -- move without drawing
+        +    -- left by angle         - -- right by angle
+        [    -- push turtle state     ] -- pop turtle state
+    Every other symbol is a variable and does not move the turtle.
+    """
+    def __init__(self, axiom, rules, angle=90.0, step=10.0, commands=None):
+        """Arguments:
+        axiom -- the start word (a string)
+        rules -- dict mapping a symbol to its replacement string
+        angle -- turning angle of '+' and '-'
+        step -- length of 'F', 'G' and 'f'
+        commands (optional) -- dict mapping a symbol to an (opcode, arg)
+        pair, overriding the default commands
+        """
+        self.axiom = self._encode(axiom)
+        self.rules = dict(rules)
+        self._rule_start = np.full(ALPHABET_SIZE, NO_RULE, dtype=np.int64)
+        self._rule_len = np.full(ALPHABET_SIZE, NO_RULE, dtype=np.int64)
+        bodies = []
+        start = 0
+        for symbol, body in self.rules.items():
+            code = self._encode(symbol)
+            if len(code) != 1:
+                raise ValueError("rule symbol must be a single character: {!r}".format(symbol))
+            bodies.append(self._encode(body))
+            self._rule_start[code[0]] = start
+            self._rule_len[code[0]] = len(body)
+            start += len(body)
+        self._rule_body = np.concatenate(bodies) if bodies else np.zeros(0, dtype=np.uint8)
+
+        self._sym_op = np.full(ALPHABET_SIZE, OP_NOP, dtype=np.int8)
+        self._sym_arg = np.zeros(ALPHABET_SIZE, dtype=np.float64)
+        default = {"F": (OP_FORWARD, step), "G": (OP_FORWARD, step), "f": (OP_MOVE, step),
+                   "+": (OP_LEFT, angle), "-": (OP_RIGHT, angle),
+                   "[": (OP_PUSH, 0.0), "]": (OP_POP, 0.0)}
+        default.update(commands or {})
+        for symbol, (op, arg) in default.items():
+            code = self._encode(symbol)[0]
+            self._sym_op[code] = op
+            self._sym_arg[code] = arg
+
+    @staticmethod
+    def _encode(word):
+        """Return word as an array of byte symbols."""
+        return np.frombuffer(word.encode("latin-1"), dtype=np.uint8).copy()
+
+    def _lengths(self, depth, weights):
+        """Return the weighted length of every symbol expanded depth times."""
+        lengths = weights.astype(np.int64)
+        for _ in range(depth):
+            expanded = lengths.copy()
+            for symbol, body in self.rules.items():
+                code = self._encode(symbol)[0]
+                expanded[code] = lengths[self._encode(body)].sum()
+            lengths = expanded
+        return lengths
+
+    def symbol_count(self, depth):
+        """Return the number of symbols of generation depth."""
+        return int(self._lengths(depth, np.ones(ALPHABET_SIZE))[self.axiom].sum())
+
+    def op_count(self, depth):
+        """Return the number of opcodes emitted for generation depth."""
+        return int(self._lengths(depth, self._sym_op != OP_NOP)[self.axiom].sum())
+
+    def max_stack_depth(self, depth):
+        """Return the deepest push nesting reached while drawing generation depth."""
+        # (net push count, highest prefix nesting) of every expanded symbol
+        net = np.zeros(ALPHABET_SIZE, dtype=np.int64)
+        peak = np.zeros(ALPHABET_SIZE, dtype=np.int64)
+        net[self._sym_op == OP_PUSH] = 1
+        peak[self._sym_op == OP_PUSH] = 1
+        net[self._sym_op == OP_POP] = -1
+
+        def fold(word, net, peak):
+            running, highest = 0, 0
+            for code in word:
+                highest = max(highest, running + peak[code])
+                running += net[code]
+            return running, highest
+
+        for _ in range(depth):
+            next_net, next_peak = net.copy(), peak.copy()
+            for symbol, body in self.rules.items():
+                code = self._encode(symbol)[0]
+                next_net[code], next_peak[code] = fold(self._encode(body), net, peak)
+            net, peak = next_net, next_peak
+        return fold(self.axiom, net, peak)[1]
+
+    def iter_chunks(self, depth, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield (ops, args) chunks of the program of generation depth.
+
+        The arrays are reused between chunks, copy them to keep them.
+        """
+        ops, args = new_program(chunk_size)
+        frames = np.zeros((depth + 1, 2), dtype=np.int64)
+        frames[0, 1] = len(self.axiom)
+        cursor = np.zeros(1, dtype=np.int64)
+        while cursor[0] >= 0:
+            n = _expand(self.axiom, self._rule_start, self._rule_len, self._rule_body,
+                        self._sym_op, self._sym_arg, depth, frames, cursor, ops, args)
+            if n:
+                yield ops[:n], args[:n]
+
+    def compile(self, depth):
+        """Return the whole (ops, args) program of generation depth."""
+        ops, args = new_program(self.op_count(depth))
+        frames = np.zeros((depth + 1, 2), dtype=np.int64)
+        frames[0, 1] = len(self.axiom)
+        cursor = np.zeros(1, dtype=np.int64)
+        _expand(self.axiom, self._rule_start, self._rule_len, self._rule_body,
+                self._sym_op, self._sym_arg, depth, frames, cursor, ops, args)
+        return ops, args
+
+    def render(self, turtle, depth, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Draw generation depth with turtle, streaming it chunk by chunk.
+
+        The brackets use the turtle's state stack, which is grown first
+        when the branches nest deeper than it can hold.
+
+        Example:
+        >>> koch = LSystem("F", {"F": "F+F-F-F+F"}, angle=90, step=2)
+        >>> koch.render(TNavigator(), 4)
+        """
+        needed = turtle._state_top + self.max_stack_depth(depth)
+        if needed > turtle._state_stack.shape[0]:
+            stack = np.empty((needed, STATE_SIZE))
+            stack[:turtle._state_top] = turtle._state_stack[:turtle._state_top]
+            turtle._state_stack = stack
+        for ops, args in self.iter_chunks(depth, chunk_size):
+            turtle.run(ops, args)
+
+
+if __name__ == "__main__":
+    import cv2
+    from TNavigator_vecNumba import TNavigator
+
+    plant = LSystem("X", {"X": "F+[[X]-X]-F[-FX]+X", "F": "FF"}, angle=25, step=1)
+
+    def demo():
+        """Render a fractal plant of about a million symbols."""
+        turtle = TNavigator()
+        turtle.move_goto(127, 64)
+        turtle.left(90)
+        plant.render(turtle, 7)
+        return turtle
+
+    # cv2.imwrite(filename="img/art_lsystem.jpg", img = demo()._get_image_cv2())
+    import timeit
+    print("Symbols: {}, opcodes: {}".format(plant.symbol_count(7), plant.op_count(7)))
+    print("Time Taken for the L-system using Numba: ", timeit.timeit("demo()", setup="from __main__ import demo", number=10))
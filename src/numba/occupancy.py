@@ -0,0 +1,144 @@
+import math
+import numba as nb
+import numpy as np
+
+# Occupancy pyramid: ink pixel counts per block at several levels, level
+# l has blocks of (1 << (shift + l)) pixels a side and the top level is
+# one block covering the whole canvas. All levels live in one flat int32
+# array, level l starts at offsets[l] and is heights[l] blocks high.
+# Counts rather than bits so that erasing keeps it exact.
+
+DEFAULT_BLOCK_SHIFT = 3
+
+
+def new_pyramid(shape, shift=DEFAULT_BLOCK_SHIFT):
+    """Return (counts, offsets, heights) of an empty pyramid over a canvas of shape."""
+    width, height = shape
+    offsets, heights = [], []
+    size = 0
+    level = 0
+    while True:
+        w = ((width - 1) >> (shift + level)) + 1
+        h = ((height - 1) >> (shift + level)) + 1
+        offsets.append(size)
+        heights.append(h)
+        size += w * h
+        if w == 1 and h == 1:
+            break
+        level += 1
+    return np.zeros(size, dtype=np.int32), np.array(offsets, dtype=np.int64), np.array(heights, dtype=np.int64)
+
+
+@nb.njit(cache=True, nogil=True)
+def _add_pixel(counts, offsets, heights, shift, x, y, delta):
+    for level in range(offsets.shape[0]):
+        s = shift + level
+        counts[offsets[level] + (x >> s) * heights[level] + (y >> s)] += delta
+
+
+@nb.njit(cache=True, nogil=True)
+def count_occupancy(canvas, counts, offsets, heights, shift):
+    """Count the ink pixels of every block from scratch."""
+    counts[:] = 0
+    for x in range(canvas.shape[0]):
+        for y in range(canvas.shape[1]):
+            if not canvas[x, y]:
+                _add_pixel(counts, offsets, heights, shift, x, y, 1)
+
+
+@nb.njit(cache=True, nogil=True)
+def update_occupancy(counts, offsets, heights, shift, height, pixels, was, now):
+    """Apply the canvas transitions pixels/was/now to the block counts."""
+    for i in range(pixels.shape[0]):
+        if was[i] != now[i]:
+            _add_pixel(counts, offsets, heights, shift, pixels[i] // height, pixels[i] % height,
+                       1 if not now[i] else -1)
+
+
+@nb.njit(cache=True, nogil=True)
+def _slab(start, step, low, high):
+    """Return the step interval in which start + i * step lies in [low, high]."""
+    if step == 0.0:
+        if low <= start <= high:
+            return -np.inf, np.inf
+        return np.inf, -np.inf
+    a = (low - start) / step
+    b = (high - start) / step
+    return min(a, b), max(a, b)
+
+
+@nb.njit(cache=True, nogil=True)
+def _inside_until(start, step, low, high):
+    """Return t such that start + i * step rounds into [low, high) for all steps i < t from here."""
+    if step > 0.0:
+        return (high - 0.5 - start) / step
+    if step < 0.0:
+        return (start - (low - 0.5)) / -step
+    return np.inf
+
+
+@nb.njit(cache=True, nogil=True)
+def cast_ray(canvas, counts, offsets, heights, shift, x0, y0, dx, dy, max_steps, hit):
+    """Walk the DDA ray from (x0, y0) in direction (dx, dy) to the first ink pixel.
+
+    The start pixel is skipped, like draw_line() skips it. Runs of steps
+    through blocks without ink are jumped over, the coarsest empty
+    level first. Writes the hit pixel to hit[0], hit[1] and returns the
+    number of steps to it, -1 if the ray leaves the canvas or takes more
+    than max_steps steps first.
+    """
+    width, height = canvas.shape
+    major = max(abs(dx), abs(dy))
+    if major == 0.0:
+        return -1
+    sx = dx / major
+    sy = dy / major
+    a_x, b_x = _slab(x0, sx, -0.5, width - 0.5)
+    a_y, b_y = _slab(y0, sy, -0.5, height - 0.5)
+    stop = min(b_x, b_y, float(max_steps))
+    if stop < 1.0:
+        return -1
+    i = int(math.floor(max(1.0, a_x, a_y)))
+    last = int(math.floor(stop))
+    levels = offsets.shape[0]
+    while i <= last:
+        x = int(round(x0 + i * sx))
+        y = int(round(y0 + i * sy))
+        if x < 0 or x >= width or y < 0 or y >= height:
+            i += 1
+            continue
+        # coarsest empty block around the pixel
+        empty = -1
+        for level in range(levels):
+            s = shift + level
+            if counts[offsets[level] + (x >> s) * heights[level] + (y >> s)] != 0:
+                break
+            empty = level
+        if empty < 0:
+            if not canvas[x, y]:
+                hit[0] = x
+                hit[1] = y
+                return i
+            i += 1
+            continue
+        s = shift + empty
+        bx = (x >> s) << s
+        by = (y >> s) << s
+        t = min(_inside_until(x0, sx, bx, bx + (1 << s)), _inside_until(y0, sy, by, by + (1 << s)))
+        i = max(i + 1, int(math.ceil(t)))
+    return -1
+
+
+if __name__ == "__main__":
+    import timeit
+
+    canvas = np.full((4096, 4096), True)
+    canvas[4000, 100:200] = False
+    counts, offsets, heights = new_pyramid(canvas.shape)
+    count_occupancy(canvas, counts, offsets, heights, DEFAULT_BLOCK_SHIFT)
+    hit = np.empty(2, dtype=np.int64)
+    print("Hit after {} steps at {}".format(
+        cast_ray(canvas, counts, offsets, heights, DEFAULT_BLOCK_SHIFT, 10.0, 150.0, 1.0, 0.0, 1 << 30, hit), hit))
+    print("Time taken per ray cast over a sparse 4096x4096 canvas (in seconds): {}".format(
+        timeit.timeit(lambda: cast_ray(canvas, counts, offsets, heights, DEFAULT_BLOCK_SHIFT,
+                                       10.0, 150.0, 1.0, 0.0, 1 << 30, hit), number=10000) / 10000))
@@ -0,0 +1,274 @@
+import os
+import numpy as np
+from interpreter import OP_FORWARD, OP_LEFT
+
+# Layout of a program file (little endian):
+#   file header     FILE_HEADER_DTYPE
+#   program 0       PROGRAM_HEADER_DTYPE + count * RECORD_DTYPE
+#   program 1       ...
+# Every part is a multiple of 16 bytes so the float64 arguments stay aligned.
+#
+# Layout of the index sidecar, filename + INDEX_SUFFIX:
+#   index header    INDEX_HEADER_DTYPE, programs indexed and the byte
+#                   of the program file they end at
+#   entry k         INDEX_DTYPE, offset of the records and count of program k
+# The writer appends an entry whenever it finishes a program, then
+# updates the header, so the header never counts an unwritten entry.
+# Programs past the indexed end, e.g. of an interrupted writer, are
+# found by reading their headers. A file without index is read the same
+# way from its start.
+FILE_MAGIC = b"TNAV"
+PROGRAM_MAGIC = b"PROG"
+FORMAT_VERSION = 1
+
+KIND_PROGRAM = 0
+KIND_LOG = 1
+
+FILE_HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u2"), ("record_size", "<u2"),
+                              ("reserved", "<u8")])
+PROGRAM_HEADER_DTYPE = np.dtype([("magic", "S4"), ("kind", "<u4"), ("count", "<u8")])
+RECORD_DTYPE = np.dtype({"names": ["op", "arg"], "formats": ["i1", "<f8"], "offsets": [0, 8],
+                         "itemsize": 16})
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"TIDX"
+INDEX_HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u2"), ("reserved", "<u2"), ("programs", "<u8"),
+                               ("end", "<u8"), ("reserved2", "<u8")])
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("count", "<u8")])
+
+
+def log_program(turtle):
+    """Return the (ops, args) replaying the forward() log of turtle.
+
+    Every logged forward(distance, angle) becomes OP_FORWARD distance,
+    OP_LEFT angle. Turns made with left()/right() are not logged.
+    """
+    lengths = np.asarray(turtle._line_lengths, dtype=np.float64)
+    angles = np.asarray(turtle._angles, dtype=np.float64)
+    ops = np.empty(2 * len(lengths), dtype=np.int8)
+    args = np.empty(2 * len(lengths), dtype=np.float64)
+    ops[0::2] = OP_FORWARD
+    ops[1::2] = OP_LEFT
+    args[0::2] = lengths
+    args[1::2] = angles
+    return ops, args
+
+
+class ProgramWriter(object):
+    """Write programs to a file incrementally.
+
+    The count of the program being written is updated after every
+    write(), so an interrupted writer leaves a readable file.
+
+    Example:
+    >>> with ProgramWriter("programs.tnav") as writer:
+    ...     writer.write(ops, args)
+    ...     writer.end_program()
+    ...     writer.write_log(turtle)
+    """
+    def __init__(self, filename, append=False):
+        exists = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+        self._file = open(filename, "r+b" if exists else "wb")
+        self._header_offset = None
+        self._count = 0
+        if exists:
+            header = np.frombuffer(self._file.read(FILE_HEADER_DTYPE.itemsize), dtype=FILE_HEADER_DTYPE)
+            _check_file_header(header, filename)
+            self._file.seek(0, os.SEEK_END)
+            data = np.memmap(filename, dtype=np.uint8, mode="r")
+            entries, end = _read_index(filename, data)
+            # index the programs the last writer left unindexed
+            tail, _ = _scan_programs(data, end, filename)
+            del data
+            self._programs = len(entries)
+            self._index = open(filename + INDEX_SUFFIX, "r+b" if self._programs else "wb")
+            if self._programs == 0:
+                self._write_index_header(FILE_HEADER_DTYPE.itemsize)
+            for offset, count in tail:
+                self._append_entry(offset, count)
+        else:
+            header = np.zeros(1, dtype=FILE_HEADER_DTYPE)
+            header["magic"] = FILE_MAGIC
+            header["version"] = FORMAT_VERSION
+            header["record_size"] = RECORD_DTYPE.itemsize
+            self._file.write(header.tobytes())
+            self._index = open(filename + INDEX_SUFFIX, "wb")
+            self._programs = 0
+            self._write_index_header(FILE_HEADER_DTYPE.itemsize)
+
+    def _write_index_header(self, end):
+        header = np.zeros(1, dtype=INDEX_HEADER_DTYPE)
+        header["magic"] = INDEX_MAGIC
+        header["version"] = FORMAT_VERSION
+        header["programs"] = self._programs
+        header["end"] = end
+        self._index.seek(0)
+        self._index.write(header.tobytes())
+
+    def _append_entry(self, offset, count):
+        entry = np.zeros(1, dtype=INDEX_DTYPE)
+        entry["offset"] = offset
+        entry["count"] = count
+        self._index.seek(INDEX_HEADER_DTYPE.itemsize + self._programs * INDEX_DTYPE.itemsize)
+        self._index.write(entry.tobytes())
+        self._programs += 1
+        self._write_index_header(offset + count * RECORD_DTYPE.itemsize)
+
+    def write(self, ops, args, kind=KIND_PROGRAM):
+        """Append the opcodes ops/args to the current program, starting one if needed."""
+        if self._header_offset is None:
+            self._header_offset = self._file.tell()
+            self._count = 0
+            header = np.zeros(1, dtype=PROGRAM_HEADER_DTYPE)
+            header["magic"] = PROGRAM_MAGIC
+            header["kind"] = kind
+            self._file.write(header.tobytes())
+        records = np.empty(len(ops), dtype=RECORD_DTYPE)
+        records["op"] = ops
+        records["arg"] = args
+        self._file.write(records.tobytes())
+        self._count += len(ops)
+        end = self._file.tell()
+        self._file.seek(self._header_offset + PROGRAM_HEADER_DTYPE.fields["count"][1])
+        self._file.write(np.uint64(self._count).tobytes())
+        self._file.seek(end)
+
+    def end_program(self):
+        """Finish the current program, the next write() starts a new one."""
+        if self._header_offset is None:
+            self.write(np.zeros(0, dtype=np.int8), np.zeros(0))
+        self._append_entry(self._header_offset + PROGRAM_HEADER_DTYPE.itemsize, self._count)
+        self._header_offset = None
+
+    def write_program(self, ops, args, kind=KIND_PROGRAM):
+        """Write ops/args as one whole program."""
+        if self._header_offset is not None:
+            self.end_program()
+        self.write(ops, args, kind)
+        self.end_program()
+
+    def write_log(self, turtle):
+        """Write the forward() log of turtle as a replayable program."""
+        ops, args = log_program(turtle)
+        self.write_program(ops, args, KIND_LOG)
+
+    def close(self):
+        """Close the file, a program still being written is kept as it is."""
+        if self._header_offset is not None:
+            self.end_program()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_file_header(header, filename):
+    if len(header) != 1 or header["magic"][0] != FILE_MAGIC:
+        raise ValueError("{} is not a turtle program file".format(filename))
+    if header["version"][0] != FORMAT_VERSION or header["record_size"][0] != RECORD_DTYPE.itemsize:
+        raise ValueError("{}: unsupported program file version {}".format(filename, header["version"][0]))
+
+
+def _scan_programs(data, offset, filename):
+    """Return ([(records offset, count), ...], end) of the programs in data from byte offset on."""
+    programs = []
+    while offset + PROGRAM_HEADER_DTYPE.itemsize <= len(data):
+        header = data[offset:offset + PROGRAM_HEADER_DTYPE.itemsize].view(PROGRAM_HEADER_DTYPE)[0]
+        if header["magic"] != PROGRAM_MAGIC:
+            raise ValueError("{}: corrupt program header at byte {}".format(filename, offset))
+        count = int(header["count"])
+        programs.append((offset + PROGRAM_HEADER_DTYPE.itemsize, count))
+        offset += PROGRAM_HEADER_DTYPE.itemsize + count * RECORD_DTYPE.itemsize
+    return programs, offset
+
+
+def _read_index(filename, data):
+    """Return (entries, end) of the index of the program file data, memory-mapped.
+
+    A missing index, or one that does not fit data, gives no entries and
+    the end of the file header, so that the programs are scanned.
+    """
+    nothing = np.zeros(0, dtype=INDEX_DTYPE), FILE_HEADER_DTYPE.itemsize
+    name = filename + INDEX_SUFFIX
+    if not os.path.exists(name) or os.path.getsize(name) < INDEX_HEADER_DTYPE.itemsize:
+        return nothing
+    index = np.memmap(name, dtype=np.uint8, mode="r")
+    header = index[:INDEX_HEADER_DTYPE.itemsize].view(INDEX_HEADER_DTYPE)[0]
+    programs, end = int(header["programs"]), int(header["end"])
+    if (header["magic"] != INDEX_MAGIC or header["version"] != FORMAT_VERSION or end > len(data)
+            or len(index) < INDEX_HEADER_DTYPE.itemsize + programs * INDEX_DTYPE.itemsize):
+        return nothing
+    entries = index[INDEX_HEADER_DTYPE.itemsize:INDEX_HEADER_DTYPE.itemsize
+                    + programs * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+    if programs:
+        # a stale index of a rewritten file points elsewhere
+        last = int(entries["offset"][-1]) - PROGRAM_HEADER_DTYPE.itemsize
+        if (data[last:last + 4].tobytes() != PROGRAM_MAGIC
+                or last + PROGRAM_HEADER_DTYPE.itemsize + int(entries["count"][-1]) * RECORD_DTYPE.itemsize != end):
+            return nothing
+    return entries, end
+
+
+class ProgramFile(object):
+    """Memory-mapped program file, program k is program_file[k].
+
+    The returned ops/args are views into the mapping, no data is copied
+    and they can be passed to TNavigator.run() as they are. Opening maps
+    the index written by ProgramWriter, only the programs it does not
+    cover have their headers read.
+
+    Example:
+    >>> programs = ProgramFile("programs.tnav")
+    >>> ops, args = programs[3]
+    >>> programs.run(turtle, 3)
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._data = np.memmap(filename, dtype=np.uint8, mode="r")
+        _check_file_header(self._data[:FILE_HEADER_DTYPE.itemsize].view(FILE_HEADER_DTYPE), filename)
+        entries, end = _read_index(filename, self._data)
+        tail, _ = _scan_programs(self._data, end, filename)
+        if tail:
+            entries = np.concatenate([entries, np.array(tail, dtype=INDEX_DTYPE)])
+        self._index = entries
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, k):
+        """Return the (ops, args) views of program k."""
+        entry = self._index[k]
+        start = int(entry["offset"])
+        records = self._data[start:start + int(entry["count"]) * RECORD_DTYPE.itemsize].view(RECORD_DTYPE)
+        return records["op"], records["arg"]
+
+    def kind(self, k):
+        """Return KIND_PROGRAM or KIND_LOG for program k."""
+        start = int(self._index[k]["offset"]) - PROGRAM_HEADER_DTYPE.itemsize
+        return int(self._data[start:start + PROGRAM_HEADER_DTYPE.itemsize].view(PROGRAM_HEADER_DTYPE)[0]["kind"])
+
+    def run(self, turtle, k):
+        """Execute program k with turtle."""
+        ops, args = self[k]
+        turtle.run(ops, args)
+
+
+if __name__ == "__main__":
+    import time
+    from lsystem import LSystem
+    from TNavigator_vecNumba import TNavigator
+
+    koch = LSystem("F", {"F": "F+F-F-F+F"}, angle=90, step=1)
+    with ProgramWriter("/tmp/koch.tnav") as writer:
+        for depth in range(1, 8):
+            for ops, args in koch.iter_chunks(depth):
+                writer.write(ops, args)
+            writer.end_program()
+    programs = ProgramFile("/tmp/koch.tnav")
+    start = time.time()
+    for k in range(len(programs)):
+        programs.run(TNavigator(), k)
+    print("Ran {} programs from the memory-mapped file in {} seconds".format(len(programs), time.time() - start))
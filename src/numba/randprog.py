@@ -0,0 +1,146 @@
+import math
+import numba as nb
+import numpy as np
+import constants
+from interpreter import (execute, OP_FORWARD, OP_MOVE, OP_LEFT, OP_RIGHT, OP_PENUP, OP_PENDOWN, STATE_X, STATE_Y,
+                         STATE_ORIENT_X, STATE_ORIENT_Y, STATE_PEN, STATE_SIZE)
+from tracking import splitmix64
+
+# Random programs: every stream has its own splitmix64 state, seeded
+# from (seed, stream number), so a stream draws the same program however
+# the streams are batched or scheduled. Programs are interpreter
+# opcodes, drawn from the distribution in a PARAM_* vector.
+
+# layout of the float64 parameter vector
+PARAM_FORWARD = 0
+PARAM_MOVE = 1
+PARAM_TURN = 2
+PARAM_PENUP = 3
+PARAM_PENDOWN = 4
+PARAM_MIN_DISTANCE = 5
+PARAM_MAX_DISTANCE = 6
+PARAM_MIN_TURN = 7
+PARAM_MAX_TURN = 8
+PARAM_TURN_STEP = 9
+PARAM_SIZE = 10
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def program_params(forward=0.6, move=0.05, turn=0.3, penup=0.025, pendown=0.025, min_distance=1.0,
+                   max_distance=10.0, min_turn=0.0, max_turn=180.0, turn_step=0.0):
+    """Return the parameter vector of a program distribution.
+
+    Arguments:
+    forward, move, turn, penup, pendown -- relative frequencies of the opcodes
+    min_distance, max_distance -- range of the uniform forward/move distances
+    min_turn, max_turn -- range of the uniform turn angles in degrees,
+    left or right with equal chance
+    turn_step -- round the turns to multiples of it, 0 for no rounding
+
+    Example, a random walk on the grid:
+    >>> params = program_params(move=0, turn=0.5, penup=0, pendown=0, min_distance=5, max_distance=5,
+    ...                         min_turn=90, max_turn=90)
+    """
+    params = np.zeros(PARAM_SIZE)
+    weights = np.array([forward, move, turn, penup, pendown], dtype=np.float64)
+    if weights.min() < 0 or weights.sum() <= 0:
+        raise ValueError("the opcode frequencies must be non-negative and not all zero")
+    params[PARAM_FORWARD:PARAM_PENDOWN + 1] = weights / weights.sum()
+    params[PARAM_MIN_DISTANCE] = min_distance
+    params[PARAM_MAX_DISTANCE] = max_distance
+    params[PARAM_MIN_TURN] = min_turn
+    params[PARAM_MAX_TURN] = max_turn
+    params[PARAM_TURN_STEP] = turn_step
+    return params
+
+
+@nb.njit(cache=True)
+def seed_streams(seed, first, count):
+    """Return the generator states of the streams first..first+count-1 of seed."""
+    states = np.empty(count, dtype=np.uint64)
+    base = splitmix64(np.uint64(seed))
+    for i in range(count):
+        states[i] = splitmix64(base ^ splitmix64(np.uint64(first + i)))
+    return states
+
+
+@nb.njit(cache=True, nogil=True, inline="always")
+def _uniform(rng, i):
+    """Return the next uniform number in [0, 1) of stream i."""
+    value = splitmix64(rng[i])
+    rng[i] += _GOLDEN
+    return (value >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+
+@nb.njit(cache=True, nogil=True)
+def generate_program(rng, i, params, ops, args):
+    """Fill ops/args with a random program of stream i."""
+    for k in range(ops.shape[0]):
+        u = _uniform(rng, i)
+        if u < params[PARAM_FORWARD] + params[PARAM_MOVE]:
+            ops[k] = OP_FORWARD if u < params[PARAM_FORWARD] else OP_MOVE
+            args[k] = params[PARAM_MIN_DISTANCE] + _uniform(rng, i) * (params[PARAM_MAX_DISTANCE]
+                                                                      - params[PARAM_MIN_DISTANCE])
+        elif u < params[PARAM_FORWARD] + params[PARAM_MOVE] + params[PARAM_TURN]:
+            angle = params[PARAM_MIN_TURN] + _uniform(rng, i) * (params[PARAM_MAX_TURN] - params[PARAM_MIN_TURN])
+            if params[PARAM_TURN_STEP] > 0.0:
+                angle = math.floor(angle / params[PARAM_TURN_STEP] + 0.5) * params[PARAM_TURN_STEP]
+            ops[k] = OP_LEFT if _uniform(rng, i) < 0.5 else OP_RIGHT
+            args[k] = angle
+        else:
+            ops[k] = OP_PENUP if u < 1.0 - params[PARAM_PENDOWN] else OP_PENDOWN
+            args[k] = 0.0
+
+
+@nb.njit(cache=True, nogil=True, parallel=True)
+def generate_and_render(canvases, rng, params, start, ops, args):
+    """Generate a program per stream and render it onto its canvas in one loop.
+
+    canvases is the (N, width, height) stack to draw on, rng the N
+    stream states of seed_streams(), start the (x, y, orient x,
+    orient y) start pose and ops/args (N, length) rows receiving the
+    programs. The streams run in parallel.
+    """
+    for i in nb.prange(canvases.shape[0]):
+        generate_program(rng, i, params, ops[i], args[i])
+        state = np.empty(STATE_SIZE)
+        # the programs never push
+        stack = np.empty((0, STATE_SIZE))
+        state[STATE_X] = start[0]
+        state[STATE_Y] = start[1]
+        state[STATE_ORIENT_X] = start[2]
+        state[STATE_ORIENT_Y] = start[3]
+        state[STATE_PEN] = 1.0
+        execute(canvases[i], False, state, ops[i], args[i], stack, 0, 1.0)
+
+
+def random_canvases(count, length, seed=0, params=None, shape=(128, 128), first=0):
+    """Return (canvases, ops, args) of count random programs of length opcodes.
+
+    The programs are the streams first..first+count-1 of seed, rendered
+    from the start pose of TNavigator onto fresh canvases.
+
+    Example:
+    >>> canvases, ops, args = random_canvases(1000, 64, seed=7)
+    """
+    if params is None:
+        params = program_params()
+    canvases = np.full((count,) + tuple(shape), True)
+    ops = np.empty((count, length), dtype=np.int8)
+    args = np.empty((count, length))
+    start = np.array([constants.start_x, constants.start_y, 0.0, 1.0])
+    generate_and_render(canvases, seed_streams(seed, first, count), params, start, ops, args)
+    return canvases, ops, args
+
+
+if __name__ == "__main__":
+    import timeit
+    from TNavigator_vecNumba import TNavigator
+
+    canvases, ops, args = random_canvases(8, 64, seed=1)
+    turtle = TNavigator()
+    turtle.run(ops[3], args[3])
+    print("Stream renders like TNavigator.run(): {}".format(np.array_equal(canvases[3], turtle._canvas)))
+    print("Time taken per 10000 programs of 64 opcodes (in seconds): {}".format(
+        timeit.timeit(lambda: random_canvases(10000, 64, seed=2), number=5) / 5))
@@ -0,0 +1,440 @@
+import math
+import numba as nb
+import numpy as np
+
+# how the unlogged rasterizers combine the pen color with a pixel
+BLEND_OVERWRITE = 0
+BLEND_MAX = 1
+# saturating at limit, with color 1 a uint16/uint32 canvas counts visits
+BLEND_ADD = 2
+
+
+def blend_limit(dtype):
+    """Return the saturation limit of BLEND_ADD for a canvas of dtype."""
+    dtype = np.dtype(dtype)
+    if dtype == np.bool_:
+        return 1
+    if dtype.kind in "ui":
+        return int(np.iinfo(dtype).max)
+    return np.inf
+
+
+@nb.njit(cache=True, nogil=True, inline="always")
+def _plot(canvas, x, y, color, mode, limit):
+    if mode == BLEND_MAX:
+        if color > canvas[x, y]:
+            canvas[x, y] = color
+    elif mode == BLEND_ADD:
+        canvas[x, y] = min(canvas[x, y] + color, limit)
+    else:
+        canvas[x, y] = color
+
+
+@nb.njit(cache=True, nogil=True)
+def draw_line(canvas, x0, y0, x1, y1, color, mode=BLEND_OVERWRITE, limit=1):
+    """Draw a bresenham line from (x0, y0) to (x1, y1) into canvas.
+
+    Works like TNavigator._goto: the start pixel keeps its color and the
+    pixels falling outside the canvas are skipped. mode blends color
+    into the pixels, limit caps BLEND_ADD (see blend_limit()).
+    Returns the number of pixels written.
+    """
+    width = canvas.shape[0]
+    height = canvas.shape[1]
+    # both end points on the same side outside the canvas, nothing to draw
+    if (x0 < 0 and x1 < 0) or (y0 < 0 and y1 < 0):
+        return 0
+    if (x0 >= width and x1 >= width) or (y0 >= height and y1 >= height):
+        return 0
+
+    dx = abs(x1 - x0)
+    dy = -abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    error = dx + dy
+    x = x0
+    y = y0
+    written = 0
+    while x != x1 or y != y1:
+        e2 = 2 * error
+        if e2 >= dy:
+            error += dy
+            x += sx
+        if e2 <= dx:
+            error += dx
+            y += sy
+        if 0 <= x < width and 0 <= y < height:
+            _plot(canvas, x, y, color, mode, limit)
+            written += 1
+    return written
+
+
+@nb.njit(cache=True, nogil=True)
+def draw_line_logged(canvas, x0, y0, x1, y1, color, log_pixels, log_values, top):
+    """Draw like draw_line and log the pixels the line changes.
+
+    The flat index and the old value of every changed pixel are written
+    to log_pixels/log_values from top on, the caller makes sure they
+    have room for max(|x1-x0|, |y1-y0|) more entries.
+    Returns the new top of the log.
+    """
+    width = canvas.shape[0]
+    height = canvas.shape[1]
+    if (x0 < 0 and x1 < 0) or (y0 < 0 and y1 < 0):
+        return top
+    if (x0 >= width and x1 >= width) or (y0 >= height and y1 >= height):
+        return top
+
+    dx = abs(x1 - x0)
+    dy = -abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    error = dx + dy
+    x = x0
+    y = y0
+    while x != x1 or y != y1:
+        e2 = 2 * error
+        if e2 >= dy:
+            error += dy
+            x += sx
+        if e2 <= dx:
+            error += dx
+            y += sy
+        if 0 <= x < width and 0 <= y < height and canvas[x, y] != color:
+            log_pixels[top] = x * height + y
+            log_values[top] = canvas[x, y]
+            top += 1
+            canvas[x, y] = color
+    return top
+
+
+@nb.njit(cache=True, nogil=True)
+def restore_pixels(canvas, log_pixels, log_values, start, stop, was):
+    """Write back the old values logged in log_pixels/log_values[start:stop], newest first.
+
+    The values overwritten are stored in was, in the order of writing.
+    """
+    height = canvas.shape[1]
+    for i in range(stop - 1, start - 1, -1):
+        x = log_pixels[i] // height
+        y = log_pixels[i] % height
+        was[stop - 1 - i] = canvas[x, y]
+        canvas[x, y] = log_values[i]
+
+
+
+# winding rules of fill_polygon()
+FILL_EVEN_ODD = 0
+FILL_NONZERO = 1
+
+
+@nb.njit(cache=True, nogil=True)
+def _column_spans(xs, ys, count, x, rule, crossings, winds, spans):
+    """Write the [y0, y1) spans of column x inside the polygon to spans, returns their number.
+
+    An edge crosses column x if x lies in its half-open x range, so a
+    vertex on the column is counted once.
+    """
+    n = 0
+    for i in range(count):
+        j = i + 1 if i + 1 < count else 0
+        xi, xj = xs[i], xs[j]
+        if (xi <= x < xj) or (xj <= x < xi):
+            y = ys[i] + (x - xi) / (xj - xi) * (ys[j] - ys[i])
+            wind = 1 if xj > xi else -1
+            # insertion sort, the crossings of a column are few
+            k = n
+            while k > 0 and crossings[k - 1] > y:
+                crossings[k] = crossings[k - 1]
+                winds[k] = winds[k - 1]
+                k -= 1
+            crossings[k] = y
+            winds[k] = wind
+            n += 1
+    m = 0
+    winding = 0
+    for k in range(n - 1):
+        winding += winds[k]
+        inside = (k % 2 == 0) if rule == FILL_EVEN_ODD else winding != 0
+        if inside:
+            spans[2 * m] = int(math.ceil(crossings[k]))
+            spans[2 * m + 1] = int(math.ceil(crossings[k + 1]))
+            m += 1
+    return m
+
+
+@nb.njit(cache=True, nogil=True)
+def fill_polygon(canvas, xs, ys, count, color, rule, mode=BLEND_OVERWRITE, limit=1):
+    """Fill the polygon of the first count vertices xs/ys into canvas.
+
+    A pixel is filled if its center is inside by the even-odd or the
+    non-zero winding rule, pixels outside the canvas are skipped. mode
+    and limit blend like draw_line(). Returns the number of pixels written.
+    """
+    width, height = canvas.shape
+    crossings = np.empty(count)
+    winds = np.empty(count, dtype=np.int64)
+    spans = np.empty(count + 1, dtype=np.int64)
+    x0 = max(int(math.ceil(xs[:count].min())), 0)
+    x1 = min(int(math.ceil(xs[:count].max())), width)
+    written = 0
+    for x in range(x0, x1):
+        for m in range(_column_spans(xs, ys, count, x, rule, crossings, winds, spans)):
+            y0 = max(spans[2 * m], 0)
+            y1 = min(spans[2 * m + 1], height)
+            for y in range(y0, y1):
+                _plot(canvas, x, y, color, mode, limit)
+            written += max(y1 - y0, 0)
+    return written
+
+
+@nb.njit(cache=True, nogil=True)
+def fill_polygon_logged(canvas, xs, ys, count, color, rule, log_pixels, log_values, top):
+    """Fill like fill_polygon and log the pixels the fill changes.
+
+    The caller makes sure log_pixels/log_values have room for the
+    pixels of the bounding box of the polygon from top on.
+    Returns the new top of the log.
+    """
+    width, height = canvas.shape
+    crossings = np.empty(count)
+    winds = np.empty(count, dtype=np.int64)
+    spans = np.empty(count + 1, dtype=np.int64)
+    x0 = max(int(math.ceil(xs[:count].min())), 0)
+    x1 = min(int(math.ceil(xs[:count].max())), width)
+    for x in range(x0, x1):
+        for m in range(_column_spans(xs, ys, count, x, rule, crossings, winds, spans)):
+            for y in range(max(spans[2 * m], 0), min(spans[2 * m + 1], height)):
+                if canvas[x, y] != color:
+                    log_pixels[top] = x * height + y
+                    log_values[top] = canvas[x, y]
+                    top += 1
+                    canvas[x, y] = color
+    return top
+
+
+
+# line caps of draw_thick_line()
+CAP_ROUND = 0
+CAP_SQUARE = 1
+
+
+@nb.njit(cache=True, nogil=True)
+def _thick_outline(x0, y0, x1, y1, width, cap):
+    """Return the corners of the body of a thick line and its x range."""
+    r = width / 2.0
+    length = math.hypot(x1 - x0, y1 - y0)
+    dx, dy = ((x1 - x0) / length, (y1 - y0) / length) if length > 0.0 else (1.0, 0.0)
+    nx, ny = -dy * r, dx * r
+    # square caps extend the body by r, round caps add discs at the ends
+    ex, ey = (dx * r, dy * r) if cap == CAP_SQUARE else (0.0, 0.0)
+    corners = np.empty((4, 2))
+    corners[0, 0], corners[0, 1] = x0 - ex + nx, y0 - ey + ny
+    corners[1, 0], corners[1, 1] = x1 + ex + nx, y1 + ey + ny
+    corners[2, 0], corners[2, 1] = x1 + ex - nx, y1 + ey - ny
+    corners[3, 0], corners[3, 1] = x0 - ex - nx, y0 - ey - ny
+    x_min = corners[:, 0].min()
+    x_max = corners[:, 0].max()
+    if cap == CAP_ROUND:
+        x_min = min(x_min, x0 - r, x1 - r)
+        x_max = max(x_max, x0 + r, x1 + r)
+    return corners, x_min, x_max
+
+
+@nb.njit(cache=True, nogil=True)
+def _thick_span(corners, x0, y0, x1, y1, width, cap, x):
+    """Return the [lo, hi) y range of column x covered by a thick line, lo > hi if none."""
+    lo = np.inf
+    hi = -np.inf
+    # the body and the caps are convex and overlap, their union meets the column in one range
+    for i in range(4):
+        ax, ay = corners[i, 0], corners[i, 1]
+        bx, by = corners[(i + 1) % 4, 0], corners[(i + 1) % 4, 1]
+        if min(ax, bx) <= x <= max(ax, bx):
+            if ax == bx:
+                lo, hi = min(lo, ay, by), max(hi, ay, by)
+            else:
+                y = ay + (x - ax) / (bx - ax) * (by - ay)
+                lo, hi = min(lo, y), max(hi, y)
+    if cap == CAP_ROUND:
+        lo, hi = _disc_span(x0, y0, width / 2.0, x, lo, hi)
+        lo, hi = _disc_span(x1, y1, width / 2.0, x, lo, hi)
+    return lo, hi
+
+
+@nb.njit(cache=True, nogil=True)
+def _disc_span(cx, cy, r, x, lo, hi):
+    """Return the y range lo/hi of column x widened by the disc of radius r at (cx, cy)."""
+    if abs(x - cx) <= r:
+        h = math.sqrt(r * r - (x - cx) * (x - cx))
+        return min(lo, cy - h), max(hi, cy + h)
+    return lo, hi
+
+
+@nb.njit(cache=True, nogil=True)
+def draw_thick_line(canvas, x0, y0, x1, y1, width, cap, color, mode=BLEND_OVERWRITE, limit=1):
+    """Draw a line width pixels wide from (x0, y0) to (x1, y1) into canvas.
+
+    Pixels whose center lies in the stroke, with round or square caps,
+    are written once each, column by column. Pixels outside the canvas
+    are skipped, mode and limit blend like draw_line(). Returns the
+    number of pixels written.
+    """
+    canvas_width, canvas_height = canvas.shape
+    corners, x_min, x_max = _thick_outline(x0, y0, x1, y1, width, cap)
+    written = 0
+    for x in range(max(int(math.ceil(x_min)), 0), min(int(math.ceil(x_max)), canvas_width)):
+        lo, hi = _thick_span(corners, x0, y0, x1, y1, width, cap, x)
+        if lo > hi:
+            continue
+        y_lo = max(int(math.ceil(lo)), 0)
+        y_hi = min(int(math.ceil(hi)), canvas_height)
+        for y in range(y_lo, y_hi):
+            _plot(canvas, x, y, color, mode, limit)
+        written += max(y_hi - y_lo, 0)
+    return written
+
+
+@nb.njit(cache=True, nogil=True)
+def draw_thick_line_logged(canvas, x0, y0, x1, y1, width, cap, color, log_pixels, log_values, top):
+    """Draw like draw_thick_line and log the pixels the line changes.
+
+    The caller makes sure log_pixels/log_values have room for
+    thick_line_bound() more entries from top on.
+    Returns the new top of the log.
+    """
+    canvas_width, canvas_height = canvas.shape
+    corners, x_min, x_max = _thick_outline(x0, y0, x1, y1, width, cap)
+    for x in range(max(int(math.ceil(x_min)), 0), min(int(math.ceil(x_max)), canvas_width)):
+        lo, hi = _thick_span(corners, x0, y0, x1, y1, width, cap, x)
+        if lo > hi:
+            continue
+        for y in range(max(int(math.ceil(lo)), 0), min(int(math.ceil(hi)), canvas_height)):
+            if canvas[x, y] != color:
+                log_pixels[top] = x * canvas_height + y
+                log_values[top] = canvas[x, y]
+                top += 1
+                canvas[x, y] = color
+    return top
+
+
+def thick_line_bound(x0, y0, x1, y1, width):
+    """Return an upper bound of the pixels a thick line covers, its bounding box."""
+    # square caps reach r * sqrt(2) beyond the end points
+    reach = int(math.ceil(width * 0.75)) + 1
+    return (int(math.ceil(abs(x1 - x0))) + 2 * reach) * (int(math.ceil(abs(y1 - y0))) + 2 * reach)
+
+
+
+@nb.njit(cache=True, nogil=True, inline="always")
+def _plot_coverage(canvas, x, y, coverage, intensity, mode, limit):
+    """Blend coverage * intensity into pixel (x, y) if it is on the canvas."""
+    if 0 <= x < canvas.shape[0] and 0 <= y < canvas.shape[1] and coverage > 0.0:
+        value = coverage * intensity
+        # integer canvases have a finite limit, round instead of truncating
+        if limit < np.inf:
+            value = math.floor(value + 0.5)
+        _plot(canvas, x, y, value, mode, limit)
+
+
+@nb.njit(cache=True, nogil=True)
+def draw_line_aa(canvas, x0, y0, x1, y1, intensity, mode=BLEND_MAX, limit=np.inf):
+    """Draw an anti-aliased Xiaolin Wu line between float end points.
+
+    Every pixel gets its coverage times intensity, blended into a float
+    or integer canvas with mode (see draw_line()). The end pixels are
+    covered from the pixel center on, so the joints of a polyline add
+    up under BLEND_ADD and stay half covered under BLEND_MAX.
+    """
+    steep = abs(y1 - y0) > abs(x1 - x0)
+    if steep:
+        x0, y0, x1, y1 = y0, x0, y1, x1
+    if x0 > x1:
+        x0, y0, x1, y1 = x1, y1, x0, y0
+    dx = x1 - x0
+    gradient = (y1 - y0) / dx if dx != 0.0 else 1.0
+
+    # first end point
+    x_end = math.floor(x0 + 0.5)
+    y_end = y0 + gradient * (x_end - x0)
+    gap = 1.0 - (x0 + 0.5 - math.floor(x0 + 0.5))
+    px0 = int(x_end)
+    py = math.floor(y_end)
+    f = y_end - py
+    if steep:
+        _plot_coverage(canvas, int(py), px0, (1.0 - f) * gap, intensity, mode, limit)
+        _plot_coverage(canvas, int(py) + 1, px0, f * gap, intensity, mode, limit)
+    else:
+        _plot_coverage(canvas, px0, int(py), (1.0 - f) * gap, intensity, mode, limit)
+        _plot_coverage(canvas, px0, int(py) + 1, f * gap, intensity, mode, limit)
+    inter_y = y_end + gradient
+
+    # second end point
+    x_end = math.floor(x1 + 0.5)
+    y_end = y1 + gradient * (x_end - x1)
+    gap = x1 + 0.5 - math.floor(x1 + 0.5)
+    px1 = int(x_end)
+    py = math.floor(y_end)
+    f = y_end - py
+    if steep:
+        _plot_coverage(canvas, int(py), px1, (1.0 - f) * gap, intensity, mode, limit)
+        _plot_coverage(canvas, int(py) + 1, px1, f * gap, intensity, mode, limit)
+    else:
+        _plot_coverage(canvas, px1, int(py), (1.0 - f) * gap, intensity, mode, limit)
+        _plot_coverage(canvas, px1, int(py) + 1, f * gap, intensity, mode, limit)
+
+    for x in range(px0 + 1, px1):
+        py = math.floor(inter_y)
+        f = inter_y - py
+        if steep:
+            _plot_coverage(canvas, int(py), x, 1.0 - f, intensity, mode, limit)
+            _plot_coverage(canvas, int(py) + 1, x, f, intensity, mode, limit)
+        else:
+            _plot_coverage(canvas, x, int(py), 1.0 - f, intensity, mode, limit)
+            _plot_coverage(canvas, x, int(py) + 1, f, intensity, mode, limit)
+        inter_y += gradient
+
+
+@nb.njit(cache=True, nogil=True, inline="always")
+def _in_sweep(angle, start, sweep):
+    if abs(sweep) >= 2.0 * math.pi:
+        return True
+    d = angle - start if sweep >= 0.0 else start - angle
+    return d - 2.0 * math.pi * math.floor(d / (2.0 * math.pi)) <= abs(sweep)
+
+
+@nb.njit(cache=True, nogil=True)
+def draw_arc_aa(canvas, cx, cy, radius, start, sweep, intensity, mode=BLEND_MAX, limit=np.inf):
+    """Draw an anti-aliased arc of the circle of radius around (cx, cy).
+
+    The arc starts at angle start (radians, counterclockwise from the x
+    axis) and spans sweep radians, clockwise if negative. Like the Wu
+    line, the flat parts of the circle are walked column by column and
+    the steep parts row by row, splitting every point of the curve
+    between the two pixels it falls between.
+    """
+    diagonal = radius / math.sqrt(2.0)
+    for x in range(int(math.ceil(cx - diagonal)), int(math.floor(cx + diagonal)) + 1):
+        h = math.sqrt(max(radius * radius - (x - cx) * (x - cx), 0.0))
+        for side in (-1.0, 1.0):
+            y = cy + side * h
+            if _in_sweep(math.atan2(y - cy, x - cx), start, sweep):
+                py = math.floor(y)
+                f = y - py
+                _plot_coverage(canvas, x, int(py), 1.0 - f, intensity, mode, limit)
+                _plot_coverage(canvas, x, int(py) + 1, f, intensity, mode, limit)
+    # rows strictly inside the steep parts, the diagonal belongs to the columns
+    for y in range(int(math.floor(cy - diagonal)) + 1, int(math.ceil(cy + diagonal))):
+        h = math.sqrt(max(radius * radius - (y - cy) * (y - cy), 0.0))
+        for side in (-1.0, 1.0):
+            x = cx + side * h
+            if abs(x - cx) > diagonal and _in_sweep(math.atan2(y - cy, x - cx), start, sweep):
+                px = math.floor(x)
+                f = x - px
+                _plot_coverage(canvas, int(px), y, 1.0 - f, intensity, mode, limit)
+                _plot_coverage(canvas, int(px) + 1, y, f, intensity, mode, limit)
+
+
+if __name__ == "__main__":
+    canvas = np.full((128, 128), True)
+    print("Pixels written: {}".format(draw_line(canvas, 64, 64, 200, 90, False)))
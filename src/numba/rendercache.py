@@ -0,0 +1,216 @@
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from interpreter import STATE_SIZE
+
+DEFAULT_MEMORY_BYTES = 64 << 20
+DEFAULT_DISK_BYTES = 1 << 30
+DEFAULT_SLOT_BYTES = 128 * 128 // 8
+
+# Layout of the disk tier file:
+#   header          DISK_HEADER_DTYPE
+#   index           slots * SLOT_DTYPE
+#   canvases        slots * slot_bytes, bit-packed
+DISK_MAGIC = b"TNRC"
+DISK_VERSION = 1
+DISK_HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u4"), ("slots", "<u8"), ("slot_bytes", "<u8"),
+                              ("tick", "<u8")])
+# raw key bytes, an S16 field would drop trailing zero bytes of a key
+SLOT_DTYPE = np.dtype([("key", "V16"), ("used", "<u8"), ("tick", "<u8"), ("shape", "<u8", (2,)),
+                       ("state", "<f8", (STATE_SIZE,))])
+
+
+def render_key(ops, args, turtle):
+    """Return the 16 byte key of rendering ops/args with the fresh turtle.
+
+    Covers the program, the canvas size, the start pose, the mode, the
+    angle unit and the pen, everything the rendered canvas depends on.
+    """
+    state = np.empty(STATE_SIZE)
+    turtle._get_state(state)
+    key = hashlib.blake2b(digest_size=16)
+    key.update(np.ascontiguousarray(ops, dtype=np.int8).tobytes())
+    key.update(np.ascontiguousarray(args, dtype=np.float64).tobytes())
+    key.update(np.array(turtle._canvas.shape, dtype=np.int64).tobytes())
+    key.update(state.tobytes())
+    key.update(str(turtle._mode).encode())
+    key.update(np.array([turtle._degreesPerAU, turtle._pen_color, turtle._pensize, turtle._pencap,
+                         turtle._subpixel], dtype=np.float64).tobytes())
+    return key.digest()
+
+
+class DiskTier(object):
+    """Bit-packed canvases in fixed slots of one memory-mapped file.
+
+    The file holds at most disk_bytes, when it is full the least
+    recently used slot is overwritten. Only one process may write it.
+    Only bool canvases are stored.
+    """
+    def __init__(self, filename, disk_bytes=DEFAULT_DISK_BYTES, slot_bytes=DEFAULT_SLOT_BYTES):
+        if not os.path.exists(filename):
+            slots = max(1, disk_bytes // (slot_bytes + SLOT_DTYPE.itemsize))
+            size = DISK_HEADER_DTYPE.itemsize + slots * (SLOT_DTYPE.itemsize + slot_bytes)
+            with open(filename, "wb") as f:
+                f.truncate(size)
+            self._data = np.memmap(filename, dtype=np.uint8, mode="r+")
+            self._header = self._data[:DISK_HEADER_DTYPE.itemsize].view(DISK_HEADER_DTYPE)
+            self._header["magic"] = DISK_MAGIC
+            self._header["version"] = DISK_VERSION
+            self._header["slots"] = slots
+            self._header["slot_bytes"] = slot_bytes
+        else:
+            self._data = np.memmap(filename, dtype=np.uint8, mode="r+")
+            self._header = self._data[:DISK_HEADER_DTYPE.itemsize].view(DISK_HEADER_DTYPE)
+            if self._header["magic"][0] != DISK_MAGIC or self._header["version"][0] != DISK_VERSION:
+                raise ValueError("{} is not a render cache file".format(filename))
+        slots = int(self._header["slots"][0])
+        self.slot_bytes = int(self._header["slot_bytes"][0])
+        start = DISK_HEADER_DTYPE.itemsize
+        self._index = self._data[start:start + slots * SLOT_DTYPE.itemsize].view(SLOT_DTYPE)
+        start += slots * SLOT_DTYPE.itemsize
+        self._canvases = self._data[start:start + slots * self.slot_bytes].reshape(slots, self.slot_bytes)
+        self._slots = {bytes(self._index["key"][i]): i for i in np.flatnonzero(self._index["used"])}
+
+    def _touch(self, slot):
+        self._header["tick"] += 1
+        self._index["tick"][slot] = self._header["tick"][0]
+
+    def get(self, key):
+        """Return (state, canvas) stored under key, None if missing."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        self._touch(slot)
+        width, height = self._index["shape"][slot]
+        canvas = np.unpackbits(self._canvases[slot], count=int(width * height)).reshape(width, height)
+        return self._index["state"][slot].copy(), canvas.astype(np.bool_)
+
+    def put(self, key, state, canvas):
+        """Store canvas and the final pose state under key."""
+        if canvas.dtype != np.bool_:
+            return
+        packed = np.packbits(canvas)
+        if len(packed) > self.slot_bytes or key in self._slots:
+            return
+        free = np.flatnonzero(self._index["used"] == 0)
+        slot = int(free[0]) if len(free) else int(np.argmin(self._index["tick"]))
+        if self._index["used"][slot]:
+            del self._slots[bytes(self._index["key"][slot])]
+        self._canvases[slot, :len(packed)] = packed
+        self._index["key"][slot] = key
+        self._index["shape"][slot] = canvas.shape
+        self._index["state"][slot] = state
+        self._index["used"][slot] = 1
+        self._touch(slot)
+        self._slots[key] = slot
+
+    def flush(self):
+        self._data.flush()
+
+    def __len__(self):
+        return len(self._slots)
+
+
+class RenderCache(object):
+    """Content-addressed cache of rendered programs.
+
+    Rendering the same program from the same start returns the cached
+    canvas instead of rasterizing it again. The memory tier keeps up to
+    memory_bytes of canvases, least recently used first out; the
+    optional disk tier persists bit-packed canvases across runs.
+
+    Example:
+    >>> cache = RenderCache(TNavigator, "renders.tnrc")
+    >>> turtle = cache.render(ops, args)
+    """
+    def __init__(self, factory, filename=None, memory_bytes=DEFAULT_MEMORY_BYTES,
+                 disk_bytes=DEFAULT_DISK_BYTES, slot_bytes=DEFAULT_SLOT_BYTES):
+        """Arguments:
+        factory -- callable returning a fresh navigator, e.g. TNavigator
+        filename (optional) -- file of the disk tier, no disk tier if None
+        memory_bytes (optional) -- size bound of the memory tier
+        disk_bytes (optional) -- size bound of the disk tier file
+        slot_bytes (optional) -- size of the largest packed canvas on disk
+        """
+        self._factory = factory
+        self.memory_bytes = memory_bytes
+        self._memory = OrderedDict()
+        self.nbytes = 0
+        self.disk = DiskTier(filename, disk_bytes, slot_bytes) if filename else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def render(self, ops, args):
+        """Return a fresh navigator showing the program ops/args."""
+        turtle = self._factory()
+        key = render_key(ops, args, turtle)
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+        elif self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self.disk_hits += 1
+        if entry is None:
+            self.misses += 1
+            turtle.run(ops, args)
+            if turtle._state_top:
+                # pushed states are not cached, render such programs every time
+                return turtle
+            state = np.empty(STATE_SIZE)
+            turtle._get_state(state)
+            self._remember(key, (state, turtle._canvas.copy()))
+            if self.disk is not None:
+                self.disk.put(key, state, turtle._canvas)
+            return turtle
+        state, canvas = entry
+        turtle._canvas[:] = canvas
+        turtle._set_state(state)
+        # the trackers follow the cached canvas, like after TNavigator.restore()
+        if hasattr(turtle, "_canvas_replaced"):
+            turtle._canvas_replaced()
+        return turtle
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self.nbytes += entry[1].nbytes
+        while self.nbytes > self.memory_bytes and self._memory:
+            self.nbytes -= self._memory.popitem(last=False)[1][1].nbytes
+
+    def stats(self):
+        """Return the cache statistics as a dict."""
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0,
+                "memory_entries": len(self._memory), "memory_bytes": self.nbytes,
+                "disk_entries": len(self.disk) if self.disk is not None else 0}
+
+    def flush(self):
+        """Write the disk tier to disk."""
+        if self.disk is not None:
+            self.disk.flush()
+
+
+if __name__ == "__main__":
+    import time
+    from lsystem import LSystem
+    from TNavigator_vecNumba import TNavigator
+
+    plant = LSystem("X", {"X": "F+[[X]-X]-F[-FX]+X", "F": "FF"}, angle=25, step=1)
+    ops, args = plant.compile(7)
+    if os.path.exists("/tmp/renders.tnrc"):
+        os.remove("/tmp/renders.tnrc")
+    cache = RenderCache(TNavigator, "/tmp/renders.tnrc", disk_bytes=1 << 20)
+    for label in ("miss", "memory hit"):
+        start = time.time()
+        cache.render(ops, args)
+        print("{}: {} seconds".format(label, time.time() - start))
+    cache.flush()
+    cache = RenderCache(TNavigator, "/tmp/renders.tnrc")
+    start = time.time()
+    cache.render(ops, args)
+    print("disk hit: {} seconds, {}".format(time.time() - start, cache.stats()))
@@ -0,0 +1,177 @@
+import sys
+import json
+import threading
+import queue
+from interpreter import (new_program, OP_FORWARD, OP_MOVE, OP_LEFT, OP_RIGHT, OP_PUSH, OP_POP,
+                         OP_PENUP, OP_PENDOWN)
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+DEFAULT_PREFETCH = 2
+# seconds between the checks of a blocked prefetch thread for a stopped consumer
+PREFETCH_POLL = 0.1
+
+# command name -> (opcode, sign of the argument)
+COMMANDS = {
+    "forward": (OP_FORWARD, 1.0), "fd": (OP_FORWARD, 1.0),
+    "backward": (OP_FORWARD, -1.0), "back": (OP_FORWARD, -1.0), "bk": (OP_FORWARD, -1.0),
+    "move": (OP_MOVE, 1.0),
+    "left": (OP_LEFT, 1.0), "lt": (OP_LEFT, 1.0),
+    "right": (OP_RIGHT, 1.0), "rt": (OP_RIGHT, 1.0),
+    "push": (OP_PUSH, 0.0), "push_state": (OP_PUSH, 0.0),
+    "pop": (OP_POP, 0.0), "pop_state": (OP_POP, 0.0),
+    "penup": (OP_PENUP, 0.0), "pu": (OP_PENUP, 0.0), "up": (OP_PENUP, 0.0),
+    "pendown": (OP_PENDOWN, 0.0), "pd": (OP_PENDOWN, 0.0), "down": (OP_PENDOWN, 0.0),
+}
+
+
+def iter_lines(source):
+    """Yield the lines of source: a file name, '-' for stdin or a file object."""
+    if source == "-":
+        source = sys.stdin
+    if isinstance(source, str):
+        with open(source) as f:
+            for line in f:
+                yield line
+    else:
+        for line in source:
+            yield line
+
+
+def parse_command(line):
+    """Return the (opcode, arg) of one command line, None for blank lines.
+
+    A line is either text, e.g. "forward 20" or "left 90", or a JSON
+    object like {"cmd": "forward", "arg": 20}. '#' starts a comment.
+    Malformed lines raise ValueError.
+    """
+    line = line.strip()
+    if not line or line[0] == "#":
+        return None
+    if line[0] == "{":
+        record = json.loads(line)
+        if "cmd" not in record:
+            raise ValueError("JSON command without 'cmd'")
+        name, arg = record["cmd"], record.get("arg", 0.0)
+        if not isinstance(name, str):
+            raise ValueError("'cmd' must be a string, not {!r}".format(name))
+        if isinstance(arg, bool) or not isinstance(arg, (int, float, str)):
+            raise ValueError("'arg' must be a number, not {!r}".format(arg))
+    else:
+        parts = line.split()
+        if len(parts) > 2:
+            raise ValueError("expected '<command> [arg]', got {!r}".format(line))
+        name, arg = parts[0], parts[1] if len(parts) == 2 else 0.0
+    name = name.lower()
+    if name not in COMMANDS:
+        raise ValueError("unknown command {!r}".format(name))
+    op, sign = COMMANDS[name]
+    return op, sign * float(arg)
+
+
+def parse_chunks(lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (ops, args) programs of at most chunk_size commands parsed from lines.
+
+    Every chunk gets fresh arrays, so chunks may be held while the next
+    one is parsed.
+    """
+    ops, args = new_program(chunk_size)
+    n = 0
+    for lineno, line in enumerate(lines, 1):
+        try:
+            command = parse_command(line)
+        except (KeyError, ValueError) as e:
+            raise ValueError("line {}: cannot parse {!r} ({})".format(lineno, line.strip(), e))
+        if command is None:
+            continue
+        ops[n], args[n] = command
+        n += 1
+        if n == chunk_size:
+            yield ops, args
+            ops, args = new_program(chunk_size)
+            n = 0
+    if n:
+        yield ops[:n], args[:n]
+
+
+def prefetch(chunks, depth=DEFAULT_PREFETCH):
+    """Produce the items of chunks in a background thread, at most depth ahead.
+
+    The native kernels release the GIL, so parsing the next chunks
+    overlaps with rendering the current one while memory stays bounded.
+    When the consumer stops early, or the generator is closed, the
+    thread stops and closes chunks, releasing the file it reads.
+    """
+    done = object()
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    failure = []
+
+    def put(item):
+        # give up once the consumer is gone
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=PREFETCH_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    break
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+            put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = buffer.get()
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        stop.set()
+        # wake a producer blocked on the full queue
+        while True:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                break
+        thread.join()
+    if failure:
+        raise failure[0]
+
+
+def run_stream(turtle, source, chunk_size=DEFAULT_CHUNK_SIZE, depth=DEFAULT_PREFETCH):
+    """Execute the command log source with turtle, chunk by chunk.
+
+    Returns the number of commands executed.
+
+    Example:
+    >>> turtle = TNavigator()
+    >>> run_stream(turtle, "commands.txt")
+    """
+    count = 0
+    for ops, args in prefetch(parse_chunks(iter_lines(source), chunk_size), depth):
+        turtle.run(ops, args)
+        count += len(ops)
+    return count
+
+
+if __name__ == "__main__":
+    import time
+    from TNavigator_vecNumba import TNavigator
+
+    # python stream.py commands.txt, or pipe the commands to stdin
+    source = sys.argv[1] if len(sys.argv) > 1 else "-"
+    turtle = TNavigator()
+    start = time.time()
+    count = run_stream(turtle, source)
+    print("Executed {} commands in {} seconds".format(count, time.time() - start))
@@ -0,0 +1,249 @@
+import numba as nb
+import numpy as np
+from raster import _plot, blend_limit, BLEND_OVERWRITE
+
+# Sparse canvas: square tiles of 2**shift pixels a side, allocated from
+# a pool the first time a stroke lands in them. The directory is a typed
+# dict from the tile key, the tile coordinates (x >> shift, y >> shift)
+# packed by _tile_key(), to the pool index of the tile. Tiles missing
+# from it were never drawn, their pixels are background. Memory grows
+# with the tiles drawn, however far apart they are.
+
+DEFAULT_TILE_SHIFT = 6
+DEFAULT_TILES = 64
+NO_TILE = -1
+# rough memory of a directory entry, for nbytes
+DIRECTORY_ENTRY_BYTES = 64
+
+
+def new_directory():
+    """Return an empty tile directory."""
+    return nb.typed.Dict.empty(key_type=nb.types.int64, value_type=nb.types.int64)
+
+
+@nb.njit(cache=True, nogil=True, inline="always")
+def _tile_key(tx, ty):
+    # tile coordinates up to 2**31 tiles away from the origin
+    return (tx << 32) + (ty & 0xFFFFFFFF)
+
+
+@nb.njit(cache=True, nogil=True)
+def _line_step(x, y, x1, y1, dx, dy, sx, sy, error):
+    e2 = 2 * error
+    if e2 >= dy:
+        error += dy
+        x += sx
+    if e2 <= dx:
+        error += dx
+        y += sy
+    return x, y, error
+
+
+@nb.njit(cache=True, nogil=True)
+def allocate_line_tiles(directory, shift, x0, y0, x1, y1, width, height, next_tile):
+    """Give the tiles a bresenham line passes through a pool index.
+
+    Walks the line like draw_line() and numbers the missing tiles from
+    next_tile on, pixels outside width/height are skipped when width > 0.
+    Returns the next free pool index.
+    """
+    dx = abs(x1 - x0)
+    dy = -abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    error = dx + dy
+    x = x0
+    y = y0
+    last = _tile_key(x0 >> shift, y0 >> shift)
+    first = True
+    while x != x1 or y != y1:
+        x, y, error = _line_step(x, y, x1, y1, dx, dy, sx, sy, error)
+        if width > 0 and not (0 <= x < width and 0 <= y < height):
+            continue
+        key = _tile_key(x >> shift, y >> shift)
+        if first or key != last:
+            if key not in directory:
+                directory[key] = next_tile
+                next_tile += 1
+            last = key
+            first = False
+    return next_tile
+
+
+@nb.njit(cache=True, nogil=True)
+def draw_line_tiled(tiles, directory, shift, x0, y0, x1, y1, width, height, color, mode, limit):
+    """Draw a bresenham line into the tiles, like draw_line() into a dense canvas.
+
+    The tiles must have been allocated by allocate_line_tiles(). Returns
+    the number of pixels written.
+    """
+    mask = (1 << shift) - 1
+    dx = abs(x1 - x0)
+    dy = -abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    error = dx + dy
+    x = x0
+    y = y0
+    written = 0
+    last = _tile_key(x0 >> shift, y0 >> shift)
+    tile = NO_TILE
+    while x != x1 or y != y1:
+        x, y, error = _line_step(x, y, x1, y1, dx, dy, sx, sy, error)
+        if width > 0 and not (0 <= x < width and 0 <= y < height):
+            continue
+        key = _tile_key(x >> shift, y >> shift)
+        if tile == NO_TILE or key != last:
+            tile = directory[key]
+            last = key
+        _plot(tiles[tile], x & mask, y & mask, color, mode, limit)
+        written += 1
+    return written
+
+
+@nb.njit(cache=True, nogil=True)
+def tile_coords(directory, count):
+    """Return the (count, 2) tile coordinates of the pool indices in directory."""
+    coords = np.empty((count, 2), dtype=np.int64)
+    for key, tile in directory.items():
+        coords[tile, 0] = key >> 32
+        # sign extend the low 32 bits
+        coords[tile, 1] = ((key & 0xFFFFFFFF) ^ 0x80000000) - 0x80000000
+    return coords
+
+
+@nb.njit(cache=True, nogil=True)
+def stitch(tiles, directory, shift, x, y, out):
+    """Copy the tiles overlapping the window at (x, y) of out's shape into out."""
+    size = 1 << shift
+    width, height = out.shape
+    for tx in range(x >> shift, ((x + width - 1) >> shift) + 1):
+        for ty in range(y >> shift, ((y + height - 1) >> shift) + 1):
+            key = _tile_key(tx, ty)
+            if key not in directory:
+                continue
+            tile = directory[key]
+            px0 = max(tx * size, x)
+            px1 = min((tx + 1) * size, x + width)
+            py0 = max(ty * size, y)
+            py1 = min((ty + 1) * size, y + height)
+            out[px0 - x:px1 - x, py0 - y:py1 - y] = tiles[tile, px0 - tx * size:px1 - tx * size,
+                                                          py0 - ty * size:py1 - ty * size]
+
+
+class TiledCanvas(object):
+    """Canvas allocating fixed-size tiles only where strokes land.
+
+    Bounded to shape like the dense canvas, or unbounded if shape is
+    None, then any integer coordinates can be drawn. Memory grows with
+    the number of tiles drawn into, not with the drawing area.
+
+    Example:
+    >>> canvas = TiledCanvas()
+    >>> canvas.draw_line(-100000, 5, 100000, 5, False)
+    >>> canvas.window(-10, 0, 20, 10)
+    """
+    def __init__(self, shape=None, tile_shift=DEFAULT_TILE_SHIFT, tiles=DEFAULT_TILES, background=True,
+                 dtype=np.bool_, blend=BLEND_OVERWRITE):
+        """Arguments:
+        shape (optional) -- (width, height) of a bounded canvas, None for unbounded
+        tile_shift (optional) -- tiles are 2**tile_shift pixels a side
+        tiles (optional) -- initial capacity of the tile pool
+        background (optional) -- value of the pixels never drawn
+        dtype (optional) -- pixel type, bool or e.g. uint8 intensities
+        blend (optional) -- how strokes combine with the pixels, see raster
+        """
+        self.shape = tuple(shape) if shape is not None else None
+        self.shift = int(tile_shift)
+        self.tile_size = 1 << self.shift
+        self.background = background
+        self.blend = blend
+        self._limit = blend_limit(dtype)
+        self._tiles = np.full((tiles, self.tile_size, self.tile_size), background, dtype=dtype)
+        self._count = 0
+        self._directory = new_directory()
+
+    @property
+    def dtype(self):
+        return self._tiles.dtype
+
+    @property
+    def tile_count(self):
+        """Number of tiles allocated."""
+        return self._count
+
+    @property
+    def nbytes(self):
+        """Memory of the tile pool and, roughly, of the directory."""
+        return self._tiles.nbytes + self._count * DIRECTORY_ENTRY_BYTES
+
+    def draw_line(self, x0, y0, x1, y1, color):
+        """Draw a line like raster.draw_line(), the start pixel is not drawn.
+
+        Returns the number of pixels written.
+        """
+        x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+        if self.shape is None:
+            width = height = 0
+        else:
+            width, height = self.shape
+        count = allocate_line_tiles(self._directory, self.shift, x0, y0, x1, y1, width, height, self._count)
+        if count > len(self._tiles):
+            grown = np.full((max(2 * len(self._tiles), count), self.tile_size, self.tile_size), self.background,
+                            dtype=self._tiles.dtype)
+            grown[:self._count] = self._tiles[:self._count]
+            self._tiles = grown
+        self._count = count
+        return draw_line_tiled(self._tiles, self._directory, self.shift, x0, y0, x1, y1, width, height, color,
+                               self.blend, self._limit)
+
+    def bounds(self):
+        """Return (x, y, width, height) of the area covered by tiles, None if nothing was drawn."""
+        if self._count == 0:
+            return None
+        coords = tile_coords(self._directory, self._count)
+        x = int(coords[:, 0].min()) << self.shift
+        y = int(coords[:, 1].min()) << self.shift
+        return x, y, (int(coords[:, 0].max()) + 1 << self.shift) - x, (int(coords[:, 1].max()) + 1 << self.shift) - y
+
+    def window(self, x, y, width, height):
+        """Return the pixels of the window at (x, y) of size width x height as a dense array."""
+        out = np.full((width, height), self.background, dtype=self._tiles.dtype)
+        if self._count:
+            stitch(self._tiles, self._directory, self.shift, x, y, out)
+        return out
+
+    def to_array(self):
+        """Return a bounded canvas, or the drawn area of an unbounded one, as a dense array."""
+        if self.shape is not None:
+            return self.window(0, 0, *self.shape)
+        bounds = self.bounds()
+        if bounds is None:
+            return np.full((0, 0), self.background, dtype=self._tiles.dtype)
+        return self.window(*bounds)
+
+    def iter_tiles(self):
+        """Yield (x, y, tile) of every allocated tile, tile is a view of its pixels at (x, y)."""
+        for tile, (tx, ty) in enumerate(tile_coords(self._directory, self._count)):
+            yield int(tx) << self.shift, int(ty) << self.shift, self._tiles[tile]
+
+    def copy(self):
+        """Return an independent copy of the canvas."""
+        canvas = object.__new__(TiledCanvas)
+        canvas.__dict__.update(self.__dict__)
+        canvas._tiles = self._tiles[:max(self._count, 1)].copy()
+        canvas._directory = self._directory.copy()
+        return canvas
+
+
+if __name__ == "__main__":
+    import timeit
+
+    rng = np.random.default_rng(0)
+    canvas = TiledCanvas((32768, 32768))
+    points = np.clip(np.cumsum(rng.integers(-200, 200, (10001, 2)), axis=0) + 16384, 0, 32767)
+    def draw():
+        for (x0, y0), (x1, y1) in zip(points[:-1], points[1:]):
+            canvas.draw_line(x0, y0, x1, y1, False)
+    print("Time taken per line on a 32768x32768 canvas (in seconds): {}".format(timeit.timeit(draw, number=1) / 10000))
+    print("{} tiles, {} MB instead of {} MB dense".format(canvas.tile_count, canvas.nbytes >> 20, 32768 * 32768 >> 20))
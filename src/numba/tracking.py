@@ -0,0 +1,234 @@
+import numba as nb
+import numpy as np
+
+# Trackers keep statistics of the canvas up to date while it is drawn.
+# They see the canvas changes as (flat pixel index, value before, value
+# after) transitions in the order they happened, so the work per stroke
+# is proportional to the pixels it changed. Ink is a False pixel.
+
+# layout of the loss counts
+LOSS_DRAWN = 0
+LOSS_INTERSECTION = 1
+
+DEFAULT_ZOBRIST_SEED = 0
+# zobrist tables by (canvas shape, seed), shared by all navigators
+_zobrist_tables = {}
+
+
+@nb.njit(cache=True, nogil=True)
+def count_loss(canvas, target, counts):
+    """Count drawn and intersecting pixels of canvas and the target ink mask from scratch."""
+    drawn = 0
+    intersection = 0
+    for x in range(canvas.shape[0]):
+        for y in range(canvas.shape[1]):
+            if not canvas[x, y]:
+                drawn += 1
+                if target[x, y]:
+                    intersection += 1
+    counts[LOSS_DRAWN] = drawn
+    counts[LOSS_INTERSECTION] = intersection
+
+
+@nb.njit(cache=True, nogil=True)
+def update_loss(target, pixels, was, now, counts):
+    """Apply the canvas transitions pixels/was/now to the loss counts."""
+    height = target.shape[1]
+    for i in range(pixels.shape[0]):
+        if was[i] == now[i]:
+            continue
+        delta = -1 if now[i] else 1
+        counts[LOSS_DRAWN] += delta
+        if target[pixels[i] // height, pixels[i] % height]:
+            counts[LOSS_INTERSECTION] += delta
+
+
+def target_ink(target, shape):
+    """Return the ink mask of a target image.
+
+    target is either a bool canvas (False is ink) or a grayscale image
+    like the ones of _get_image_cv2() (dark is ink).
+    """
+    target = np.asarray(target)
+    if target.shape != shape:
+        raise ValueError("target shape {} does not match the canvas shape {}".format(target.shape, shape))
+    if target.dtype == np.bool_:
+        return ~target
+    return target < 128
+
+
+def loss_from_counts(drawn, intersection, target_total, size, kind="iou"):
+    """Return the loss for the given counts, works elementwise on arrays.
+
+    kind -- "iou" for 1 - intersection/union, "l1" for the fraction of
+    mismatching pixels
+    """
+    union = drawn + target_total - intersection
+    if kind == "iou":
+        return 1.0 - np.where(union > 0, intersection / np.maximum(union, 1), 1.0)
+    if kind == "l1":
+        return (union - intersection) / size
+    raise ValueError("unknown loss {!r}".format(kind))
+
+
+def batch_loss(turtles, kind="iou"):
+    """Return the losses of many navigators with a target as an array."""
+    counts = np.array([t._loss_counts for t in turtles])
+    totals = np.array([t._target_total for t in turtles])
+    sizes = np.array([t._canvas.size for t in turtles])
+    return loss_from_counts(counts[:, LOSS_DRAWN], counts[:, LOSS_INTERSECTION], totals, sizes, kind)
+
+
+@nb.njit(cache=True)
+def splitmix64(x):
+    """Return the next splitmix64 output of the uint64 state x, the state then advances by 0x9E3779B97F4A7C15."""
+    x = (x + np.uint64(0x9E3779B97F4A7C15))
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+@nb.njit(cache=True)
+def _zobrist_keys(size, seed):
+    """Return size keys of the splitmix64 sequence of seed."""
+    keys = np.empty(size, dtype=np.uint64)
+    state = seed
+    for i in range(size):
+        keys[i] = splitmix64(state)
+        state += np.uint64(0x9E3779B97F4A7C15)
+    return keys
+
+
+def zobrist_table(shape, seed=DEFAULT_ZOBRIST_SEED):
+    """Return the random 64-bit key of every pixel of a canvas of shape.
+
+    The keys only depend on shape and seed, so equal drawings hash equal
+    in every navigator, every process and every numpy version: they come
+    from splitmix64, not from a numpy generator.
+    """
+    key = (tuple(shape), seed)
+    if key not in _zobrist_tables:
+        _zobrist_tables[key] = _zobrist_keys(int(np.prod(shape)), np.uint64(seed & 0xFFFFFFFFFFFFFFFF))
+    return _zobrist_tables[key]
+
+
+@nb.njit(cache=True, nogil=True)
+def zobrist_hash(canvas, table):
+    """Return the xor of the keys of all ink pixels of canvas."""
+    h = np.uint64(0)
+    height = canvas.shape[1]
+    for x in range(canvas.shape[0]):
+        for y in range(height):
+            if not canvas[x, y]:
+                h ^= table[x * height + y]
+    return h
+
+
+@nb.njit(cache=True, nogil=True)
+def update_zobrist(table, pixels, was, now, h):
+    """Apply the canvas transitions pixels/was/now to the hash h[0]."""
+    for i in range(pixels.shape[0]):
+        if was[i] != now[i]:
+            h[0] ^= table[pixels[i]]
+
+
+@nb.njit(cache=True)
+def pose_hash(state):
+    """Return a 64-bit hash of a pose vector, to combine with a canvas hash."""
+    h = np.uint64(0)
+    bits = state.view(np.uint64)
+    for i in range(bits.shape[0]):
+        h = splitmix64(h ^ bits[i])
+    return h
+
+
+DEFAULT_DISTANCE_RADIUS = 16
+# disc offsets by radius, shared by all navigators
+_distance_offsets = {}
+
+
+def distance_offsets(radius):
+    """Return the (dx, dy, distance) of every offset of the disc of radius, nearest first."""
+    if radius not in _distance_offsets:
+        dx, dy = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        d = np.hypot(dx, dy)
+        inside = d < radius
+        order = np.argsort(d[inside], kind="stable")
+        _distance_offsets[radius] = (dx[inside][order].astype(np.int64), dy[inside][order].astype(np.int64),
+                                     d[inside][order].astype(np.float32))
+    return _distance_offsets[radius]
+
+
+@nb.njit(cache=True, nogil=True)
+def _stamp_distance(dist, x, y, off_x, off_y, off_d):
+    width, height = dist.shape
+    for k in range(off_x.shape[0]):
+        qx = x + off_x[k]
+        qy = y + off_y[k]
+        if 0 <= qx < width and 0 <= qy < height and off_d[k] < dist[qx, qy]:
+            dist[qx, qy] = off_d[k]
+
+
+@nb.njit(cache=True, nogil=True)
+def _nearest_ink(canvas, x, y, off_x, off_y, off_d, radius):
+    width, height = canvas.shape
+    # the offsets are sorted by distance, the first ink found is the nearest
+    for k in range(off_x.shape[0]):
+        qx = x + off_x[k]
+        qy = y + off_y[k]
+        if 0 <= qx < width and 0 <= qy < height and not canvas[qx, qy]:
+            return off_d[k]
+    return radius
+
+
+@nb.njit(cache=True, nogil=True)
+def count_distance(canvas, dist, off_x, off_y, off_d, radius):
+    """Compute the distance to the nearest ink pixel, capped at radius, from scratch."""
+    dist[:, :] = radius
+    for x in range(canvas.shape[0]):
+        for y in range(canvas.shape[1]):
+            if not canvas[x, y]:
+                _stamp_distance(dist, x, y, off_x, off_y, off_d)
+
+
+@nb.njit(cache=True, nogil=True)
+def update_distance(canvas, dist, pixels, was, now, off_x, off_y, off_d, radius):
+    """Apply the canvas transitions pixels/was/now to the distance field.
+
+    New ink lowers the distances within radius around it. Erased ink can
+    only raise distances within radius, those are recomputed in the
+    bounding box of the erased pixels.
+    """
+    width, height = canvas.shape
+    r = int(np.ceil(radius))
+    x_min, y_min, x_max, y_max = width, height, -1, -1
+    for i in range(pixels.shape[0]):
+        if was[i] == now[i]:
+            continue
+        x = pixels[i] // height
+        y = pixels[i] % height
+        if now[i]:
+            x_min = min(x_min, x - r)
+            y_min = min(y_min, y - r)
+            x_max = max(x_max, x + r)
+            y_max = max(y_max, y + r)
+        elif not canvas[x, y]:
+            _stamp_distance(dist, x, y, off_x, off_y, off_d)
+    for x in range(max(0, x_min), min(width, x_max + 1)):
+        for y in range(max(0, y_min), min(height, y_max + 1)):
+            dist[x, y] = _nearest_ink(canvas, x, y, off_x, off_y, off_d, radius)
+
+
+@nb.njit(cache=True, nogil=True)
+def sample_distance(dist, xs, ys, radius, out):
+    """Write the distance field at the rounded points xs/ys to out, radius outside the canvas."""
+    width, height = dist.shape
+    for i in range(xs.shape[0]):
+        x = int(round(xs[i]))
+        y = int(round(ys[i]))
+        out[i] = dist[x, y] if 0 <= x < width and 0 <= y < height else radius
+
+
+def batch_stroke_distance(turtles):
+    """Return the distance to the nearest stroke at the position of every navigator."""
+    return np.array([t.stroke_distance() for t in turtles], dtype=np.float32)
@@ -0,0 +1,210 @@
+import math
+from multiprocessing import shared_memory
+import numba as nb
+import numpy as np
+import constants
+from raster import draw_line_logged
+from interpreter import STATE_X, STATE_Y, STATE_ORIENT_X, STATE_ORIENT_Y, STATE_PEN, STATE_SIZE
+from egocentric import sample_view, view_shape, SAMPLE_NEAREST
+
+# Vectorized environments: N turtles whose canvases are stacked in one
+# (N, width, height) array and whose poses are the rows of an
+# (N, STATE_SIZE) array of interpreter pose vectors. An action indexes a
+# row of the action table, a turn in degrees followed by a forward move
+# with the pen down. The reward is the number of newly inked pixels.
+# Observations are the egocentric views of the turtles, written into an
+# (N, height, width) float32 array that may live in shared memory.
+
+# columns of the action table
+ACTION_TURN = 0
+ACTION_DISTANCE = 1
+# straight on, left or right by 15 degrees, 2 pixels a step
+DEFAULT_ACTIONS = np.array([[0.0, 2.0], [15.0, 2.0], [-15.0, 2.0]])
+DEFAULT_MAX_STEPS = 256
+DEFAULT_VIEW_SIZE = 32
+
+
+@nb.njit(cache=True, nogil=True)
+def reset_env(canvas, state, start):
+    """Clear canvas and put the pose in state back to start (x, y, orient x, orient y)."""
+    canvas[:, :] = True
+    state[STATE_X] = start[0]
+    state[STATE_Y] = start[1]
+    state[STATE_ORIENT_X] = start[2]
+    state[STATE_ORIENT_Y] = start[3]
+    state[STATE_PEN] = 1.0
+
+
+@nb.njit(cache=True, nogil=True)
+def _observe(canvas, state, view_scale, view_method, out):
+    sample_view(canvas, state[STATE_X], state[STATE_Y], state[STATE_ORIENT_X], state[STATE_ORIENT_Y], view_scale,
+                view_method, 1.0, out)
+
+
+@nb.njit(cache=True, nogil=True, parallel=True)
+def step_envs(canvases, states, steps, actions, table, max_steps, start, log_pixels, log_values, view_scale,
+              view_method, rewards, dones, observations):
+    """Apply one action per environment, auto-reset the finished ones and observe them all.
+
+    An environment is done when its turtle leaves the canvas or after
+    max_steps steps, it is then reset in place and its observation is
+    the one of the new episode. log_pixels/log_values are (N, L)
+    scratch rows with room for the longest move.
+    """
+    width = canvases.shape[1]
+    height = canvases.shape[2]
+    for i in nb.prange(states.shape[0]):
+        state = states[i]
+        rad = table[actions[i], ACTION_TURN] * math.pi / 180.0
+        c = math.cos(rad)
+        s = math.sin(rad)
+        ox = state[STATE_ORIENT_X] * c - state[STATE_ORIENT_Y] * s
+        oy = state[STATE_ORIENT_Y] * c + state[STATE_ORIENT_X] * s
+        distance = table[actions[i], ACTION_DISTANCE]
+        x = state[STATE_X]
+        y = state[STATE_Y]
+        ex = float(round(x + ox * distance))
+        ey = float(round(y + oy * distance))
+        changed = 0
+        if state[STATE_PEN] != 0.0:
+            changed = draw_line_logged(canvases[i], int(x), int(y), int(ex), int(ey), False, log_pixels[i],
+                                       log_values[i], 0)
+        state[STATE_X] = ex
+        state[STATE_Y] = ey
+        state[STATE_ORIENT_X] = ox
+        state[STATE_ORIENT_Y] = oy
+        rewards[i] = changed
+        steps[i] += 1
+        done = steps[i] >= max_steps or ex < 0.0 or ey < 0.0 or ex >= width or ey >= height
+        dones[i] = done
+        if done:
+            reset_env(canvases[i], state, start)
+            steps[i] = 0
+        _observe(canvases[i], state, view_scale, view_method, observations[i])
+
+
+@nb.njit(cache=True, nogil=True, parallel=True)
+def reset_envs(canvases, states, steps, start, view_scale, view_method, observations):
+    """Reset all environments and observe them."""
+    for i in nb.prange(states.shape[0]):
+        reset_env(canvases[i], states[i], start)
+        steps[i] = 0
+        _observe(canvases[i], states[i], view_scale, view_method, observations[i])
+
+
+def attach_observations(name, num_envs, view_size=DEFAULT_VIEW_SIZE):
+    """Return (shared memory, observation array) of the environments with shared memory name.
+
+    For learner processes, keep the shared memory object alive while
+    the array is used and close() it afterwards.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray((num_envs,) + view_shape(view_size), dtype=np.float32, buffer=shm.buf)
+
+
+class VecTurtleEnv(object):
+    """Batch of turtle drawing environments stepped in one native call.
+
+    step() applies an (N,) array of action indices to all environments
+    at once, resets the finished ones in place and writes the egocentric
+    view of every turtle into the observation array, shared memory by
+    default so learner processes can read it without copies.
+
+    Example:
+    >>> env = VecTurtleEnv(256)
+    >>> observations = env.reset()
+    >>> observations, rewards, dones = env.step(np.zeros(256, dtype=np.int64))
+    >>> env.close()
+    """
+    def __init__(self, num_envs, shape=(128, 128), actions=DEFAULT_ACTIONS, max_steps=DEFAULT_MAX_STEPS,
+                 view_size=DEFAULT_VIEW_SIZE, view_scale=1.0, view_method=SAMPLE_NEAREST, shared=True):
+        """Arguments:
+        num_envs -- number of environments
+        shape (optional) -- (width, height) of every canvas
+        actions (optional) -- (A, 2) action table of ACTION_TURN degrees and ACTION_DISTANCE pixels
+        max_steps (optional) -- steps after which an episode ends
+        view_size (optional) -- (height, width) of the observations, or an int
+        view_scale (optional) -- canvas pixels per observation pixel
+        view_method (optional) -- SAMPLE_NEAREST or SAMPLE_BILINEAR
+        shared (optional) -- put the observations into shared memory
+        """
+        self.num_envs = int(num_envs)
+        self.action_table = np.ascontiguousarray(actions, dtype=np.float64)
+        self.max_steps = int(max_steps)
+        self.view_scale = float(view_scale)
+        self.view_method = view_method
+        self.canvases = np.full((self.num_envs,) + tuple(shape), True)
+        self.states = np.zeros((self.num_envs, STATE_SIZE))
+        self.steps = np.zeros(self.num_envs, dtype=np.int64)
+        self.rewards = np.zeros(self.num_envs, dtype=np.float32)
+        self.dones = np.zeros(self.num_envs, dtype=np.bool_)
+        # the start pose of TNavigator, heading up in logo mode
+        self._start = np.array([constants.start_x, constants.start_y, 0.0, 1.0])
+        longest = int(np.abs(self.action_table[:, ACTION_DISTANCE]).max()) + 2
+        self._log_pixels = np.empty((self.num_envs, longest), dtype=np.int64)
+        self._log_values = np.empty((self.num_envs, longest), dtype=np.bool_)
+        obs_shape = (self.num_envs,) + view_shape(view_size)
+        self._shm = None
+        if shared:
+            self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(obs_shape)) * 4)
+            self.observations = np.ndarray(obs_shape, dtype=np.float32, buffer=self._shm.buf)
+        else:
+            self.observations = np.empty(obs_shape, dtype=np.float32)
+        self.reset()
+
+    @property
+    def shm_name(self):
+        """Name of the shared memory of the observations for attach_observations(), None if not shared."""
+        return self._shm.name if self._shm is not None else None
+
+    def reset(self):
+        """Reset all environments, returns the observations."""
+        reset_envs(self.canvases, self.states, self.steps, self._start, self.view_scale, self.view_method,
+                   self.observations)
+        self.dones[:] = False
+        return self.observations
+
+    def step(self, actions):
+        """Apply the (N,) action indices, returns (observations, rewards, dones).
+
+        The returned arrays are reused by the next step. The observation
+        of a done environment is the first one of its next episode.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.shape != (self.num_envs,):
+            raise ValueError("expected {} actions, got shape {}".format(self.num_envs, actions.shape))
+        if actions.min() < 0 or actions.max() >= len(self.action_table):
+            raise ValueError("actions must index the {} rows of the action table".format(len(self.action_table)))
+        step_envs(self.canvases, self.states, self.steps, actions, self.action_table, self.max_steps, self._start,
+                  self._log_pixels, self._log_values, self.view_scale, self.view_method, self.rewards, self.dones,
+                  self.observations)
+        return self.observations, self.rewards, self.dones
+
+    def render(self, index):
+        """Return the canvas of environment index as an image like TNavigator._get_image_cv2()."""
+        return np.array(self.canvases[index], dtype=np.uint8) * 255
+
+    def close(self):
+        """Release the shared memory of the observations."""
+        if self._shm is not None:
+            self.observations = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+if __name__ == "__main__":
+    import timeit
+
+    env = VecTurtleEnv(256)
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, len(env.action_table), (1000, env.num_envs))
+    env.step(actions[0])
+    steps = iter(actions)
+    print("Time taken per step of {} environments (in seconds): {}".format(
+        env.num_envs, timeit.timeit(lambda: env.step(next(steps)), number=999) / 999))
+    shm, observations = attach_observations(env.shm_name, env.num_envs)
+    print("Observations seen through shared memory: {}".format(np.array_equal(observations, env.observations)))
+    del observations
+    shm.close()
+    env.close()
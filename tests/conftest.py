@@ -0,0 +1,26 @@
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NUMBA_DIR = os.path.join(ROOT, "src", "numba")
+NON_NUMBA_DIR = os.path.join(ROOT, "src", "non_numba")
+
+# the modules import each other by their flat names
+sys.path.insert(0, NUMBA_DIR)
+
+
+def load_non_numba(name):
+    """Import module name of src/non_numba without shadowing the numba modules of the same names."""
+    shadowed = {key: sys.modules.pop(key) for key in ("constants", "Vec2D") if key in sys.modules}
+    sys.path.insert(0, NON_NUMBA_DIR)
+    try:
+        spec = importlib.util.spec_from_file_location("non_numba_" + name, os.path.join(NON_NUMBA_DIR, name + ".py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(NON_NUMBA_DIR)
+        for key in ("constants", "Vec2D"):
+            sys.modules.pop(key, None)
+        sys.modules.update(shadowed)
+    return module
@@ -0,0 +1,82 @@
+import math
+import numpy as np
+import pytest
+from raster import draw_line_aa, draw_arc_aa, BLEND_ADD, BLEND_MAX
+from TNavigator_vecNumba import TNavigator
+
+LINES = [(10.3, 20.7, 90.1, 47.2), (64.0, 64.0, 64.0, 100.0), (5.5, 120.2, 100.9, 30.4), (30.2, 10.0, 42.9, 110.6)]
+
+
+def aa_line(x0, y0, x1, y1, shape=(128, 128)):
+    canvas = np.zeros(shape, dtype=np.float64)
+    draw_line_aa(canvas, x0, y0, x1, y1, 1.0, BLEND_ADD)
+    return canvas
+
+
+@pytest.mark.parametrize("line", LINES)
+def test_line_coverage_adds_up_to_its_length(line):
+    x0, y0, x1, y1 = line
+    canvas = aa_line(*line)
+    assert np.isclose(canvas.sum(), max(abs(x1 - x0), abs(y1 - y0)))
+    # every inner step of the major axis is covered exactly once
+    steep = abs(y1 - y0) > abs(x1 - x0)
+    major = canvas.sum(axis=0 if steep else 1)
+    low, high = sorted((y0, y1) if steep else (x0, x1))
+    inner = major[int(math.floor(low + 0.5)) + 1:int(math.floor(high + 0.5))]
+    assert np.allclose(inner, 1.0)
+    # the coverage sits on the line
+    xs, ys = np.nonzero(canvas)
+    distance = np.abs((x1 - x0) * (ys - y0) - (y1 - y0) * (xs - x0)) / math.hypot(x1 - x0, y1 - y0)
+    assert distance.max() < 1.0
+
+
+@pytest.mark.parametrize("line", LINES)
+def test_line_is_symmetric(line):
+    x0, y0, x1, y1 = line
+    canvas = aa_line(*line)
+    assert np.allclose(aa_line(x1, y1, x0, y0), canvas)
+    assert np.allclose(aa_line(y0, x0, y1, x1).T, canvas)
+
+
+def test_integer_canvas_rounds_the_coverage():
+    for line in LINES:
+        exact = aa_line(*line)
+        canvas = np.zeros((128, 128), dtype=np.uint8)
+        draw_line_aa(canvas, *line, 255.0, BLEND_MAX, 255)
+        assert np.array_equal(canvas, np.floor(exact * 255 + 0.5).astype(np.uint8))
+
+
+def test_circle_is_symmetric_and_on_the_radius():
+    canvas = np.zeros((128, 128))
+    draw_arc_aa(canvas, 64.0, 64.0, 30.0, 0.0, 2 * math.pi, 1.0, BLEND_MAX)
+    # mirror images about the center pixel, and about the diagonal
+    inner = canvas[1:, 1:]
+    assert np.allclose(inner, inner[::-1, :])
+    assert np.allclose(inner, inner[:, ::-1])
+    assert np.allclose(canvas, canvas.T)
+    xs, ys = np.nonzero(canvas)
+    weights = canvas[xs, ys]
+    assert abs(np.average(np.hypot(xs - 64.0, ys - 64.0), weights=weights) - 30.0) < 0.1
+    assert np.hypot(xs - 64.0, ys - 64.0).max() < 31.5
+
+
+def test_half_arcs_make_the_circle():
+    full = np.zeros((128, 128))
+    halves = np.zeros((128, 128))
+    draw_arc_aa(full, 60.5, 70.2, 25.0, 0.3, 2 * math.pi, 1.0, BLEND_MAX)
+    draw_arc_aa(halves, 60.5, 70.2, 25.0, 0.3, math.pi, 1.0, BLEND_MAX)
+    draw_arc_aa(halves, 60.5, 70.2, 25.0, 0.3, -math.pi, 1.0, BLEND_MAX)
+    assert np.allclose(halves, full)
+
+
+def test_navigator_draws_wu_lines():
+    turtle = TNavigator()
+    turtle.use_canvas(np.float32, BLEND_ADD)
+    turtle.antialias(True)
+    x0, y0 = float(turtle.xcor()), float(turtle.ycor())
+    turtle.left(30)
+    turtle.forward(40)
+    expected = np.zeros((128, 128), dtype=np.float32)
+    draw_line_aa(expected, x0, y0, float(turtle.xcor()), float(turtle.ycor()), 1.0, BLEND_ADD)
+    assert np.allclose(turtle._canvas, expected, atol=1e-5)
+    assert np.isclose(turtle._canvas.sum(), max(abs(turtle.xcor() - x0), abs(turtle.ycor() - y0)))
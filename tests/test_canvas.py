@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from raster import BLEND_ADD, BLEND_MAX
+from TNavigator_vecNumba import TNavigator
+
+
+def trajectory(turtle, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(15):
+        turtle.left(rng.uniform(0, 360))
+        turtle.forward(rng.uniform(5, 30))
+
+
+def test_visit_counts_sum_the_strokes():
+    counts = TNavigator()
+    counts.use_canvas(np.uint16, BLEND_ADD)
+    expected = np.zeros(counts._canvas.shape, dtype=np.uint16)
+    rng = np.random.default_rng(4)
+    for _ in range(12):
+        angle, distance = rng.uniform(0, 360), rng.uniform(20, 50)
+        for turtle in (counts, TNavigator()):
+            turtle.home()
+            turtle.setheading(angle)
+            turtle.forward(distance)
+        expected += ~turtle._canvas
+    assert expected.max() > 1
+    assert np.array_equal(counts._canvas, expected)
+
+
+@pytest.mark.parametrize("dtype, blend", [(np.uint8, BLEND_MAX), (np.uint16, BLEND_ADD), (np.float32, BLEND_ADD)])
+def test_numeric_images_have_dark_ink(dtype, blend):
+    plain = TNavigator()
+    numeric = TNavigator()
+    numeric.use_canvas(dtype, blend)
+    trajectory(plain, 5)
+    trajectory(numeric, 5)
+    image = numeric._get_image_cv2()
+    assert image.dtype == np.uint8
+    assert np.array_equal(image < 255, plain._get_image_cv2() < 255)
+    # the most inked pixel is black
+    assert image.min() == 0 and image.max() == 255
+
+
+def test_intensity_image_as_target():
+    painted = TNavigator()
+    painted.use_canvas(np.uint8)
+    trajectory(painted, 6)
+    turtle = TNavigator()
+    turtle.set_target(painted._get_image_cv2())
+    trajectory(turtle, 6)
+    assert turtle.loss() == 0.0
+
+
+def test_use_canvas_refuses_the_tiled_canvas():
+    turtle = TNavigator()
+    turtle.use_tiled_canvas()
+    with pytest.raises(ValueError):
+        turtle.use_canvas(np.uint8)
+    turtle.forward(10)
+    assert (~turtle.tiled_canvas().to_array()).sum() == 10
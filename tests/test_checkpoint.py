@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import checkpoint as ck
+import TNavigator as jit_navigator
+from raster import CAP_ROUND, CAP_SQUARE
+from TNavigator_vecNumba import TNavigator
+
+
+def draw(turtle):
+    turtle.forward(20, 35)
+    turtle.push_state()
+    turtle.left(80)
+    turtle.forward(15)
+    for _ in range(12):
+        turtle.forward(4, 30)
+
+
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("navigator", [TNavigator, jit_navigator.TNavigator])
+def test_round_trip_continues_identically(navigator, compress):
+    turtle = navigator()
+    draw(turtle)
+    saved = ck.checkpoint(turtle, compress)
+    restored = navigator()
+    ck.restore(restored, saved)
+    for t in (turtle, restored):
+        t.pop_state()
+        t.right(20)
+        t.forward(30)
+    assert np.array_equal(np.asarray(turtle._canvas), np.asarray(restored._canvas))
+    assert list(turtle._line_lengths) == list(restored._line_lengths)
+    assert list(turtle._angles) == list(restored._angles)
+    assert (turtle.xcor(), turtle.ycor()) == (restored.xcor(), restored.ycor())
+
+
+def test_pen_and_subpixel_are_restored():
+    turtle = TNavigator()
+    turtle.pensize(4, CAP_SQUARE)
+    turtle.subpixel(True)
+    turtle.forward(7.3)
+    restored = TNavigator()
+    restored.restore(turtle.checkpoint())
+    assert restored._pensize == 4 and restored._pencap == CAP_SQUARE and restored._subpixel
+    assert restored.ycor() == turtle.ycor()
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_older_versions_are_read_with_defaults(version):
+    turtle = TNavigator()
+    draw(turtle)
+    saved = turtle.checkpoint()
+    current = np.frombuffer(saved[:ck.HEADER_DTYPE.itemsize], dtype=ck.HEADER_DTYPE)
+    old = np.zeros(1, dtype=ck.HEADER_DTYPES[version])
+    for name in old.dtype.names:
+        old[name] = current[name]
+    old["version"] = version
+    restored = TNavigator()
+    restored.pensize(5, CAP_SQUARE)
+    restored.subpixel(True)
+    restored.restore(old.tobytes() + saved[ck.HEADER_DTYPE.itemsize:])
+    assert np.array_equal(restored._canvas, turtle._canvas)
+    assert restored._pensize == 1.0 and restored._pencap == CAP_ROUND and not restored._subpixel
+    assert restored._state_top == turtle._state_top
+
+
+def test_rejects_foreign_buffers_and_tiled_canvases():
+    with pytest.raises(ValueError):
+        ck.restore(TNavigator(), b"JUNK" + bytes(200))
+    turtle = TNavigator()
+    saved = bytearray(turtle.checkpoint())
+    saved[4] = 99
+    with pytest.raises(ValueError):
+        ck.restore(TNavigator(), bytes(saved))
+    turtle.use_tiled_canvas()
+    with pytest.raises(ValueError):
+        turtle.checkpoint()
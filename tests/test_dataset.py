@@ -0,0 +1,54 @@
+import os
+import json
+import numpy as np
+import pytest
+from dataset import build_dataset, load_shard, shard_path, main, PROGRESS
+from randprog import random_canvases
+
+
+def build(directory, **settings):
+    options = dict(count=25, seed=9, shard_size=10, length=32, batch=4, workers=2, report=None)
+    options.update(settings)
+    return build_dataset(str(directory), **options)
+
+
+def test_shards_hold_the_streams(tmp_path):
+    assert build(tmp_path) == 3
+    canvases, ops, args = random_canvases(25, 32, seed=9)
+    for shard in range(3):
+        images, programs, meta = load_shard(str(tmp_path), shard)
+        rows = slice(10 * shard, min(10 * shard + 10, 25))
+        assert np.array_equal(images, canvases[rows])
+        assert len(programs) == len(images)
+        for k in range(len(programs)):
+            program_ops, program_args = programs[k]
+            assert np.array_equal(program_ops, ops[rows][k])
+            assert np.array_equal(program_args, args[rows][k])
+        assert meta["stream"].tolist() == list(range(25))[rows]
+        assert meta["ink"].tolist() == (~canvases[rows]).sum(axis=(1, 2)).tolist()
+
+
+def test_resume_rebuilds_the_unfinished_shards_only(tmp_path):
+    build(tmp_path)
+    expected = np.load(shard_path(str(tmp_path), 1, ".npy"))
+    kept = os.path.getmtime(shard_path(str(tmp_path), 0, ".npy"))
+    # an interrupted run: shard 1 half written and not listed as finished
+    with open(shard_path(str(tmp_path), 1, ".npy"), "r+b") as f:
+        f.truncate(200)
+    with open(os.path.join(str(tmp_path), PROGRESS), "w") as f:
+        json.dump({"finished": [0, 2]}, f)
+    # the batch size may change on resume, it does not change the images
+    build(tmp_path, batch=3, workers=1)
+    assert np.array_equal(np.load(shard_path(str(tmp_path), 1, ".npy")), expected)
+    assert os.path.getmtime(shard_path(str(tmp_path), 0, ".npy")) == kept
+    with open(os.path.join(str(tmp_path), PROGRESS)) as f:
+        assert json.load(f)["finished"] == [0, 1, 2]
+
+
+def test_refuses_other_settings(tmp_path):
+    build(tmp_path, count=5)
+    with pytest.raises(ValueError):
+        build(tmp_path, count=5, seed=10)
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), "--count", "5", "--seed", "9", "--shard-size", "10", "--length", "32",
+              "--max-turn", "90", "--workers", "1"])
@@ -0,0 +1,60 @@
+import numpy as np
+from egocentric import SAMPLE_NEAREST, SAMPLE_BILINEAR, batch_egocentric_view, sample_views, view_background
+from interpreter import STATE_SIZE
+from TNavigator_vecNumba import TNavigator
+
+
+def scribbled(seed):
+    turtle = TNavigator()
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        turtle.left(rng.uniform(0, 360))
+        turtle.forward(rng.uniform(5, 30))
+    return turtle
+
+
+def test_axis_aligned_view_is_a_flipped_window():
+    turtle = scribbled(16)
+    turtle.penup()
+    turtle.goto(60, 50)
+    turtle.setheading(0)
+    x, y = int(turtle.xcor()), int(turtle.ycor())
+    # heading 0 of the logo mode is +y, the right is +x
+    window = turtle._canvas[x - 7:x + 8, y + 7:y - 8:-1].T.astype(np.float32)
+    assert np.array_equal(turtle.egocentric_view(15), window)
+    assert np.allclose(turtle.egocentric_view(15, method=SAMPLE_BILINEAR), window, atol=1e-6)
+    # every second pixel at scale 2
+    assert np.array_equal(turtle.egocentric_view(7, 2.0), window[1::2, 1::2])
+
+
+def test_stroke_ahead_is_on_the_center_column():
+    turtle = TNavigator()
+    turtle.left(37)
+    turtle.pensize(3)
+    turtle.forward(20)
+    turtle.penup()
+    turtle.backward(20)
+    view = turtle.egocentric_view(41)
+    assert (view[2:20, 20] == 0.0).all()
+    # nothing behind, to the sides, or off the canvas
+    assert (view[23:, :] == 1.0).all()
+    assert (view[:, :17] == 1.0).all() and (view[:, 24:] == 1.0).all()
+    turtle.goto(2, 2)
+    assert view_background(turtle._canvas) == 1.0
+    assert (turtle.egocentric_view(41) == 1.0).sum() > 41 * 41 // 2
+
+
+def test_batched_views_equal_single_views():
+    turtles = [scribbled(seed) for seed in range(6)]
+    for method in (SAMPLE_NEAREST, SAMPLE_BILINEAR):
+        views = batch_egocentric_view(turtles, (9, 13), 1.5, method)
+        canvases = np.stack([t._canvas for t in turtles])
+        states = np.empty((len(turtles), STATE_SIZE))
+        for i, t in enumerate(turtles):
+            t._get_state(states[i])
+        native = np.empty((len(turtles), 9, 13))
+        sample_views(canvases, states, 1.5, method, 1.0, native)
+        for i, t in enumerate(turtles):
+            single = t.egocentric_view((9, 13), 1.5, method)
+            assert np.array_equal(views[i], single)
+            assert np.allclose(native[i], single, atol=1e-6)
@@ -0,0 +1,91 @@
+import numpy as np
+from evalcache import PrefixCache
+from interpreter import new_program, OP_FORWARD, OP_LEFT
+from TNavigator_vecNumba import TNavigator
+
+
+def target():
+    turtle = TNavigator()
+    turtle.left(30)
+    turtle.forward(40)
+    turtle.circle(20)
+    return turtle._canvas.copy()
+
+
+TARGET = target()
+
+
+def tracked_navigator():
+    turtle = TNavigator()
+    turtle.set_target(TARGET)
+    turtle.enable_canvas_hash()
+    turtle.enable_stroke_distance()
+    turtle.enable_occupancy()
+    turtle.enable_segment_index()
+    turtle.enable_undo()
+    return turtle
+
+
+def program(n, seed):
+    rng = np.random.default_rng(seed)
+    ops, args = new_program(n)
+    ops[:] = rng.choice([OP_FORWARD, OP_LEFT], n)
+    args[:] = rng.uniform(1, 12, n)
+    return ops, args
+
+
+def assert_same(turtle, reference):
+    assert np.array_equal(turtle._canvas, reference._canvas)
+    assert (turtle.xcor(), turtle.ycor()) == (reference.xcor(), reference.ycor())
+    # the float32 heading is rounded at every snapshot
+    assert abs(turtle.heading() - reference.heading()) < 1e-3
+    assert turtle.loss_counts() == reference.loss_counts()
+    assert turtle.canvas_hash() == reference.canvas_hash()
+    assert np.array_equal(turtle._distance, reference._distance)
+    assert np.array_equal(turtle._occupancy, reference._occupancy)
+    assert turtle._undo_count == reference._undo_count == 0
+
+
+def test_hits_match_a_fresh_run_including_trackers():
+    cache = PrefixCache(tracked_navigator, stride=8)
+    ops, args = program(100, 0)
+    cache.evaluate(ops, args)
+    mutated = args.copy()
+    mutated[70:] += 1.0
+    turtle = cache.evaluate(ops, mutated)
+    assert cache.hits == 1 and cache.ops_saved == 64
+    reference = tracked_navigator()
+    reference.run(ops, mutated)
+    assert_same(turtle, reference)
+    # strokes after a hit keep the trackers incremental
+    turtle.forward(15)
+    reference.forward(15)
+    assert turtle.loss_counts() == reference.loss_counts()
+    assert turtle.canvas_hash() == reference.canvas_hash()
+    turtle.undo()
+    reference.undo()
+    assert np.array_equal(turtle._canvas, reference._canvas)
+
+
+def test_fully_cached_program_has_fresh_trackers():
+    cache = PrefixCache(tracked_navigator, stride=8)
+    ops, args = program(96, 1)
+    cache.evaluate(ops, args)
+    turtle = cache.evaluate(ops, args)
+    assert cache.hits == 1 and cache.ops_executed == 96
+    reference = tracked_navigator()
+    reference.run(ops, args)
+    assert_same(turtle, reference)
+
+
+def test_eviction_keeps_results_exact():
+    # room for 25 of the 30 snapshots
+    cache = PrefixCache(TNavigator, stride=4, max_bytes=25 * (TARGET.nbytes + 64))
+    for seed in range(6):
+        ops, args = program(40, seed % 3)
+        turtle = cache.evaluate(ops, args)
+        reference = TNavigator()
+        reference.run(ops, args)
+        assert np.array_equal(turtle._canvas, reference._canvas)
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.hits >= 3
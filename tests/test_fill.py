@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import TNavigator as jit_navigator
+from raster import BLEND_ADD
+from TNavigator_vecNumba import TNavigator
+
+NAVIGATORS = [TNavigator, jit_navigator.TNavigator]
+
+
+def brute_force_fill(shape, polygon):
+    """Pixels whose center is inside polygon by the even-odd rule, and those on an edge."""
+    inside = np.zeros(shape, dtype=bool)
+    on_edge = np.zeros(shape, dtype=bool)
+    for x in range(shape[0]):
+        for y in range(shape[1]):
+            for (ax, ay), (bx, by) in zip(polygon, polygon[1:] + polygon[:1]):
+                if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+                    inside[x, y] = not inside[x, y]
+                if ((bx - ax) * (y - ay) == (by - ay) * (x - ax) and min(ax, bx) <= x <= max(ax, bx)
+                        and min(ay, by) <= y <= max(ay, by)):
+                    on_edge[x, y] = True
+    return inside, on_edge
+
+
+def fill_star(turtle):
+    """Fill a five-pointed star without outline, returns its vertices."""
+    turtle.penup()
+    turtle.backward(30)
+    turtle.begin_fill()
+    star = []
+    for _ in range(5):
+        star.append((float(turtle.xcor()), float(turtle.ycor())))
+        turtle.forward(60)
+        turtle.left(144)
+    turtle.end_fill()
+    return star
+
+
+@pytest.mark.parametrize("navigator", NAVIGATORS)
+def test_fill_equals_point_in_polygon(navigator):
+    turtle = navigator()
+    star = fill_star(turtle)
+    filled = ~np.asarray(turtle._canvas)
+    inside, on_edge = brute_force_fill(filled.shape, star)
+    assert np.array_equal(filled[~on_edge], inside[~on_edge])
+    # the pentagon in the middle of the star is not filled, the points are
+    center = np.mean(star, axis=0)
+    tip = 0.8 * np.array(star[0]) + 0.2 * center
+    assert not filled[tuple(np.round(center).astype(int))]
+    assert filled[tuple(np.round(tip).astype(int))]
+
+
+@pytest.mark.parametrize("navigator", NAVIGATORS)
+def test_begin_fill_while_filling_raises(navigator):
+    turtle = navigator()
+    turtle.begin_fill()
+    turtle.forward(20)
+    with pytest.raises(ValueError):
+        turtle.begin_fill()
+    assert turtle.filling()
+    turtle.left(90)
+    turtle.forward(20)
+    turtle.end_fill()
+    assert not turtle.filling()
+    assert turtle._fill_count == 0
+
+
+def test_end_fill_fills_once():
+    turtle = TNavigator()
+    turtle.use_canvas(np.uint16, BLEND_ADD)
+    turtle.penup()
+    turtle.begin_fill()
+    for _ in range(4):
+        turtle.forward(10)
+        turtle.left(90)
+    turtle.end_fill()
+    once = turtle._canvas.copy()
+    turtle.end_fill()
+    assert np.array_equal(turtle._canvas, once)
+    assert once.max() == 1
@@ -0,0 +1,71 @@
+import math
+import numpy as np
+import pytest
+from fixedpoint import (FixedNavigator, sincos_table, compile_fixed, TABLE_BITS, FSTATE_HEADING, MAX_STEP,
+                        DEFAULT_RESOLUTION)
+from interpreter import new_program, OP_FORWARD, OP_MOVE, OP_LEFT, OP_RIGHT, OP_PUSH, OP_POP, OP_PENUP, OP_PENDOWN
+
+
+@pytest.mark.parametrize("resolution", [4, 360, DEFAULT_RESOLUTION])
+def test_tables_are_correctly_rounded(resolution):
+    cos_table, sin_table = sincos_table(resolution)
+    one = 1 << TABLE_BITS
+    angles = 2 * math.pi * np.arange(resolution) / resolution
+    assert np.abs(cos_table - np.cos(angles) * one).max() <= 1
+    assert np.abs(sin_table - np.sin(angles) * one).max() <= 1
+    quarter = resolution // 4
+    assert cos_table[0] == sin_table[quarter] == one
+    assert cos_table[quarter] == sin_table[0] == 0
+    # a quarter turn is exact
+    assert np.array_equal(sin_table, np.roll(cos_table, quarter))
+
+
+def random_program(seed, count=400):
+    rng = np.random.default_rng(seed)
+    ops, args = new_program(count)
+    ops[:] = rng.choice([OP_FORWARD, OP_FORWARD, OP_MOVE, OP_LEFT, OP_RIGHT, OP_PENUP, OP_PENDOWN], count)
+    args[:] = np.where(np.isin(ops, [OP_LEFT, OP_RIGHT]), rng.uniform(0, 180, count), rng.uniform(0, 6, count))
+    # balanced push/pop pairs
+    ops[10::40] = OP_PUSH
+    ops[30::40] = OP_POP
+    return ops, args
+
+
+def step(turtle, ops, args):
+    for op, arg in zip(ops, args):
+        {OP_FORWARD: turtle.forward, OP_MOVE: turtle.move, OP_LEFT: turtle.left, OP_RIGHT: turtle.right,
+         OP_PUSH: lambda _: turtle.push_state(), OP_POP: lambda _: turtle.pop_state(),
+         OP_PENUP: lambda _: turtle.penup(), OP_PENDOWN: lambda _: turtle.pendown()}[op](arg)
+
+
+@pytest.mark.parametrize("resolution", [360, DEFAULT_RESOLUTION])
+def test_run_is_bit_identical_to_the_step_methods(resolution):
+    ops, args = random_program(15)
+    stepped, ran = FixedNavigator(resolution), FixedNavigator(resolution)
+    step(stepped, ops, args)
+    ran.run(ops, args)
+    assert np.array_equal(ran._state, stepped._state)
+    assert np.array_equal(ran._canvas, stepped._canvas)
+    assert (~ran._canvas).sum() > 50
+
+
+def test_closed_shapes_return_exactly():
+    turtle = FixedNavigator()
+    start = turtle._state.copy()
+    for _ in range(4):
+        turtle.forward(37.3)
+        turtle.left(90)
+    assert np.array_equal(turtle._state, start)
+    turtle.left(0.04)
+    assert turtle._state[FSTATE_HEADING] == start[FSTATE_HEADING]
+    turtle.left(0.06)
+    assert turtle._state[FSTATE_HEADING] == start[FSTATE_HEADING] + 1
+
+
+def test_rejects_steps_beyond_the_range():
+    ops, args = new_program(1)
+    ops[0], args[0] = OP_FORWARD, MAX_STEP
+    with pytest.raises(ValueError):
+        compile_fixed(ops, args)
+    with pytest.raises(ValueError):
+        FixedNavigator().forward(-MAX_STEP)
@@ -0,0 +1,62 @@
+import gc
+import os
+import resource
+import numpy as np
+import pytest
+from TNavigator_vecNumba import TNavigator
+
+
+def drawn():
+    turtle = TNavigator()
+    turtle.forward(30)
+    turtle.left(60)
+    turtle.forward(20)
+    return turtle
+
+
+def test_default_canvas_is_shared_copy_on_write():
+    parent = drawn()
+    before = parent._canvas.copy()
+    children = [parent.fork() for _ in range(3)]
+    assert parent._canvas_base is not None
+    # the children map the frozen canvas instead of owning a copy
+    assert all(not child._canvas.flags.owndata for child in children)
+    for k, child in enumerate(children):
+        child.left(40 * k)
+        child.forward(25)
+    assert np.array_equal(parent._canvas, before)
+    reference = drawn()
+    reference.left(80)
+    reference.forward(25)
+    assert np.array_equal(children[2]._canvas, reference._canvas)
+    # nor do the children see the parent's later strokes
+    child_canvas = children[0]._canvas.copy()
+    parent.forward(5)
+    assert np.array_equal(children[0]._canvas, child_canvas)
+
+
+def test_small_canvases_are_copied_below_min_bytes():
+    parent = drawn()
+    child = parent.fork(min_bytes=parent._canvas.nbytes + 1)
+    assert child._canvas.flags.owndata and parent._canvas_base is None
+    child.forward(10)
+    assert not np.array_equal(child._canvas, parent._canvas)
+
+
+def test_forks_hold_no_file_descriptors():
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("needs /proc")
+    parent = TNavigator()
+    parent._canvas = np.full((512, 512), True)
+    parent.forward(20)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    open_fds = len(os.listdir("/proc/self/fd"))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(open_fds + 64, hard), hard))
+    try:
+        children = [parent.fork() for _ in range(300)]
+        children[-1].forward(10)
+        assert len(os.listdir("/proc/self/fd")) <= open_fds + 1
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    del children
+    gc.collect()
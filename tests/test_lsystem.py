@@ -0,0 +1,57 @@
+import numpy as np
+from lsystem import LSystem
+from interpreter import OP_NOP
+from TNavigator_vecNumba import TNavigator
+
+PLANT = LSystem("X", {"X": "F+[[X]-X]-F[-FX]+X", "F": "FF"}, angle=25, step=2)
+
+
+def expand(system, depth):
+    word = "".join(chr(c) for c in system.axiom)
+    for _ in range(depth):
+        word = "".join(system.rules.get(symbol, symbol) for symbol in word)
+    return word
+
+
+def draw_word(turtle, word, angle, step):
+    for symbol in word:
+        if symbol == "F":
+            turtle.forward(step)
+        elif symbol == "+":
+            turtle.left(angle)
+        elif symbol == "-":
+            turtle.right(angle)
+        elif symbol == "[":
+            turtle.push_state()
+        elif symbol == "]":
+            turtle.pop_state()
+
+
+def test_counts_match_string_rewriting():
+    for depth in range(5):
+        word = expand(PLANT, depth)
+        assert PLANT.symbol_count(depth) == len(word)
+        assert PLANT.op_count(depth) == sum(symbol in "F+-[]" for symbol in word)
+        nesting = np.cumsum([1 if s == "[" else -1 if s == "]" else 0 for s in word])
+        assert PLANT.max_stack_depth(depth) == (nesting.max() if len(nesting) else 0)
+
+
+def test_chunks_concatenate_to_compile():
+    ops, args = PLANT.compile(4)
+    chunks = [(o.copy(), a.copy()) for o, a in PLANT.iter_chunks(4, chunk_size=37)]
+    assert np.array_equal(np.concatenate([o for o, _ in chunks]), ops)
+    assert np.array_equal(np.concatenate([a for _, a in chunks]), args)
+    assert not np.any(ops == OP_NOP)
+
+
+def test_render_matches_step_methods():
+    native = TNavigator()
+    native.move_goto(64, 10)
+    PLANT.render(native, 4, chunk_size=50)
+    reference = TNavigator()
+    reference.move_goto(64, 10)
+    reference._state_stack = np.empty_like(native._state_stack)
+    draw_word(reference, expand(PLANT, 4), 25, 2)
+    assert (~native._canvas).sum() > 0
+    assert np.array_equal(native._canvas, reference._canvas)
+    assert np.allclose([native.xcor(), native.ycor()], [reference.xcor(), reference.ycor()])
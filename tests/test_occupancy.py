@@ -0,0 +1,50 @@
+import numpy as np
+from occupancy import new_pyramid, count_occupancy
+from TNavigator_vecNumba import TNavigator
+from test_tracking import scribble
+
+
+def brute_force_ray(canvas, x0, y0, dx, dy, max_steps):
+    """Step the ray pixel by pixel, the reference of cast_ray()."""
+    major = max(abs(dx), abs(dy))
+    sx, sy = dx / major, dy / major
+    for i in range(1, max_steps + 1):
+        x, y = int(round(x0 + i * sx)), int(round(y0 + i * sy))
+        if 0 <= x < canvas.shape[0] and 0 <= y < canvas.shape[1] and not canvas[x, y]:
+            return x, y, i
+    return None
+
+
+def test_incremental_pyramid_equals_recount():
+    turtle = TNavigator()
+    turtle.enable_undo()
+    turtle.enable_occupancy(2)
+    fresh, offsets, heights = new_pyramid(turtle._canvas.shape, 2)
+    for _ in scribble(turtle, 5):
+        count_occupancy(turtle._canvas, fresh, offsets, heights, 2)
+        assert np.array_equal(turtle._occupancy, fresh)
+    assert turtle._occupancy[-1] == (~turtle._canvas).sum()
+
+
+def test_first_hit_equals_pixel_walk():
+    turtle = TNavigator()
+    rng = np.random.default_rng(6)
+    for _ in range(12):
+        turtle.left(rng.uniform(0, 360))
+        turtle.forward(rng.uniform(5, 40))
+    turtle.penup()
+    starts = [tuple(rng.uniform(0, 127, 2)) for _ in range(8)]
+    for occupancy in (False, True):
+        if occupancy:
+            turtle.enable_occupancy(2)
+        hits = 0
+        for x, y in starts:
+            turtle.goto(x, y)
+            for k in range(40):
+                direction = turtle._orient.rotate(9.0 * k)
+                expected = brute_force_ray(turtle._canvas, float(turtle._position[0]), float(turtle._position[1]),
+                                           float(direction[0]), float(direction[1]), sum(turtle._canvas.shape))
+                assert turtle.first_hit(9.0 * k) == expected
+                hits += expected is not None
+        assert hits > 0
+    assert turtle.first_hit(0, 0) is None
@@ -0,0 +1,104 @@
+import os
+import numpy as np
+import progfile
+from progfile import ProgramWriter, ProgramFile, KIND_LOG, INDEX_SUFFIX
+from interpreter import OP_FORWARD, OP_LEFT
+from TNavigator_vecNumba import TNavigator
+
+
+def programs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    result = []
+    for k in range(count):
+        n = int(rng.integers(0, 20))
+        ops = np.where(np.arange(n) % 2 == 0, OP_FORWARD, OP_LEFT).astype(np.int8)
+        result.append((ops, rng.uniform(-30, 30, n)))
+    return result
+
+
+def check(filename, expected):
+    read = ProgramFile(filename)
+    assert len(read) == len(expected)
+    for k, (ops, args) in enumerate(expected):
+        assert np.array_equal(read[k][0], ops)
+        assert np.array_equal(read[k][1], args)
+
+
+def test_round_trip_and_append(tmp_path):
+    filename = str(tmp_path / "programs.tnav")
+    first, second = programs(30, 1), programs(7, 2)
+    with ProgramWriter(filename) as writer:
+        for ops, args in first:
+            writer.write_program(ops, args)
+    check(filename, first)
+    with ProgramWriter(filename, append=True) as writer:
+        for ops, args in second:
+            writer.write(ops[:3], args[:3])
+            writer.write(ops[3:], args[3:])
+            writer.end_program()
+    check(filename, first + second)
+
+
+def test_open_uses_the_index(tmp_path, monkeypatch):
+    filename = str(tmp_path / "programs.tnav")
+    expected = programs(50)
+    with ProgramWriter(filename) as writer:
+        for ops, args in expected:
+            writer.write_program(ops, args)
+    scanned = []
+    scan = progfile._scan_programs
+    monkeypatch.setattr(progfile, "_scan_programs", lambda data, offset, name: scanned.append(offset) or
+                        scan(data, offset, name))
+    check(filename, expected)
+    # only the end of the file is looked at
+    assert scanned == [os.path.getsize(filename)]
+
+
+def test_unindexed_and_interrupted_files(tmp_path):
+    filename = str(tmp_path / "programs.tnav")
+    expected = programs(10)
+    writer = ProgramWriter(filename)
+    for ops, args in expected[:-1]:
+        writer.write_program(ops, args)
+    # an interrupted writer: the last program is written but not finished
+    writer.write(*expected[-1])
+    writer._file.flush()
+    writer._index.flush()
+    check(filename, expected)
+    writer._file.close()
+    writer._index.close()
+    os.remove(filename + INDEX_SUFFIX)
+    check(filename, expected)
+    with ProgramWriter(filename, append=True) as writer:
+        writer.write_program(*expected[0])
+    check(filename, expected + expected[:1])
+    assert len(np.memmap(filename + INDEX_SUFFIX, dtype=np.uint8, mode="r")) > 0
+
+
+def test_rewritten_file_ignores_stale_index(tmp_path):
+    filename = str(tmp_path / "programs.tnav")
+    with ProgramWriter(filename) as writer:
+        for ops, args in programs(5):
+            writer.write_program(ops, args)
+    stale = open(filename + INDEX_SUFFIX, "rb").read()
+    expected = programs(8, 3)
+    with ProgramWriter(filename) as writer:
+        for ops, args in expected:
+            writer.write_program(ops, args)
+    with open(filename + INDEX_SUFFIX, "wb") as f:
+        f.write(stale)
+    check(filename, expected)
+
+
+def test_log_program_replays_the_drawing(tmp_path):
+    filename = str(tmp_path / "log.tnav")
+    turtle = TNavigator()
+    for distance, angle in ((10, 30), (15, -60), (8, 90)):
+        turtle.forward(distance, angle)
+    with ProgramWriter(filename) as writer:
+        writer.write_log(turtle)
+    read = ProgramFile(filename)
+    assert read.kind(0) == KIND_LOG
+    replay = TNavigator()
+    read.run(replay, 0)
+    assert np.array_equal(replay._canvas, turtle._canvas)
@@ -0,0 +1,45 @@
+import numpy as np
+from interpreter import OP_FORWARD, OP_MOVE, OP_LEFT, OP_RIGHT
+from randprog import random_canvases, program_params, seed_streams
+from tracking import splitmix64
+from TNavigator_vecNumba import TNavigator
+from test_tracking import splitmix64_reference
+
+
+def test_splitmix64_matches_the_reference():
+    states = [(12345 + k * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF for k in range(4)]
+    assert [int(splitmix64(np.uint64(state))) for state in states] == splitmix64_reference(12345, 4)
+
+
+def test_streams_do_not_depend_on_the_batching():
+    canvases, ops, args = random_canvases(6, 48, seed=3)
+    part, part_ops, part_args = random_canvases(3, 48, seed=3, first=2)
+    assert np.array_equal(part, canvases[2:5])
+    assert np.array_equal(part_ops, ops[2:5])
+    assert np.array_equal(part_args, args[2:5])
+    again = random_canvases(6, 48, seed=3)
+    assert all(np.array_equal(a, b) for a, b in zip(again, (canvases, ops, args)))
+    assert not np.array_equal(random_canvases(6, 48, seed=4)[1], ops)
+    assert len(set(seed_streams(3, 0, 1000).tolist())) == 1000
+
+
+def test_renders_equal_the_navigator():
+    canvases, ops, args = random_canvases(8, 64, seed=5)
+    for canvas, program_ops, program_args in zip(canvases, ops, args):
+        turtle = TNavigator()
+        turtle.run(program_ops, program_args)
+        assert np.array_equal(canvas, turtle._canvas)
+    assert (~canvases).sum() > 0
+
+
+def test_programs_follow_the_distribution():
+    params = program_params(move=0, penup=0, pendown=0, min_distance=2, max_distance=4, min_turn=30, max_turn=120,
+                            turn_step=15)
+    _, ops, args = random_canvases(50, 200, seed=6, params=params)
+    moves = np.isin(ops, [OP_FORWARD, OP_MOVE])
+    turns = np.isin(ops, [OP_LEFT, OP_RIGHT])
+    assert (moves | turns).all() and not (ops == OP_MOVE).any()
+    assert abs(moves.mean() - 0.6 / 0.9) < 0.02
+    assert (args[moves] >= 2).all() and (args[moves] <= 4).all()
+    assert (args[turns] % 15 == 0).all() and (args[turns] >= 30).all() and (args[turns] <= 120).all()
+    assert abs((ops[turns] == OP_LEFT).mean() - 0.5) < 0.03
@@ -0,0 +1,71 @@
+import numpy as np
+from rendercache import RenderCache, DiskTier, render_key
+from interpreter import new_program, OP_FORWARD, OP_LEFT
+from TNavigator_vecNumba import TNavigator
+
+
+def program(seed, n=40):
+    rng = np.random.default_rng(seed)
+    ops, args = new_program(n)
+    ops[:] = [OP_FORWARD, OP_LEFT] * (n // 2)
+    args[:] = rng.uniform(2, 20, n)
+    return ops, args
+
+
+def fresh(ops, args):
+    turtle = TNavigator()
+    turtle.run(ops, args)
+    return turtle
+
+
+def tracked():
+    turtle = TNavigator()
+    turtle.enable_canvas_hash()
+    turtle.enable_undo()
+    return turtle
+
+
+def test_memory_and_disk_hits_match_fresh_renders(tmp_path):
+    filename = str(tmp_path / "renders.tnrc")
+    cache = RenderCache(tracked, filename, disk_bytes=1 << 16)
+    programs = [program(seed) for seed in range(3)]
+    for ops, args in programs * 2:
+        turtle = cache.render(ops, args)
+        reference = fresh(ops, args)
+        assert np.array_equal(turtle._canvas, reference._canvas)
+        assert (turtle.xcor(), turtle.ycor()) == (reference.xcor(), reference.ycor())
+        reference.enable_canvas_hash()
+        assert turtle.canvas_hash() == reference.canvas_hash()
+        assert turtle._undo_count == 0
+    assert (cache.misses, cache.memory_hits) == (3, 3)
+    cache.flush()
+    reopened = RenderCache(TNavigator, filename)
+    for ops, args in programs:
+        assert np.array_equal(reopened.render(ops, args)._canvas, fresh(ops, args)._canvas)
+    assert reopened.disk_hits == 3 and reopened.misses == 0
+
+
+def test_key_covers_the_pen_and_start():
+    ops, args = program(0)
+    turtle = TNavigator()
+    keys = {render_key(ops, args, turtle)}
+    turtle.pensize(3)
+    keys.add(render_key(ops, args, turtle))
+    turtle.subpixel(True)
+    keys.add(render_key(ops, args, turtle))
+    moved = TNavigator()
+    moved.move_goto(10, 10)
+    keys.add(render_key(ops, args, moved))
+    keys.add(render_key(ops, args + 1e-9, TNavigator()))
+    assert len(keys) == 5
+
+
+def test_disk_tier_stays_within_its_size(tmp_path):
+    disk = DiskTier(str(tmp_path / "small.tnrc"), disk_bytes=5 * (2048 + 100))
+    canvases = [fresh(*program(seed))._canvas for seed in range(8)]
+    for k, canvas in enumerate(canvases):
+        disk.put(bytes([k]) * 16, np.zeros(5), canvas)
+    assert len(disk) == 5
+    # the least recently used ones were overwritten
+    assert disk.get(bytes([0]) * 16) is None
+    assert np.array_equal(disk.get(bytes([7]) * 16)[1], canvases[7])
@@ -0,0 +1,64 @@
+import numpy as np
+from segindex import SegmentIndex, segment_hit
+from TNavigator_vecNumba import TNavigator
+
+
+def brute_force_first(segments, ax, ay, bx, by):
+    """Smallest parameter along a-b shared with any of segments, skipping touches at a."""
+    best = None
+    for cx, cy, dx, dy in segments:
+        first, last = segment_hit(ax, ay, bx, by, cx, cy, dx, dy)
+        if last > 0.0 and (best is None or first < best):
+            best = first
+    return best
+
+
+def test_segment_hit():
+    assert segment_hit(0.0, 0.0, 10.0, 10.0, 0.0, 10.0, 10.0, 0.0) == (0.5, 0.5)
+    assert segment_hit(0.0, 0.0, 10.0, 0.0, 5.0, 1.0, 5.0, 5.0) == (-1.0, -1.0)
+    # collinear overlap of [4, 8] along [0, 10]
+    assert segment_hit(0.0, 0.0, 10.0, 0.0, 8.0, 0.0, 4.0, 0.0) == (0.4, 0.8)
+
+
+def test_intersects_equals_brute_force():
+    rng = np.random.default_rng(7)
+    index = SegmentIndex((128, 128), cell_shift=3, capacity=4)
+    segments = []
+    for _ in range(150):
+        (x0, y0), (x1, y1) = rng.uniform(-10, 138, (2, 2))
+        segments.append((x0, y0, x1, y1))
+        index.add(x0, y0, x1, y1)
+    for keep in (150, 60):
+        index.truncate(keep)
+        assert len(index) == keep
+        for _ in range(200):
+            (ax, ay), (bx, by) = rng.uniform(0, 127, (2, 2))
+            expected = brute_force_first(segments[:keep], ax, ay, bx, by)
+            crossing = index.intersects(ax, ay, bx, by)
+            if expected is None:
+                assert crossing is None
+            else:
+                assert np.allclose(crossing[:2], (ax + expected * (bx - ax), ay + expected * (by - ay)))
+                assert crossing[2] < keep
+
+
+def test_first_crossing_of_the_path():
+    turtle = TNavigator()
+    turtle.enable_undo()
+    turtle.enable_segment_index(3)
+    rng = np.random.default_rng(8)
+    points = [(float(turtle.xcor()), float(turtle.ycor()))]
+    for _ in range(30):
+        turtle.left(rng.uniform(0, 360))
+        turtle.forward(rng.uniform(5, 30))
+        points.append((float(turtle.xcor()), float(turtle.ycor())))
+    segments = [a + b for a, b in zip(points[:-1], points[1:])]
+    expected = None
+    for k in range(1, len(segments)):
+        if brute_force_first(segments[:k], *segments[k]) is not None:
+            expected = k
+            break
+    assert expected is not None
+    assert turtle.first_crossing()[0] == expected
+    turtle.undo(len(segments) - expected)
+    assert turtle.first_crossing() is None
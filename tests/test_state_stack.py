@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from conftest import load_non_numba
+from interpreter import new_program, OP_FORWARD, OP_LEFT, OP_PUSH, OP_POP, OP_PENUP
+import TNavigator as jit_navigator
+from TNavigator_vecNumba import TNavigator
+
+
+def pose(turtle):
+    return turtle.xcor(), turtle.ycor()
+
+
+def navigators():
+    return [TNavigator(), jit_navigator.TNavigator(), load_non_numba("TNavigator").TNavigator()]
+
+
+@pytest.mark.parametrize("index", range(3))
+def test_pop_restores_pose_and_pen(index):
+    turtle, reference = navigators()[index], navigators()[index]
+    for t in (turtle, reference):
+        t.forward(10)
+        t.left(30)
+    turtle.push_state()
+    turtle.forward(12)
+    turtle.penup()
+    turtle.left(75)
+    turtle.pop_state()
+    # back at the pushed pose with the pen down, the next stroke continues as if nothing happened
+    turtle.forward(20)
+    reference.forward(12)
+    reference.backward(12)
+    reference.forward(20)
+    assert np.allclose(pose(turtle), pose(reference))
+    assert np.array_equal(np.asarray(turtle._canvas), np.asarray(reference._canvas))
+
+
+@pytest.mark.parametrize("index", range(3))
+def test_stack_bounds(index):
+    turtle = navigators()[index]
+    with pytest.raises(IndexError):
+        turtle.pop_state()
+    for _ in range(len(turtle._state_stack)):
+        turtle.push_state()
+    with pytest.raises(IndexError):
+        turtle.push_state()
+
+
+def test_program_push_pop_matches_step_methods():
+    ops, args = new_program(8)
+    ops[:] = OP_FORWARD, OP_PUSH, OP_LEFT, OP_FORWARD, OP_POP, OP_PENUP, OP_LEFT, OP_FORWARD
+    args[:] = 10, 0, 60, 20, 0, 0, -45, 7
+    native = TNavigator()
+    native.run(ops, args)
+    reference = TNavigator()
+    reference.forward(10)
+    reference.push_state()
+    reference.left(60)
+    reference.forward(20)
+    reference.pop_state()
+    reference.penup()
+    reference.right(45)
+    reference.forward(7)
+    assert np.array_equal(native._canvas, reference._canvas)
+    assert np.allclose(pose(native), pose(reference))
+    assert np.isclose(native.heading(), reference.heading())
+    assert native._state_top == reference._state_top == 0
@@ -0,0 +1,52 @@
+import io
+import threading
+import numpy as np
+import pytest
+from stream import parse_command, parse_chunks, prefetch, run_stream
+from interpreter import OP_FORWARD, OP_LEFT, OP_RIGHT, OP_PUSH, OP_POP
+from TNavigator_vecNumba import TNavigator
+
+
+def test_text_and_json_commands():
+    assert parse_command("forward 20") == (OP_FORWARD, 20.0)
+    assert parse_command("  BK 5 ") == (OP_FORWARD, -5.0)
+    assert parse_command('{"cmd": "rt", "arg": 90}') == (OP_RIGHT, 90.0)
+    assert parse_command('{"cmd": "push"}') == (OP_PUSH, 0.0)
+    assert parse_command("# comment") is None
+    assert parse_command("   ") is None
+
+
+@pytest.mark.parametrize("line", ['{"cmd": "forward", "arg": null}', '{"cmd": "forward", "arg": [1]}',
+                                  '{"cmd": 5}', '{"arg": 3}', '{"cmd": "forward", "arg": true}', "jump 3",
+                                  "forward 1 2", "left x", '{"cmd": "fd"'])
+def test_malformed_lines_raise_value_error_with_line_number(line):
+    with pytest.raises(ValueError, match="line 2"):
+        list(parse_chunks(["forward 1", line]))
+
+
+def test_chunks_and_stream_match_step_methods():
+    lines = ["forward 10", "left 45", "push", "forward 20", "pop", "right 90", "forward 15"] * 5
+    chunks = [(ops.copy(), args.copy()) for ops, args in parse_chunks(lines, chunk_size=4)]
+    assert [len(ops) for ops, _ in chunks] == [4] * 8 + [3]
+    assert np.concatenate([ops for ops, _ in chunks])[:3].tolist() == [OP_FORWARD, OP_LEFT, OP_PUSH]
+    turtle = TNavigator()
+    assert run_stream(turtle, io.StringIO("\n".join(lines)), chunk_size=4) == len(lines)
+    reference = TNavigator()
+    for _ in range(5):
+        reference.forward(10)
+        reference.left(45)
+        reference.push_state()
+        reference.forward(20)
+        reference.pop_state()
+        reference.right(90)
+        reference.forward(15)
+    assert np.array_equal(turtle._canvas, reference._canvas)
+    assert OP_POP in np.concatenate([ops for ops, _ in chunks])
+
+
+def test_prefetch_thread_stops_with_the_consumer():
+    threads = threading.active_count()
+    chunks = prefetch(iter(range(1000)), depth=2)
+    assert next(chunks) == 0
+    chunks.close()
+    assert threading.active_count() == threads
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import TNavigator as jit_navigator
+from interpreter import new_program, OP_FORWARD, OP_LEFT
+from TNavigator_vecNumba import TNavigator
+
+
+def steps(seed, count=200):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0.2, 3.0, count), rng.uniform(-20, 20, count)
+
+
+@pytest.mark.parametrize("navigator", [TNavigator, jit_navigator.TNavigator])
+def test_short_steps_accumulate(navigator):
+    turtle = navigator()
+    x, y = float(turtle.xcor()), float(turtle.ycor())
+    turtle.subpixel(True)
+    for _ in range(10):
+        turtle.forward(0.4)
+    assert np.isclose(np.hypot(turtle.xcor() - x, turtle.ycor() - y), 4.0, atol=1e-4)
+    assert (~np.asarray(turtle._canvas)).sum() == 4
+    rounded = navigator()
+    for _ in range(10):
+        rounded.forward(0.4)
+    assert (rounded.xcor(), rounded.ycor()) == (x, y)
+    turtle.subpixel(False)
+    assert turtle.xcor() == round(turtle.xcor()) and turtle.ycor() == round(turtle.ycor())
+
+
+def test_run_equals_the_step_methods():
+    lengths, angles = steps(14)
+    ops, args = new_program(2 * len(lengths))
+    ops[0::2], args[0::2] = OP_FORWARD, lengths
+    ops[1::2], args[1::2] = OP_LEFT, angles
+    stepped, ran, jitted = TNavigator(), TNavigator(), jit_navigator.TNavigator()
+    for turtle in (stepped, ran, jitted):
+        turtle.subpixel(True)
+    for length, angle in zip(lengths, angles):
+        stepped.forward(length)
+        stepped.left(angle)
+        jitted.forward(length)
+        jitted.left(angle)
+    ran.run(ops, args)
+    assert np.allclose((ran.xcor(), ran.ycor()), (stepped.xcor(), stepped.ycor()), atol=1e-3)
+    assert np.array_equal(ran._canvas, stepped._canvas)
+    assert np.array_equal(np.asarray(jitted._canvas), stepped._canvas)
+    assert (~stepped._canvas).sum() > 50
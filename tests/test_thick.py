@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+import TNavigator as jit_navigator
+from conftest import load_non_numba
+from raster import draw_thick_line, CAP_ROUND, CAP_SQUARE
+from TNavigator_vecNumba import TNavigator
+
+non_numba = load_non_numba("TNavigator")
+CAPS = {CAP_ROUND: non_numba.TNavigator.CAP_ROUND, CAP_SQUARE: non_numba.TNavigator.CAP_SQUARE}
+
+
+@pytest.mark.parametrize("cap", [CAP_ROUND, CAP_SQUARE])
+def test_thick_line_equals_python_rasterizer(cap):
+    reference = non_numba.TNavigator()
+    rng = np.random.default_rng(12)
+    for _ in range(60):
+        x0, y0, x1, y1 = rng.uniform(-20, 148, 4)
+        if rng.random() < 0.2:
+            x1 = x0
+        width = rng.uniform(1.5, 12)
+        canvas = np.full((128, 128), True)
+        draw_thick_line(canvas, x0, y0, x1, y1, width, cap, False)
+        reference._pensize = width
+        reference._pencap = CAPS[cap]
+        rr, cc = reference._get_thick_line((x0, y0), (x1, y1))
+        expected = np.full((128, 128), True)
+        expected[rr, cc] = False
+        assert np.array_equal(canvas, expected)
+
+
+@pytest.mark.parametrize("cap", [CAP_ROUND, CAP_SQUARE])
+def test_thick_paths_match_across_navigators(cap):
+    turtles = [TNavigator(), jit_navigator.TNavigator(), non_numba.TNavigator()]
+    rng = np.random.default_rng(13)
+    moves = [(rng.uniform(0, 360), rng.uniform(5, 20), rng.choice([2, 3, 5, 8])) for _ in range(15)]
+    for turtle in turtles:
+        for angle, distance, width in moves:
+            turtle.pensize(float(width), CAPS[cap] if turtle is turtles[2] else cap)
+            turtle.left(angle)
+            turtle.forward(distance)
+    canvases = [np.asarray(turtle._canvas) for turtle in turtles]
+    assert (~canvases[0]).sum() > 200
+    for canvas in canvases[1:]:
+        assert np.array_equal(canvas, canvases[0])
@@ -0,0 +1,55 @@
+import numpy as np
+from raster import draw_line, blend_limit, BLEND_ADD
+from tiled import TiledCanvas
+from TNavigator_vecNumba import TNavigator
+
+
+def random_lines(seed, count, low, high):
+    return np.random.default_rng(seed).integers(low, high, (count, 4))
+
+
+def test_bounded_equals_dense():
+    dense = np.full((200, 150), True)
+    tiled = TiledCanvas((200, 150), tile_shift=4, tiles=2)
+    for x0, y0, x1, y1 in random_lines(9, 200, -60, 260):
+        assert tiled.draw_line(x0, y0, x1, y1, False) == draw_line(dense, x0, y0, x1, y1, False)
+    assert np.array_equal(tiled.to_array(), dense)
+    assert tiled.window(-10, 140, 30, 30)[10:, :10].tolist() == dense[:20, 140:].tolist()
+
+
+def test_unbounded_equals_shifted_dense():
+    # the dense canvas shows the unbounded one from (-300, -300) on
+    dense = np.zeros((600, 600), dtype=np.uint16)
+    tiled = TiledCanvas(tile_shift=5, background=0, dtype=np.uint16, blend=BLEND_ADD)
+    limit = blend_limit(np.uint16)
+    for x0, y0, x1, y1 in random_lines(10, 150, -280, 280):
+        tiled.draw_line(x0, y0, x1, y1, 1)
+        draw_line(dense, x0 + 300, y0 + 300, x1 + 300, y1 + 300, 1, BLEND_ADD, limit)
+    assert np.array_equal(tiled.window(-300, -300, 600, 600), dense)
+    x, y, width, height = tiled.bounds()
+    assert dense[x + 300:x + 300 + width, y + 300:y + 300 + height].sum() == dense.sum()
+    for tx, ty, tile in tiled.iter_tiles():
+        assert np.array_equal(tile, dense[tx + 300:tx + 332, ty + 300:ty + 332])
+
+
+def test_far_apart_strokes_stay_sparse():
+    tiled = TiledCanvas(tile_shift=6)
+    tiled.draw_line(-10 ** 9, 0, -10 ** 9 + 10, 0, False)
+    tiled.draw_line(10 ** 9, 10 ** 9, 10 ** 9, 10 ** 9 + 10, False)
+    assert tiled.tile_count == 2
+    assert tiled.nbytes < 1 << 20
+    assert (~tiled.window(10 ** 9 - 5, 10 ** 9, 10, 20)).sum() == 10
+
+
+def test_navigator_draws_the_same_lines():
+    dense = TNavigator()
+    tiled = TNavigator()
+    tiled.use_tiled_canvas(dense._canvas.shape, tile_shift=4)
+    rng = np.random.default_rng(11)
+    for _ in range(40):
+        angle, distance = rng.uniform(0, 360), rng.uniform(5, 40)
+        for turtle in (dense, tiled):
+            turtle.left(angle)
+            turtle.forward(distance)
+    assert np.array_equal(tiled.tiled_canvas().to_array(), dense._canvas)
+    assert np.array_equal(tiled._canvas, np.full(dense._canvas.shape, True))
@@ -0,0 +1,146 @@
+import numpy as np
+from interpreter import new_program, OP_FORWARD, OP_LEFT
+from TNavigator_vecNumba import TNavigator
+
+
+def random_target(seed):
+    turtle = TNavigator()
+    rng = np.random.default_rng(seed)
+    for _ in range(30):
+        turtle.left(rng.uniform(0, 360))
+        turtle.forward(rng.uniform(5, 30))
+    return turtle._canvas.copy()
+
+
+def scribble(turtle, seed):
+    """Lines, thick lines, a fill, undo and run(), the ways the canvas changes."""
+    rng = np.random.default_rng(seed)
+    for k in range(20):
+        turtle.left(rng.uniform(0, 360))
+        turtle.pensize(1 if k % 3 else 4)
+        turtle.forward(rng.uniform(3, 25))
+        yield
+    turtle.pensize(1)
+    turtle.begin_fill()
+    for _ in range(4):
+        turtle.forward(15)
+        turtle.left(90)
+    turtle.end_fill()
+    yield
+    turtle.undo(3)
+    yield
+    ops, args = new_program(6)
+    ops[:] = [OP_FORWARD, OP_LEFT] * 3
+    args[:] = 12, 70, 9, 100, 14, 30
+    turtle.run(ops, args)
+    yield
+
+
+def test_incremental_loss_equals_recomputation():
+    target = random_target(1)
+    turtle = TNavigator()
+    turtle.enable_undo()
+    turtle.set_target(target)
+    ink = ~target
+    for _ in scribble(turtle, 2):
+        drawn = ~turtle._canvas
+        intersection = int((drawn & ink).sum())
+        union = int((drawn | ink).sum())
+        assert turtle.loss_counts() == (intersection, union, union - intersection)
+        assert np.isclose(turtle.loss(), 1.0 - intersection / union)
+        assert np.isclose(turtle.loss("l1"), (union - intersection) / drawn.size)
+
+
+def test_grayscale_target_and_batch_loss():
+    from tracking import batch_loss
+    target = random_target(3)
+    turtles = []
+    for seed in range(3):
+        turtle = TNavigator()
+        gray = TNavigator()
+        gray._canvas[:] = target
+        turtle.set_target(gray._get_image_cv2())
+        for _ in zip(range(5), scribble(turtle, seed)):
+            pass
+        turtles.append(turtle)
+    assert np.allclose(batch_loss(turtles), [t.loss() for t in turtles])
+    assert np.allclose(batch_loss(turtles, "l1"), [t.loss("l1") for t in turtles])
+
+
+def splitmix64_reference(state, count):
+    mask = (1 << 64) - 1
+    keys = []
+    for _ in range(count):
+        state = (state + 0x9E3779B97F4A7C15) & mask
+        z = state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+        keys.append(z ^ (z >> 31))
+    return keys
+
+
+def test_zobrist_keys_are_the_splitmix64_sequence():
+    from tracking import zobrist_table
+    assert zobrist_table((128, 128))[:4].tolist() == splitmix64_reference(0, 4)
+    assert zobrist_table((128, 128))[0] == 0xE220A8397B1DCDAF
+    assert zobrist_table((4, 5), seed=7).tolist() == splitmix64_reference(7, 20)
+
+
+def test_incremental_hash_equals_recomputation():
+    from tracking import zobrist_hash, zobrist_table
+    turtle = TNavigator()
+    turtle.enable_undo()
+    turtle.enable_canvas_hash()
+    seen = {}
+    for _ in scribble(turtle, 4):
+        assert turtle.canvas_hash() == int(zobrist_hash(turtle._canvas, zobrist_table(turtle._canvas.shape)))
+        seen.setdefault(turtle.canvas_hash(), turtle._canvas.copy())
+    # no collisions among the drawings
+    assert all(np.array_equal(canvas, seen[h]) for h, canvas in seen.items())
+    # equal drawings made differently hash equal, the pose goes into state_hash() only
+    a, b = TNavigator(), TNavigator()
+    for t in (a, b):
+        t.enable_canvas_hash()
+    a.forward(20)
+    b.forward(20)
+    b.penup()
+    b.backward(20)
+    assert np.array_equal(a._canvas, b._canvas)
+    assert a.canvas_hash() == b.canvas_hash()
+    assert a.state_hash() != b.state_hash()
+
+
+def brute_force_distance(canvas, radius):
+    """Distance of every pixel to the nearest ink pixel, capped at radius."""
+    ink = np.argwhere(~canvas)
+    x, y = np.indices(canvas.shape)
+    dist = np.full(canvas.shape, float(radius))
+    for ix, iy in ink:
+        dist = np.minimum(dist, np.hypot(x - ix, y - iy))
+    return np.where(dist < radius, dist, radius)
+
+
+def test_incremental_distance_equals_recomputation():
+    from tracking import count_distance, distance_offsets
+    turtle = TNavigator()
+    turtle.enable_undo()
+    turtle.enable_stroke_distance(6)
+    off_x, off_y, off_d = distance_offsets(6)
+    for _ in scribble(turtle, 4):
+        fresh = np.empty(turtle._canvas.shape, dtype=np.float32)
+        count_distance(turtle._canvas, fresh, off_x, off_y, off_d, 6)
+        assert np.array_equal(turtle._distance, fresh)
+    assert np.allclose(turtle._distance, brute_force_distance(turtle._canvas, 6), atol=1e-5)
+
+
+def test_stroke_distance_lookups():
+    turtle = TNavigator()
+    turtle.enable_stroke_distance(8)
+    turtle.forward(20)
+    assert turtle.stroke_distance() == 0.0
+    x, y = turtle.xcor(), turtle.ycor()
+    assert turtle.stroke_distance(x + 3, y) == 3.0
+    assert turtle.stroke_distance((x + 30, y)) == 8.0
+    assert turtle.stroke_distance(-5, -5) == 8.0
+    ahead = turtle.stroke_distance_ahead(10)
+    assert np.array_equal(ahead, np.minimum(np.arange(1, 11), 8).astype(np.float32))
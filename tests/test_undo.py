@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from TNavigator_vecNumba import TNavigator
+
+ENABLERS = {
+    "undo": lambda t: t.enable_undo(),
+    "target": lambda t: t.set_target(np.full((128, 128), True)),
+    "hash": lambda t: t.enable_canvas_hash(),
+    "distance": lambda t: t.enable_stroke_distance(),
+    "occupancy": lambda t: t.enable_occupancy(),
+}
+TRACKERS = ("_undo_pixels", "_target_ink", "_zobrist_table", "_distance", "_occupancy")
+
+
+def snapshot(turtle):
+    return turtle._canvas.copy(), turtle.xcor(), turtle.ycor(), turtle.heading(), turtle._state_top
+
+
+def test_undo_restores_pixels_and_pose_exactly():
+    turtle = TNavigator()
+    turtle.enable_undo(pixels=4, strokes=2)
+    states = []
+
+    def stroke(move, *args):
+        states.append(snapshot(turtle))
+        move(*args)
+
+    stroke(turtle.forward, 30)
+    turtle.left(100)
+    turtle.pensize(5)
+    stroke(turtle.forward, 25)
+    turtle.pensize(1)
+    turtle.begin_fill()
+    for _ in range(3):
+        stroke(turtle.forward, 20)
+        turtle.left(120)
+    stroke(turtle.end_fill)
+    stroke(turtle.backward, 40)
+    for state in reversed(states):
+        turtle.undo()
+        now = snapshot(turtle)
+        assert np.array_equal(now[0], state[0])
+        assert now[1:] == state[1:]
+
+
+def test_undo_more_than_recorded_goes_back_to_the_start():
+    turtle = TNavigator()
+    turtle.forward(10)
+    before = turtle._canvas.copy()
+    turtle.enable_undo()
+    turtle.circle(20)
+    turtle.undo(1000)
+    assert np.array_equal(turtle._canvas, before)
+
+
+@pytest.mark.parametrize("name", sorted(ENABLERS))
+def test_refused_trackers_leave_the_navigator_unchanged(name):
+    tiled = TNavigator()
+    tiled.use_tiled_canvas()
+    counts = TNavigator()
+    counts.use_canvas(np.uint16)
+    for turtle in (tiled, counts):
+        with pytest.raises(ValueError):
+            ENABLERS[name](turtle)
+        assert not turtle._tracking
+        assert all(getattr(turtle, attribute) is None for attribute in TRACKERS)
+        turtle.forward(10)
+    assert (~tiled.tiled_canvas().to_array()).sum() == 10
+    assert (counts._canvas > 0).sum() == 10
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from egocentric import sample_view, SAMPLE_NEAREST
+from interpreter import STATE_X, STATE_Y, STATE_ORIENT_X, STATE_ORIENT_Y
+from vecenv import VecTurtleEnv, attach_observations, DEFAULT_ACTIONS, ACTION_TURN, ACTION_DISTANCE
+from TNavigator_vecNumba import TNavigator
+
+
+@pytest.fixture
+def env():
+    env = VecTurtleEnv(8, max_steps=1000, view_size=(9, 11))
+    yield env
+    env.close()
+
+
+def test_steps_match_the_navigator(env):
+    rng = np.random.default_rng(17)
+    turtles = [TNavigator() for _ in range(env.num_envs)]
+    for _ in range(30):
+        actions = rng.integers(0, len(DEFAULT_ACTIONS), env.num_envs)
+        observations, rewards, dones = env.step(actions)
+        assert not dones.any()
+        for i, turtle in enumerate(turtles):
+            before = int((~turtle._canvas).sum())
+            turtle.left(DEFAULT_ACTIONS[actions[i], ACTION_TURN])
+            turtle.forward(DEFAULT_ACTIONS[actions[i], ACTION_DISTANCE])
+            assert np.array_equal(env.canvases[i], turtle._canvas)
+            assert rewards[i] == int((~turtle._canvas).sum()) - before
+            # the float64 pose of the environment, the turtle keeps a float32 heading
+            view = np.empty((9, 11), dtype=np.float32)
+            sample_view(turtle._canvas, *env.states[i, [STATE_X, STATE_Y, STATE_ORIENT_X, STATE_ORIENT_Y]], 1.0,
+                        SAMPLE_NEAREST, 1.0, view)
+            assert np.array_equal(observations[i], view)
+    assert env.render(0).tolist() == turtles[0]._get_image_cv2().tolist()
+
+
+def test_finished_episodes_reset_in_place():
+    env = VecTurtleEnv(3, max_steps=4, view_size=5, shared=False)
+    start = env.states.copy()
+    for k in range(1, 5):
+        observations, rewards, dones = env.step(np.zeros(3, dtype=np.int64))
+        assert dones.all() == (k == 4)
+    assert np.array_equal(env.states, start)
+    assert env.canvases.all()
+    assert (observations == 1.0).all()
+    # running off the canvas ends the episode too
+    env = VecTurtleEnv(1, actions=[[0.0, 100.0]], view_size=5, shared=False)
+    assert env.step([0])[2][0]
+    assert env.states[0, STATE_X] == start[0, STATE_X] and env.states[0, STATE_Y] == start[0, STATE_Y]
+
+
+def test_shared_observations(env):
+    shm, observations = attach_observations(env.shm_name, env.num_envs, (9, 11))
+    env.step(np.ones(env.num_envs, dtype=np.int64))
+    assert np.array_equal(observations, env.observations)
+    del observations
+    shm.close()
+    with pytest.raises(ValueError):
+        env.step(np.zeros(env.num_envs + 1, dtype=np.int64))
+    with pytest.raises(ValueError):
+        env.step(np.full(env.num_envs, len(DEFAULT_ACTIONS)))